@@ -1,9 +1,34 @@
 import { ref } from 'vue'
 
-const CACHE_KEY = 'cachedCompanyData'
+// Versionné : les entrées d'avant les scores précalculés sont ignorées
+const CACHE_KEY = 'cachedCompanyData:v2'
 const TIMESTAMP_KEY = 'cachedCompanyTimestamp'
 const MAX_AGE = 6 * 60 * 60 * 1000 // 6 heures
 
+// Format compact écrit par v0/export_web_data.py : résumés sans historique + historiques en float32
+async function fetchCompactData() {
+  const [summariesRes, pricesRes] = await Promise.all([
+    fetch('/data/summaries.min.json'),
+    fetch('/data/prices.f32')
+  ])
+  if (!summariesRes.ok || !pricesRes.ok) throw new Error('Compact dataset not available')
+  const { companies } = await summariesRes.json()
+  const prices = new Float32Array(await pricesRes.arrayBuffer())
+  return companies.map(({ historyOffset, historyLength, ...company }) => ({
+    ...company,
+    // toPrecision(7) retrouve la valeur décimale d'origine arrondie en float32
+    priceHistory: Array.from(
+      prices.subarray(historyOffset, historyOffset + historyLength),
+      v => Number(v.toPrecision(7))
+    )
+  }))
+}
+
+async function fetchFullData() {
+  const res = await fetch('/data/data.json')
+  return res.json()
+}
+
 export function useCachedData() {
   const data = ref([])
   const loading = ref(true)
@@ -16,8 +41,7 @@ export function useCachedData() {
     if (cached && timestamp && now - parseInt(timestamp) < MAX_AGE) {
       data.value = JSON.parse(cached)
     } else {
-      const res = await fetch('/data/data.json')
-      const freshData = await res.json()
+      const freshData = await fetchCompactData().catch(fetchFullData)
       localStorage.setItem(CACHE_KEY, JSON.stringify(freshData))
       localStorage.setItem(TIMESTAMP_KEY, now.toString())
       data.value = freshData
@@ -1,3 +1,7 @@
+import { sectorProfiles } from './sectorProfiles'
+
+export { sectorProfiles }
+
 export const fmt = (val, decimals = 1) =>
   val != null && !isNaN(val) ? (+val).toFixed(decimals) : '–'
 
@@ -26,49 +30,6 @@ export function isValidNumber(val) {
   return !isNaN(num) && isFinite(num)
 }
 
-export const sectorProfiles = {
-  'Technology': {
-    metrics: ['ebitdaMargin', 'debtToEbitda', 'growth', 'revenue', 'evToEbitda', 'trend'],
-    weights: [0.25, 0.2, 0.15, 0.15, 0.15, 0.1]
-  },
-  'Financial Services': {
-    metrics: ['roe', 'revenue', 'trend'],
-    weights: [0.5, 0.3, 0.2]
-  },
-  'Healthcare': {
-    metrics: ['growth', 'ebitdaMargin', 'revenue', 'trend'],
-    weights: [0.3, 0.25, 0.25, 0.2]
-  },
-  'Utilities': {
-    metrics: ['ebitdaMargin', 'debtToEbitda', 'trend'],
-    weights: [0.4, 0.4, 0.2]
-  },
-  'Consumer Cyclical': {
-    metrics: ['growth', 'revenue', 'ebitdaMargin', 'trend'],
-    weights: [0.3, 0.3, 0.2, 0.2]
-  },
-  'Consumer Defensive': {
-    metrics: ['revenue', 'ebitdaMargin', 'trend'],
-    weights: [0.4, 0.4, 0.2]
-  },
-  'Communication Services': {
-    metrics: ['ebitdaMargin', 'growth', 'trend'],
-    weights: [0.4, 0.4, 0.2]
-  },
-  'Industrials': {
-    metrics: ['ebitdaMargin', 'debtToEbitda', 'growth', 'trend'],
-    weights: [0.3, 0.3, 0.2, 0.2]
-  },
-  'Basic Materials': {
-    metrics: ['ebitdaMargin', 'debtToEbitda', 'revenue', 'trend'],
-    weights: [0.3, 0.3, 0.2, 0.2]
-  },
-  'default': {
-    metrics: ['ebitdaMargin', 'debtToEbitda', 'growth', 'revenue', 'trend'],
-    weights: [0.25, 0.25, 0.2, 0.2, 0.1]
-  }
-}
-
 export function getSectorProfile(sector) {
   return sectorProfiles[sector] || sectorProfiles.default
 }
@@ -0,0 +1,204 @@
+# analytics.py
+import argparse
+import os
+import numpy as np
+from functools import cached_property
+from price_matrix import PriceMatrix
+from price_store import open_store
+from corr_snapshots import open_snapshots, trailing_correlation
+from network_utils import TOPOLOGIES
+from profiling import add_profile_argument, enable_from_args, span
+from data_utils import calculate_rolling_correlation
+from plot_utils import (plot_heatmap, plot_rolling_correlation, plot_correlation_network, plot_scatter_matrix,
+                        set_interactive, figure_to_bytes)
+
+# Load-once analysis pipeline: every intermediate is computed on first use and shared by all outputs
+
+class AnalysisPipeline:
+    """Lazily loads the returns of the resolved symbols once and derives every output from them."""
+
+    def __init__(self, store, inputs, start_date, end_date, corr_window=None, snapshots=None, dtype=np.float32):
+        self.store = store
+        self.start_date = start_date
+        self.end_date = end_date
+        self.dtype = dtype
+        self.corr_window = corr_window
+        self.snapshots = snapshots
+        if inputs:
+            symbols, missing_inputs = store.validate_symbols_or_names(inputs)
+            if missing_inputs:
+                raise ValueError(f"The following inputs were not found in the database: {', '.join(missing_inputs)}")
+        else:
+            symbols = store.all_symbols()
+        self.symbols = list(dict.fromkeys(symbols))
+        self._rolling = {}
+
+    # Daily returns come from the store (materialized in PostgreSQL) instead of being recomputed,
+    # held in one compact array
+    @cached_property
+    def loaded_returns(self):
+        matrix = self.store.load_returns_matrix(self.symbols, self.start_date, self.end_date, dtype=self.dtype)
+        available = set(matrix.available())
+        for symbol in self.symbols:
+            if symbol not in available:
+                raise ValueError(f"Could not find data for {symbol}")
+        return matrix
+
+    # Returns on the dates where every symbol has one, compacted in place over the loaded array
+    @cached_property
+    def returns_matrix(self):
+        if self.corr_window is not None:
+            # Taken before the compaction overwrites the loaded rows
+            self.trailing_returns
+        return self.loaded_returns.complete_rows(inplace=True)
+
+    # Last `corr_window` dates with missing returns kept, the rows build_snapshots correlates
+    @cached_property
+    def trailing_returns(self):
+        matrix = self.loaded_returns.complete_rows(how="all")
+        window = slice(-self.corr_window, None)
+        return PriceMatrix(matrix.values[window], matrix.dates[window], matrix.symbols).copy().to_frame()
+
+    # pandas view over the same memory, for the plotting and rolling code
+    @cached_property
+    def returns(self):
+        return self.returns_matrix.to_frame()
+
+    # With `corr_window`, the trailing-window correlation as of end_date is read from a precomputed
+    # snapshot when a recent one covers the symbols, and computed from the same rows otherwise
+    @cached_property
+    def correlation(self):
+        if self.corr_window is None:
+            return self.returns_matrix.correlation(self.symbols)
+        if self.snapshots is not None:
+            found = self.snapshots.lookup(self.symbols, self.corr_window, as_of=self.end_date)
+            if found is not None:
+                print(f"Correlation read from the {self.corr_window}-day snapshot as of {found[1]}")
+                return found[0]
+        return trailing_correlation(self.trailing_returns, self.corr_window, self.symbols)
+
+    @cached_property
+    def symbol_names(self):
+        names = self.store.get_symbol_names(self.symbols)
+        return {symbol: names.get(symbol) or symbol for symbol in self.symbols}
+
+    # Rolling correlation of the first two symbols, memoized per window
+
+    def rolling(self, window):
+        if window not in self._rolling:
+            sym1, sym2 = self.pair()
+            self._rolling[window] = calculate_rolling_correlation(self.returns, sym1, sym2, window)
+        return self._rolling[window]
+
+    def pair(self):
+        if len(self.symbols) < 2:
+            raise ValueError("At least two symbols are required for this analysis")
+        return self.symbols[0], self.symbols[1]
+
+    def named(self, frame):
+        return frame.rename(columns=self.symbol_names, index=self.symbol_names)
+
+# Output handlers, each drawing on the shared pipeline; plotting handlers return their figure
+
+def output_pair(pipeline, options):
+    sym1, sym2 = pipeline.pair()
+    print(pipeline.returns[[sym1, sym2]])
+    print(f"Correlation between {sym1} and {sym2}: {pipeline.correlation.loc[sym1, sym2]}")
+
+def output_rolling(pipeline, options):
+    sym1, sym2 = pipeline.pair()
+    print("Rolling correlation calculated.")
+    return plot_rolling_correlation(pipeline.rolling(options.window), sym1, sym2, options.window)
+
+def output_heatmap(pipeline, options):
+    return plot_heatmap(pipeline.named(pipeline.correlation), title="Return Correlation Matrix")
+
+def output_network(pipeline, options):
+    return plot_correlation_network(pipeline.named(pipeline.correlation), threshold=options.threshold,
+                                    topology=options.topology, k=options.k, layout_cache=options.layout_cache)
+
+def output_scatter(pipeline, options):
+    return plot_scatter_matrix(pipeline.returns.rename(columns=pipeline.symbol_names), mode=options.scatter_mode,
+                               bins=options.bins, sample=options.sample)
+
+OUTPUTS = {
+    "pair": output_pair,
+    "rolling": output_rolling,
+    "heatmap": output_heatmap,
+    "network": output_network,
+    "scatter": output_scatter,
+}
+
+# Default options shared by the CLI and the legacy correlation_* entry points
+
+def default_options(**overrides):
+    options = argparse.Namespace(window=30, threshold=0.5, topology="threshold", k=3, layout_cache=None,
+                                 scatter_mode="auto", bins=64, sample=None, output_dir=None, fmt="png",
+                                 corr_window=None, dtype="float32")
+    vars(options).update(overrides)
+    return options
+
+# Load the data once and emit every requested output from it
+# With `options.output_dir` set, figures are rendered headless to <output_dir>/<output>.<fmt> instead of shown
+
+def run_analysis(outputs, inputs, start_date, end_date, options=None, store=None):
+    options = options if options is not None else default_options()
+    owns_store = store is None
+    store = store if store is not None else open_store()
+    if options.output_dir:
+        set_interactive(False)
+        os.makedirs(options.output_dir, exist_ok=True)
+    try:
+        pipeline = AnalysisPipeline(store, inputs, start_date, end_date, corr_window=options.corr_window,
+                                    snapshots=open_snapshots() if options.corr_window else None,
+                                    dtype=np.dtype(options.dtype))
+        for output in outputs:
+            with span(f"output.{output}"):
+                fig = OUTPUTS[output](pipeline, options)
+                if fig is not None and options.output_dir:
+                    path = os.path.join(options.output_dir, f"{output}.{options.fmt}")
+                    with open(path, "wb") as f:
+                        f.write(figure_to_bytes(fig, fmt=options.fmt))
+                    print(f"Saved {path}")
+        return pipeline
+    finally:
+        if owns_store:
+            store.close()
+
+# Parse CLI arguments
+
+def parse_arguments(argv=None):
+    parser = argparse.ArgumentParser(description="Correlation analyses over stored prices, loading the data only once")
+    parser.add_argument("outputs", nargs="+", choices=list(OUTPUTS), help="Analyses to produce from the same loaded data")
+    parser.add_argument("--symbols", nargs="*", default=[], help="Symbols or names (all known symbols if omitted)")
+    parser.add_argument("--start_date", type=str, default="2023-01-01", help="Start date (format YYYY-MM-DD)")
+    parser.add_argument("--end_date", type=str, default="2023-12-31", help="End date (format YYYY-MM-DD)")
+    parser.add_argument("--window", type=int, default=30, help="Rolling window size in days")
+    parser.add_argument("--threshold", type=float, default=0.5, help="Minimum |correlation| drawn as a network edge")
+    parser.add_argument("--topology", choices=list(TOPOLOGIES), default="threshold",
+                        help="Network edges: above threshold, minimum spanning tree or top-k neighbours")
+    parser.add_argument("--k", type=int, default=3, help="Neighbours per node for the topk topology")
+    parser.add_argument("--layout_cache", type=str, default=None, help="JSON file reused for network node positions")
+    parser.add_argument("--scatter_mode", choices=["auto", "points", "density"], default="auto",
+                        help="Scatter matrix as point pairplots or precomputed density grids")
+    parser.add_argument("--bins", type=int, default=64, help="Grid resolution of density scatter matrices")
+    parser.add_argument("--sample", type=int, default=None, help="Reservoir-sample this many dates for point scatter plots")
+    parser.add_argument("--corr_window", type=int, default=None,
+                        help="Correlate the trailing N days up to end_date (served from CORR_SNAPSHOTS when available)")
+    parser.add_argument("--output_dir", type=str, default=None, help="Save figures to this directory instead of showing them")
+    parser.add_argument("--format", dest="fmt", choices=["png", "svg"], default="png", help="Image format used with --output_dir")
+    parser.add_argument("--dtype", choices=["float32", "float64"], default="float32",
+                        help="Precision of the in-memory returns matrix")
+    add_profile_argument(parser)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    enable_from_args(args)
+    run_analysis(args.outputs, args.symbols, args.start_date, args.end_date,
+                 options=default_options(window=args.window, threshold=args.threshold, topology=args.topology,
+                                         k=args.k, layout_cache=args.layout_cache, scatter_mode=args.scatter_mode,
+                                         bins=args.bins, sample=args.sample, corr_window=args.corr_window,
+                                         dtype=args.dtype,
+                                         output_dir=args.output_dir, fmt=args.fmt))
@@ -0,0 +1,313 @@
+# api_server.py
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+import traceback
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+import numpy as np
+
+# The API never opens a window
+os.environ.setdefault("PLOT_HEADLESS", "1")
+
+from analytics import AnalysisPipeline
+from corr_snapshots import open_snapshots
+from export_web_data import FULL_FILE, WEB_DATA_DIR
+from sector_scoring import score_records
+
+# Bounds of the in-process response cache
+CACHE_ENTRIES = 256
+CACHE_BYTES = 64 * 2**20
+# Seconds a cached response is served before being recomputed (new prices may have been ingested)
+CACHE_TTL = 300
+
+# Bodies smaller than this are sent uncompressed (gzip would not pay for its header)
+GZIP_MIN_BYTES = 1024
+
+# Bounded LRU of encoded responses: key -> (etag, body, gzipped body, stored at)
+
+class ResponseCache:
+    def __init__(self, max_entries=CACHE_ENTRIES, max_bytes=CACHE_BYTES, ttl=CACHE_TTL):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _size(entry):
+        return len(entry[1]) + (len(entry[2]) if entry[2] is not None else 0)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[3] > self.ttl:
+                if entry is not None:
+                    self._bytes -= self._size(self._entries.pop(key))
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, entry):
+        size = self._size(entry)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._size(self._entries.pop(key))
+            self._entries[key] = entry
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= self._size(evicted)
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes, "hits": self.hits, "misses": self.misses}
+
+# Encode a payload once: JSON body, strong ETag over it, and the gzipped body when worth it
+
+def encode_response(payload):
+    body = json.dumps(payload, separators=(",", ":"), allow_nan=False).encode("utf-8")
+    etag = '"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+    compressed = gzip.compress(body, compresslevel=6, mtime=0) if len(body) >= GZIP_MIN_BYTES else None
+    return etag, body, compressed, time.monotonic()
+
+# JSON has no NaN: missing values become null
+
+def _json_values(values):
+    values = np.asarray(values, dtype=np.float64)
+    return np.where(np.isnan(values), None, values.round(6)).tolist()
+
+def _dates(index):
+    return [str(day)[:10] for day in np.asarray(index, dtype="datetime64[D]")]
+
+def _symbols(query):
+    symbols = [symbol for value in query.get("symbols", []) for symbol in value.split(",") if symbol]
+    if not symbols:
+        raise ValueError("Parameter 'symbols' is required (comma-separated symbols or names)")
+    return symbols
+
+def _int(query, name, default=None):
+    if name not in query:
+        return default
+    try:
+        return int(query[name][-1])
+    except ValueError:
+        raise ValueError(f"Parameter '{name}' must be an integer")
+
+def _param(query, name):
+    return query[name][-1] if name in query else None
+
+# Dates are checked before they reach the store, so a malformed one is a 400 rather than a failed query
+
+def _date(query, name):
+    value = _param(query, name)
+    if value is not None:
+        try:
+            date.fromisoformat(value)
+        except ValueError:
+            raise ValueError(f"Parameter '{name}' must be a date (YYYY-MM-DD)")
+    return value
+
+class FinanceAPI:
+    """
+    Endpoints over a price store (PostgreSQL or Parquet, see price_store.open_store), the correlation
+    snapshots and the scored web dataset. Store calls are serialized by a lock, since the PostgreSQL
+    store shares one connection between the server threads.
+    """
+
+    def __init__(self, store, snapshots=None, dataset=os.path.join(WEB_DATA_DIR, FULL_FILE), cache=None):
+        self.store = store
+        self.snapshots = snapshots
+        self.dataset = dataset
+        self.cache = cache or ResponseCache()
+        self._store_lock = threading.Lock()
+        self.routes = {
+            "/health": self.health,
+            "/prices": self.prices,
+            "/correlation": self.correlation,
+            "/rolling": self.rolling,
+            "/scores": self.scores,
+        }
+
+    # Serialized store access; any failure rolls the shared connection back before the error propagates
+    @contextmanager
+    def _locked_store(self):
+        with self._store_lock:
+            try:
+                yield self.store
+            except Exception:
+                self.store.rollback()
+                raise
+
+    def _pipeline(self, query, corr_window=None):
+        return AnalysisPipeline(self.store, _symbols(query), _date(query, "start"), _date(query, "end"),
+                                corr_window=corr_window, snapshots=self.snapshots)
+
+    def health(self, query):
+        return {"status": "ok", "cache": self.cache.stats()}
+
+    # /prices?symbols=AIR.PA,MC.PA&start=2024-01-01&end=2024-12-31 -> dates plus one close column per symbol
+    def prices(self, query):
+        start, end = _date(query, "start"), _date(query, "end")
+        with self._locked_store() as store:
+            symbols, missing = store.validate_symbols_or_names(_symbols(query), use_cache=True)
+            if missing:
+                raise ValueError(f"Inputs not found: {', '.join(missing)}")
+            values, dates, columns = store.load_price_matrix(symbols, start, end)
+        return {"dates": _dates(dates), "symbols": list(columns),
+                "close": {symbol: _json_values(values[:, k]) for symbol, k in columns.items()}}
+
+    # /correlation?symbols=...&start&end[&window=N] -> sub-matrix over the requested symbols
+    # With `window`, the trailing correlation as of `end` (read from a snapshot when one covers it)
+    def correlation(self, query):
+        with self._locked_store():
+            pipeline = self._pipeline(query, corr_window=_int(query, "window"))
+            matrix = pipeline.correlation
+        return {"symbols": list(matrix.columns), "matrix": _json_values(matrix.to_numpy())}
+
+    # /rolling?symbols=A,B&window=30&start&end -> rolling correlation of the first two symbols
+    def rolling(self, query):
+        with self._locked_store():
+            pipeline = self._pipeline(query)
+            window = _int(query, "window", 30)
+            series = pipeline.rolling(window)
+        return {"pair": list(pipeline.pair()), "window": window, "dates": _dates(series.index.values),
+                "values": _json_values(series.to_numpy())}
+
+    # /scores[?sector=Technology] -> precomputed sector scores of the exported dataset
+    def scores(self, query):
+        with open(self.dataset, encoding="utf-8") as f:
+            records = json.load(f)
+        if any("score" not in record for record in records):
+            score_records(records)
+        sector = _param(query, "sector")
+        return [{field: record.get(field) for field in ("symbol", "name", "sector", "score", "scoreMissing")}
+                for record in records if sector is None or record.get("sector") == sector]
+
+    # Cache key: route plus normalized query; /scores also depends on the dataset's modification time
+    def _key(self, path, query):
+        key = (path, tuple(sorted((name, tuple(values)) for name, values in query.items())))
+        if path == "/scores":
+            key += (os.path.getmtime(self.dataset),)
+        return key
+
+    def respond(self, path, query):
+        """
+        Return (status, entry) for a GET, serving from the cache when possible; entry is the
+        (etag, body, gzipped body, stored at) tuple of encode_response. Invalid parameters give a
+        400; any other exception propagates (the handler answers 500).
+        """
+        handler = self.routes.get(path)
+        if handler is None:
+            return 404, encode_response({"error": f"Unknown endpoint {path}"})
+        if path == "/health":
+            return 200, encode_response(handler(query))
+        key = self._key(path, query)
+        entry = self.cache.get(key)
+        if entry is None:
+            try:
+                entry = encode_response(handler(query))
+            except ValueError as e:
+                return 400, encode_response({"error": str(e)})
+            self.cache.put(key, entry)
+        return 200, entry
+
+class APIRequestHandler(BaseHTTPRequestHandler):
+    # Keep-alive: every response carries Content-Length
+    protocol_version = "HTTP/1.1"
+    api = None
+    quiet = False
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        try:
+            status, (etag, body, compressed, _) = self.api.respond(url.path.rstrip("/") or "/", parse_qs(url.query))
+        except Exception:
+            # Details go to the server log only
+            self.log_error("%s", traceback.format_exc())
+            status, (etag, body, compressed, _) = 500, encode_response({"error": "Internal server error"})
+
+        if status == 200 and etag in (tag.strip() for tag in self.headers.get("If-None-Match", "").split(",")):
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Vary", "Accept-Encoding")
+            self.end_headers()
+            return
+
+        gzipped = compressed is not None and "gzip" in self.headers.get("Accept-Encoding", "")
+        payload = compressed if gzipped else body
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.send_header("Vary", "Accept-Encoding")
+        if status == 200:
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")
+        if gzipped:
+            self.send_header("Content-Encoding", "gzip")
+        self.end_headers()
+        self.wfile.write(payload)
+
+    # --quiet drops the per-request lines; errors are still logged
+    def log_request(self, code="-", size="-"):
+        if not self.quiet:
+            super().log_request(code, size)
+
+class APIServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Listen backlog; with the socketserver default of 5, bursts of clients wait out a 1 s SYN retry
+    request_queue_size = 128
+
+def make_server(api, host="127.0.0.1", port=8000, quiet=False):
+    handler = type("BoundAPIRequestHandler", (APIRequestHandler,), {"api": api, "quiet": quiet})
+    return APIServer((host, port), handler)
+
+# Parse CLI arguments
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Local HTTP API serving prices, correlations and scores")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Interface to listen on")
+    parser.add_argument("--port", type=int, default=8000, help="Port to listen on")
+    parser.add_argument("--store", type=str, default=None,
+                        help="'postgres' or 'parquet:<directory>' (defaults to PRICE_STORE, then postgres)")
+    parser.add_argument("--snapshots", type=str, default=None, help="Correlation snapshot directory (or CORR_SNAPSHOTS)")
+    parser.add_argument("--dataset", type=str, default=os.path.join(WEB_DATA_DIR, FULL_FILE),
+                        help="Exported data.json serving /scores")
+    parser.add_argument("--cache_entries", type=int, default=CACHE_ENTRIES, help="Responses kept in the LRU cache")
+    parser.add_argument("--cache_mb", type=int, default=CACHE_BYTES // 2**20, help="Memory bound of the LRU cache")
+    parser.add_argument("--cache_ttl", type=float, default=CACHE_TTL, help="Seconds a cached response stays valid")
+    parser.add_argument("--quiet", action="store_true", help="Do not log every request")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    from price_store import open_store
+
+    args = parse_arguments()
+    store = open_store(args.store)
+    cache = ResponseCache(args.cache_entries, args.cache_mb * 2**20, args.cache_ttl)
+    server = make_server(FinanceAPI(store, open_snapshots(args.snapshots), args.dataset, cache),
+                         args.host, args.port, quiet=args.quiet)
+    print(f"Serving on http://{args.host}:{args.port} (/prices, /correlation, /rolling, /scores, /health)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        store.close()
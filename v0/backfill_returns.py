@@ -0,0 +1,22 @@
+# backfill_returns.py
+import argparse
+from db_utils import connect_to_postgres, ensure_returns_table, backfill_returns
+
+# Parse CLI arguments
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Build the stock_returns table from the existing stock_data history")
+    parser.add_argument("symbols", nargs="*", help="Symbols to backfill (all stored symbols if omitted)")
+    parser.add_argument("--batch_size", type=int, default=500, help="Symbols processed per statement")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    conn = connect_to_postgres()
+    try:
+        ensure_returns_table(conn)
+        written = backfill_returns(conn, args.symbols or None, batch_size=args.batch_size)
+        print(f"{written} daily returns written to stock_returns.")
+    finally:
+        conn.close()
@@ -0,0 +1,212 @@
+# batch_runner.py
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+import numpy as np
+import pandas as pd
+
+# Batch figures are always rendered headless
+os.environ.setdefault("PLOT_HEADLESS", "1")
+
+from data_utils import calculate_rolling_correlations
+from plot_utils import figure_to_bytes, plot_heatmap
+from price_matrix import PriceMatrix
+
+# Outputs a job can request
+JOB_OUTPUTS = ("correlation", "rolling", "heatmap")
+# Fields a job may leave out
+JOB_DEFAULTS = {"outputs": ["correlation"], "window": 30}
+
+# Read a job file: a JSON list of jobs (or one job per line), each like
+# {"id": "cac40_2023", "symbols": ["AIR.PA", ...], "start_date": "2023-01-01", "end_date": "2023-12-31",
+#  "outputs": ["correlation", "heatmap"], "window": 30}
+
+def read_jobs(path):
+    with open(path) as f:
+        text = f.read()
+    try:
+        jobs = json.loads(text)
+    except json.JSONDecodeError:
+        jobs = [json.loads(line) for line in text.splitlines() if line.strip()]
+    return [{**JOB_DEFAULTS, "id": f"job_{k}", **job} if isinstance(job, dict) else job
+            for k, job in enumerate(jobs)]
+
+# Why a job cannot run, or None; run_batch reports it under the job's id like missing inputs
+
+def job_error(job):
+    if not isinstance(job, dict):
+        return "A job must be a JSON object"
+    symbols = job.get("symbols")
+    if not isinstance(symbols, list) or not symbols or not all(isinstance(symbol, str) for symbol in symbols):
+        return "'symbols' must be a non-empty list of symbols or names"
+    outputs = job.get("outputs", JOB_DEFAULTS["outputs"])
+    if not isinstance(outputs, list):
+        return "'outputs' must be a list"
+    unknown = set(outputs) - set(JOB_OUTPUTS)
+    if unknown:
+        return f"Unknown outputs {', '.join(sorted(map(str, unknown)))}"
+    window = job.get("window", JOB_DEFAULTS["window"])
+    if not isinstance(window, int) or isinstance(window, bool) or window < 2:
+        return "'window' must be an integer of at least 2"
+    return None
+
+# Copy a returns matrix into a named shared-memory block that worker processes map without copying
+
+def share_matrix(matrix):
+    block = shared_memory.SharedMemory(create=True, size=max(matrix.values.nbytes, 1))
+    shared = np.ndarray(matrix.shape, dtype=matrix.dtype, buffer=block.buf)
+    shared[...] = matrix.values
+    return block, {"name": block.name, "shape": matrix.shape, "dtype": matrix.dtype.str,
+                   "dates": matrix.dates, "symbols": matrix.symbols}
+
+# Worker state: the shared matrix, attached once per process
+
+_worker = {}
+
+def _attach(spec, names):
+    block = shared_memory.SharedMemory(name=spec["name"])
+    values = np.ndarray(spec["shape"], dtype=np.dtype(spec["dtype"]), buffer=block.buf)
+    values.flags.writeable = False
+    _worker["block"] = block
+    _worker["matrix"] = PriceMatrix(values, spec["dates"], spec["symbols"])
+    _worker["names"] = names
+
+# Run one job against the shared matrix; writes its outputs to <output_dir>/<job id>/
+
+def run_job(job, output_dir):
+    timings = {}
+    started = time.perf_counter()
+    directory = os.path.join(output_dir, job["id"])
+    os.makedirs(directory, exist_ok=True)
+
+    start = time.perf_counter()
+    # Date slice is a view of the shared block; only the job's own columns are gathered
+    matrix = _worker["matrix"].between(job.get("start_date"), job.get("end_date")).select(job["symbols"])
+    available = set(matrix.available())
+    for symbol in job["symbols"]:
+        if symbol not in available:
+            raise ValueError(f"Could not find data for {symbol}")
+    # Gathered columns are this job's own copy and can be compacted in place; views of the block are read-only
+    matrix = matrix.complete_rows(inplace=matrix.values.flags.writeable)
+    timings["slice"] = time.perf_counter() - start
+
+    correlation = None
+    if "correlation" in job["outputs"] or "heatmap" in job["outputs"]:
+        start = time.perf_counter()
+        correlation = matrix.correlation()
+        timings["correlation"] = time.perf_counter() - start
+        if "correlation" in job["outputs"]:
+            correlation.to_csv(os.path.join(directory, "correlation.csv"))
+
+    if "rolling" in job["outputs"]:
+        start = time.perf_counter()
+        returns = matrix.to_frame()
+        rolling, dates, pairs = calculate_rolling_correlations(returns, matrix.symbols, [job["window"]])
+        frame = pd.DataFrame(rolling[job["window"]], index=dates, columns=[f"{a}|{b}" for a, b in pairs])
+        frame.to_csv(os.path.join(directory, f"rolling_{job['window']}.csv"))
+        timings["rolling"] = time.perf_counter() - start
+
+    if "heatmap" in job["outputs"]:
+        start = time.perf_counter()
+        names = _worker["names"]
+        named = correlation.rename(columns=lambda s: names.get(s) or s, index=lambda s: names.get(s) or s)
+        with open(os.path.join(directory, "heatmap.png"), "wb") as f:
+            f.write(figure_to_bytes(plot_heatmap(named, title=f"Return Correlation Matrix ({job['id']})")))
+        timings["heatmap"] = time.perf_counter() - start
+
+    timings["total"] = time.perf_counter() - started
+    return {"id": job["id"], "dates": len(matrix), "symbols": len(matrix.symbols), "timings": timings}
+
+# Resolve every job, load the union of their symbols and dates once, share it and fan the jobs out
+
+def run_batch(jobs, output_dir, store, processes=None, dtype=np.float32):
+    os.makedirs(output_dir, exist_ok=True)
+    started = time.perf_counter()
+    results, errors = [], []
+
+    start = time.perf_counter()
+    runnable = []
+    for k, job in enumerate(jobs):
+        job_id = str(job.get("id", f"job_{k}")) if isinstance(job, dict) else f"job_{k}"
+        error = job_error(job)
+        if error is not None:
+            errors.append({"id": job_id, "error": error})
+            continue
+        symbols, missing = store.validate_symbols_or_names(job["symbols"])
+        if missing:
+            errors.append({"id": job_id, "error": f"Inputs not found: {', '.join(missing)}"})
+            continue
+        runnable.append({**JOB_DEFAULTS, **job, "id": job_id, "symbols": list(dict.fromkeys(symbols))})
+    union = list(dict.fromkeys(symbol for job in runnable for symbol in job["symbols"]))
+    starts = [job.get("start_date") for job in runnable]
+    ends = [job.get("end_date") for job in runnable]
+    first = None if not starts or None in starts else min(starts)
+    last = None if not ends or None in ends else max(ends)
+    resolve_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    matrix = store.load_returns_matrix(union, first, last, dtype=dtype) if union else None
+    names = store.get_symbol_names(union) if union else {}
+    load_time = time.perf_counter() - start
+    if matrix is not None:
+        print(f"Loaded {matrix} for {len(runnable)} jobs in {load_time:.2f} s")
+
+    block = None
+    try:
+        if runnable:
+            block, spec = share_matrix(matrix)
+            del matrix
+            with ProcessPoolExecutor(max_workers=processes, initializer=_attach, initargs=(spec, names)) as executor:
+                futures = {executor.submit(run_job, job, output_dir): job["id"] for job in runnable}
+                for future in as_completed(futures):
+                    try:
+                        result = future.result()
+                        results.append(result)
+                        print(f"{result['id']}: {result['timings']['total']:.2f} s")
+                    except Exception as e:
+                        errors.append({"id": futures[future], "error": repr(e)})
+                        print(f"{futures[future]} failed: {e}")
+    finally:
+        if block is not None:
+            block.close()
+            block.unlink()
+
+    summary = {
+        "jobs": len(jobs),
+        "succeeded": len(results),
+        "failed": errors,
+        "resolve_seconds": resolve_time,
+        "load_seconds": load_time,
+        "wall_seconds": time.perf_counter() - started,
+        "results": sorted(results, key=lambda result: result["id"]),
+    }
+    with open(os.path.join(output_dir, "timings.json"), "w") as f:
+        json.dump(summary, f, indent=2)
+    print(f"{len(results)}/{len(jobs)} jobs done in {summary['wall_seconds']:.2f} s; "
+          f"timings written to {os.path.join(output_dir, 'timings.json')}")
+    return summary
+
+# Parse CLI arguments
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Run many analysis jobs over one shared, once-loaded returns matrix")
+    parser.add_argument("jobs", type=str, help="Job file (JSON list or one JSON job per line)")
+    parser.add_argument("output_dir", type=str, help="Directory receiving per-job results and timings.json")
+    parser.add_argument("--processes", type=int, default=None, help="Worker processes (all cores if omitted)")
+    parser.add_argument("--dtype", choices=["float32", "float64"], default="float32",
+                        help="Precision of the shared returns matrix")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    from price_store import open_store
+
+    args = parse_arguments()
+    store = open_store()
+    try:
+        run_batch(read_jobs(args.jobs), args.output_dir, store, processes=args.processes, dtype=np.dtype(args.dtype))
+    finally:
+        store.close()
@@ -0,0 +1,108 @@
+# bench_api.py
+import argparse
+import json
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+# Default request mix, relative to --url; {symbols} is replaced by the first symbols given
+DEFAULT_PATHS = (
+    "/prices?symbols={symbols}",
+    "/correlation?symbols={symbols}",
+    "/correlation?symbols={symbols}&window=90",
+    "/rolling?symbols={symbols}&window=30",
+    "/scores",
+)
+
+# One GET; returns (status, seconds, bytes received, etag)
+
+def fetch(url, gzip=True, etag=None, timeout=60):
+    request = urllib.request.Request(url)
+    if gzip:
+        request.add_header("Accept-Encoding", "gzip")
+    if etag:
+        request.add_header("If-None-Match", etag)
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            body = response.read()
+            return response.status, time.perf_counter() - start, len(body), response.headers.get("ETag")
+    except urllib.error.HTTPError as e:
+        body = e.read()
+        return e.code, time.perf_counter() - start, len(body), e.headers.get("ETag")
+
+# Send `requests` GETs cycling through `urls` from `concurrency` threads; with `revalidate`, each URL's
+# warm-up ETag is sent as If-None-Match, as a browser with a warm cache would
+
+def run_load(urls, requests=1000, concurrency=8, gzip=True, revalidate=False):
+    etags = {}
+    for url in urls:
+        status, _, _, etag = fetch(url, gzip)
+        if status != 200:
+            raise RuntimeError(f"{url} answered {status} during warm-up")
+        etags[url] = etag
+
+    plan = [urls[k % len(urls)] for k in range(requests)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(lambda url: fetch(url, gzip, etags[url] if revalidate else None), plan))
+    wall = time.perf_counter() - start
+
+    latencies = np.array([seconds for _, seconds, _, _ in results]) * 1000
+    per_path = {}
+    for url in urls:
+        mine = latencies[[k for k, planned in enumerate(plan) if planned == url]]
+        per_path[url] = {"p50_ms": float(np.percentile(mine, 50)), "p99_ms": float(np.percentile(mine, 99))}
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "gzip": gzip,
+        "revalidate": revalidate,
+        "wall_seconds": wall,
+        "throughput_rps": requests / wall,
+        "statuses": dict(Counter(status for status, _, _, _ in results)),
+        "bytes_received": int(sum(size for _, _, size, _ in results)),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p90_ms": float(np.percentile(latencies, 90)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+        "max_ms": float(latencies.max()),
+        "paths": per_path,
+    }
+
+def print_report(report):
+    print(f"{report['requests']} requests, {report['concurrency']} clients, gzip={report['gzip']}, "
+          f"revalidate={report['revalidate']}: {report['throughput_rps']:.0f} req/s, "
+          f"{report['bytes_received'] / 1024:.0f} KiB received, statuses {report['statuses']}")
+    print(f"  latency p50 {report['p50_ms']:.2f} ms  p90 {report['p90_ms']:.2f} ms  "
+          f"p99 {report['p99_ms']:.2f} ms  max {report['max_ms']:.2f} ms")
+    for url, stats in report["paths"].items():
+        print(f"  {url:<70} p50 {stats['p50_ms']:8.2f} ms  p99 {stats['p99_ms']:8.2f} ms")
+
+# Parse CLI arguments
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Load-test the local API and report p50/p99 latency")
+    parser.add_argument("--url", type=str, default="http://127.0.0.1:8000", help="Base URL of api_server.py")
+    parser.add_argument("--symbols", nargs="+", default=["AIR.PA", "MC.PA", "OR.PA", "TTE.PA"],
+                        help="Symbols used by the default request mix")
+    parser.add_argument("--paths", nargs="*", default=None, help="Request paths (overrides the default mix)")
+    parser.add_argument("--requests", type=int, default=1000, help="Total requests")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent clients")
+    parser.add_argument("--no_gzip", action="store_true", help="Do not send Accept-Encoding: gzip")
+    parser.add_argument("--revalidate", action="store_true", help="Send If-None-Match with the warm-up ETags")
+    parser.add_argument("--output", type=str, default=None, help="Write the report to this JSON file")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    paths = args.paths or [path.format(symbols=",".join(args.symbols)) for path in DEFAULT_PATHS]
+    report = run_load([args.url.rstrip("/") + path for path in paths], args.requests, args.concurrency,
+                      gzip=not args.no_gzip, revalidate=args.revalidate)
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
@@ -0,0 +1,66 @@
+# bench_insert.py
+import argparse
+import time
+from db_utils import connect_to_postgres, insert_stock_data, bulk_insert_stock_data, ensure_returns_table
+from synthetic_data import synthetic_frames
+
+# Prefix of the throwaway symbols written by the benchmark (removed afterwards)
+BENCH_PREFIX = "_BENCH_"
+
+# Remove every benchmark row so each run starts from the same state
+
+def cleanup(conn):
+    pattern = BENCH_PREFIX.replace("_", r"\_") + "%"
+    with conn.cursor() as cursor:
+        cursor.execute("DELETE FROM stock_data WHERE symbol LIKE %s", (pattern,))
+        cursor.execute("DELETE FROM stock_returns WHERE symbol LIKE %s", (pattern,))
+    conn.commit()
+
+# Time the row-by-row execute_batch path against the COPY-based bulk loader
+
+def run_benchmark(conn, n_symbols, n_days):
+    frames = synthetic_frames(n_symbols, n_days, prefix=BENCH_PREFIX)
+    n_rows = n_symbols * n_days
+    results = {}
+
+    ensure_returns_table(conn)
+    cleanup(conn)
+    start = time.perf_counter()
+    for symbol, data in frames.items():
+        insert_stock_data(conn, symbol, data)
+    results["execute_batch"] = time.perf_counter() - start
+
+    cleanup(conn)
+    start = time.perf_counter()
+    bulk_insert_stock_data(conn, frames)
+    results["copy"] = time.perf_counter() - start
+
+    # Second bulk run hits existing rows only: measures the conflict-skipping merge
+    start = time.perf_counter()
+    inserted, skipped = bulk_insert_stock_data(conn, frames)
+    results["copy_all_existing"] = time.perf_counter() - start
+    cleanup(conn)
+
+    print(f"\n{n_symbols} symbols x {n_days} days = {n_rows} rows")
+    for name, seconds in results.items():
+        print(f"{name:>20}: {seconds:8.3f} s  ({n_rows / seconds:,.0f} rows/s)")
+    print(f"{'speedup':>20}: {results['execute_batch'] / results['copy']:8.1f}x")
+    print(f"{'re-run':>20}: {inserted} inserted, {skipped} skipped")
+    return results
+
+# Parse CLI arguments
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Benchmark execute_batch vs COPY ingestion into stock_data")
+    parser.add_argument("--symbols", type=int, default=20, help="Number of synthetic symbols")
+    parser.add_argument("--days", type=int, default=2500, help="Number of trading days per symbol")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    conn = connect_to_postgres()
+    try:
+        run_benchmark(conn, args.symbols, args.days)
+    finally:
+        conn.close()
@@ -0,0 +1,266 @@
+# bench_pipeline.py
+import argparse
+import asyncio
+import json
+import os
+import platform
+import time
+from contextlib import contextmanager
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+# Benchmarks never open a window
+os.environ.setdefault("PLOT_HEADLESS", "1")
+
+from data_utils import calculate_correlation_matrix, calculate_rolling_correlations
+from db_utils import build_symbol_index, resolve_with_index, split_resolved, price_matrix_to_frame
+from fetch_data import fetch_many
+from plot_utils import figure_to_bytes, plot_heatmap
+from price_matrix import PriceMatrix
+from synthetic_data import MISSING_PATTERNS, StubDownloader, synthetic_frames
+
+# Stages timed for every backend, in pipeline order
+STAGES = ("resolve", "insert", "load", "pivot", "returns", "correlation", "rolling", "render")
+
+# Scratch schema used by the PostgreSQL backend (dropped after each run)
+BENCH_SCHEMA = "bench_pipeline"
+
+# Rolling windows computed by the rolling stage
+ROLLING_WINDOWS = (30, 90)
+
+# Stage timings under this many seconds are never reported as regressions (timer noise)
+REGRESSION_FLOOR = 0.005
+
+@contextmanager
+def _timed(timings, stage):
+    start = time.perf_counter()
+    yield
+    timings[stage] = time.perf_counter() - start
+
+# Half the universe is requested by symbol and half by company name, like user input
+
+def _inputs(frames):
+    return [symbol if k % 2 == 0 else f"Company {symbol}" for k, symbol in enumerate(frames)]
+
+# Returns of the in-memory path, defined like stock_returns (LAG over each symbol's own rows) and
+# without dropping incomplete dates, so both backends feed the same returns to the analysis stages
+
+def _memory_returns(pivoted):
+    returns = PriceMatrix.from_frame(pivoted).to_returns().complete_rows(inplace=True, how="all")
+    return price_matrix_to_frame(returns.values, pd.DatetimeIndex(returns.dates, name="date"), returns.columns)
+
+# The render stage draws and encodes the figure itself: render_plot's cache would turn every
+# repeat after the first into a lookup
+
+def _analysis_stages(timings, returns, symbols):
+    with _timed(timings, "correlation"):
+        correlation = calculate_correlation_matrix(returns, symbols)
+    with _timed(timings, "rolling"):
+        calculate_rolling_correlations(returns, symbols, ROLLING_WINDOWS)
+    with _timed(timings, "render"):
+        figure_to_bytes(plot_heatmap(correlation, title="Benchmark"))
+
+# In-memory path: stub downloads into a long pandas table standing in for stock_data
+
+def run_memory(frames, start_date, end_date, downloader, workers):
+    timings = {}
+    with _timed(timings, "resolve"):
+        index = build_symbol_index([(symbol, f"Company {symbol}") for symbol in frames])
+        inputs = _inputs(frames)
+        symbols, missing = split_resolved(inputs, resolve_with_index(index, inputs))
+    with _timed(timings, "insert"):
+        parts = []
+        for symbol, data, _ in fetch_many(symbols, start_date, end_date, downloader=downloader, max_workers=workers):
+            parts.append(pd.DataFrame({"symbol": symbol, "date": data.index, "close": data["Close"].to_numpy()}))
+        table = pd.concat(parts, ignore_index=True)
+    with _timed(timings, "load"):
+        rows = table[table["symbol"].isin(symbols) & (table["date"] >= start_date) & (table["date"] < end_date)]
+    with _timed(timings, "pivot"):
+        pivoted = rows.pivot(index="date", columns="symbol", values="close")[symbols]
+    with _timed(timings, "returns"):
+        returns = _memory_returns(pivoted)
+    _analysis_stages(timings, returns, symbols)
+    return timings
+
+# PostgreSQL path in a scratch schema: pipeline ingest from the stub downloader, then the
+# same reads the analysis scripts issue (materialized returns included)
+
+def _scratch_connection():
+    from db_utils import connect_to_postgres
+    conn = connect_to_postgres()
+    with conn.cursor() as cursor:
+        cursor.execute(f"CREATE SCHEMA IF NOT EXISTS {BENCH_SCHEMA};")
+        cursor.execute(f"SET search_path TO {BENCH_SCHEMA};")
+    conn.commit()
+    return conn
+
+def run_postgres(frames, start_date, end_date, downloader, workers):
+    from db_utils import validate_symbols_or_names, load_price_matrix, load_returns_frame
+    from ingest_pipeline import ingest_ranges
+    from schema import migrate
+
+    timings = {}
+    conn = _scratch_connection()
+    try:
+        migrate(conn)
+        with conn.cursor() as cursor:
+            cursor.execute(
+                "INSERT INTO index_info (symbol, name) SELECT unnest(%s::text[]), unnest(%s::text[]);",
+                (list(frames), [f"Company {symbol}" for symbol in frames])
+            )
+        conn.commit()
+
+        with _timed(timings, "resolve"):
+            symbols, missing = validate_symbols_or_names(conn, _inputs(frames))
+        with _timed(timings, "insert"):
+            asyncio.run(ingest_ranges([(symbol, start_date, end_date) for symbol in symbols],
+                                      connect=_scratch_connection, downloader=downloader, fetch_workers=workers))
+        with conn.cursor() as cursor:
+            cursor.execute("ANALYZE;")
+        conn.commit()
+        with _timed(timings, "load"):
+            matrix = load_price_matrix(conn, symbols, start_date, end_date)
+        with _timed(timings, "pivot"):
+            price_matrix_to_frame(*matrix)
+        with _timed(timings, "returns"):
+            returns = load_returns_frame(conn, symbols, start_date, end_date, complete=False)
+        _analysis_stages(timings, returns, symbols)
+    finally:
+        conn.rollback()
+        with conn.cursor() as cursor:
+            cursor.execute(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE;")
+        conn.commit()
+        conn.close()
+    return timings
+
+BACKENDS = {"memory": run_memory, "postgres": run_postgres}
+
+# Log-log slope of stage time against universe size, per stage (1 = linear, 2 = quadratic)
+
+def scaling_exponents(runs, backend, n_days):
+    points = sorted((run["n_symbols"], run["stages"]) for run in runs
+                    if run["backend"] == backend and run["n_days"] == n_days)
+    if len(points) < 2:
+        return {}
+    sizes = np.log([n for n, _ in points])
+    return {
+        stage: float(np.polyfit(sizes, np.log([max(stages[stage], 1e-6) for _, stages in points]), 1)[0])
+        for stage in STAGES
+    }
+
+# Compare runs with a baseline result file; a stage regresses when it is slower than the baseline
+# by more than `tolerance` (relative) and REGRESSION_FLOOR (absolute)
+
+def find_regressions(runs, baseline, tolerance):
+    reference = {(run["backend"], run["n_symbols"], run["n_days"]): run["stages"] for run in baseline["runs"]}
+    regressions = []
+    for run in runs:
+        before = reference.get((run["backend"], run["n_symbols"], run["n_days"]))
+        if before is None:
+            continue
+        for stage, seconds in run["stages"].items():
+            if stage in before and seconds > before[stage] * (1 + tolerance) and seconds - before[stage] > REGRESSION_FLOOR:
+                regressions.append((run["backend"], run["n_symbols"], run["n_days"], stage, before[stage], seconds))
+    return regressions
+
+def plot_scaling(runs, path):
+    import matplotlib.pyplot as plt
+    groups = sorted({(run["backend"], run["n_days"]) for run in runs})
+    fig, axes = plt.subplots(1, len(groups), figsize=(6 * len(groups), 5), squeeze=False)
+    for ax, (backend, n_days) in zip(axes[0], groups):
+        points = sorted((run["n_symbols"], run["stages"]) for run in runs
+                        if run["backend"] == backend and run["n_days"] == n_days)
+        for stage in STAGES:
+            ax.plot([n for n, _ in points], [stages[stage] for _, stages in points], marker="o", label=stage)
+        ax.set_xscale("log")
+        ax.set_yscale("log")
+        ax.set_xlabel("Symbols")
+        ax.set_ylabel("Seconds")
+        ax.set_title(f"{backend}, {n_days} days")
+        ax.grid(True, which="both", alpha=0.3)
+        ax.legend(fontsize=8)
+    fig.tight_layout()
+    fig.savefig(path)
+    plt.close(fig)
+
+def run_suite(backends, sizes, missing, missing_rate, repeat, workers, latency, seed=0):
+    runs = []
+    for n_symbols, n_days in sizes:
+        frames = synthetic_frames(n_symbols, n_days, seed=seed, missing=missing, missing_rate=missing_rate)
+        dates = pd.bdate_range("2000-01-03", periods=n_days)
+        # yfinance-style exclusive end date one day after the last generated day
+        start_date, end_date = dates[0], dates[-1] + pd.Timedelta(days=1)
+        for backend in backends:
+            best = {}
+            for _ in range(repeat):
+                downloader = StubDownloader(frames=frames, latency=latency)
+                timings = BACKENDS[backend](frames, start_date, end_date, downloader, workers)
+                best = {stage: min(seconds, best.get(stage, seconds)) for stage, seconds in timings.items()}
+            runs.append({"backend": backend, "n_symbols": n_symbols, "n_days": n_days, "stages": best})
+            print(f"{backend:>8} {n_symbols:6d} x {n_days:5d}: " +
+                  "  ".join(f"{stage} {best[stage]:.3f}s" for stage in STAGES))
+    return runs
+
+def _size(text):
+    n_symbols, n_days = text.lower().split("x")
+    return int(n_symbols), int(n_days)
+
+# Parse CLI arguments
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Time every pipeline stage on deterministic synthetic data")
+    parser.add_argument("--backends", nargs="+", choices=list(BACKENDS), default=["memory"],
+                        help="Storage paths to benchmark (postgres needs a reachable database)")
+    parser.add_argument("--sizes", nargs="+", type=_size, default=[(10, 1000), (50, 1000), (200, 1000)],
+                        help="Universe sizes as SYMBOLSxDAYS")
+    parser.add_argument("--missing", choices=list(MISSING_PATTERNS), default="random", help="Missing-data pattern")
+    parser.add_argument("--missing_rate", type=float, default=0.02, help="Fraction of days removed per symbol")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per size (best time per stage is kept)")
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent stub downloads")
+    parser.add_argument("--latency", type=float, default=0.0, help="Simulated seconds per download")
+    parser.add_argument("--output", type=str, default="bench_pipeline.json", help="JSON result file")
+    parser.add_argument("--plot", type=str, default=None, help="Save scaling curves to this image")
+    parser.add_argument("--baseline", type=str, default=None, help="Earlier result file to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown against the baseline")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    runs = run_suite(args.backends, args.sizes, args.missing, args.missing_rate, args.repeat,
+                     args.workers, args.latency)
+
+    scaling = {}
+    for backend in args.backends:
+        for n_days in sorted({n_days for _, n_days in args.sizes}):
+            exponents = scaling_exponents(runs, backend, n_days)
+            if exponents:
+                scaling[f"{backend}/{n_days}"] = exponents
+                print(f"Scaling exponents ({backend}, {n_days} days): " +
+                      "  ".join(f"{stage} {value:.2f}" for stage, value in exponents.items()))
+
+    result = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "missing": args.missing,
+        "missing_rate": args.missing_rate,
+        "runs": runs,
+        "scaling": scaling,
+    }
+    with open(args.output, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"Results written to {args.output}")
+    if args.plot:
+        plot_scaling(runs, args.plot)
+        print(f"Scaling curves written to {args.plot}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = find_regressions(runs, json.load(f), args.tolerance)
+        for backend, n_symbols, n_days, stage, before, after in regressions:
+            print(f"REGRESSION {backend} {n_symbols}x{n_days} {stage}: {before:.3f}s -> {after:.3f}s")
+        if regressions:
+            raise SystemExit(1)
+        print(f"No regression beyond {args.tolerance:.0%} against {args.baseline}")
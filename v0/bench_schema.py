@@ -0,0 +1,112 @@
+# bench_schema.py
+import argparse
+import time
+from db_utils import connect_to_postgres, bulk_insert_stock_data, matrix_queries
+from schema import MIGRATIONS, check_plans, print_checks
+from synthetic_data import synthetic_frames
+
+# Scratch schemas holding the same synthetic data: a plain table with its primary key only,
+# and the layout created by the migrations (yearly partitions + covering primary key)
+FLAT_SCHEMA = "bench_schema_flat"
+MIGRATED_SCHEMA = "bench_schema_migrated"
+
+def _create_flat(cursor):
+    cursor.execute("CREATE TABLE index_info (symbol TEXT PRIMARY KEY, name TEXT);")
+    cursor.execute("""
+        CREATE TABLE stock_data (
+            symbol TEXT NOT NULL, date DATE NOT NULL,
+            open DOUBLE PRECISION, high DOUBLE PRECISION, low DOUBLE PRECISION,
+            close DOUBLE PRECISION, volume BIGINT,
+            PRIMARY KEY (symbol, date)
+        );
+    """)
+
+def _create_migrated(cursor):
+    for _, step in MIGRATIONS[:2]:
+        step(cursor)
+
+# Build one scratch schema and fill it with the synthetic frames
+
+def setup_schema(conn, schema, create, frames):
+    with conn.cursor() as cursor:
+        cursor.execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE;")
+        cursor.execute(f"CREATE SCHEMA {schema};")
+        cursor.execute(f"SET search_path TO {schema};")
+        create(cursor)
+        cursor.execute(
+            "INSERT INTO index_info (symbol, name) SELECT unnest(%s::text[]), unnest(%s::text[]);",
+            (list(frames), [f"Company {symbol}" for symbol in frames])
+        )
+    conn.commit()
+    bulk_insert_stock_data(conn, frames, refresh_returns=False)
+    with conn.cursor() as cursor:
+        cursor.execute("ANALYZE stock_data;")
+        cursor.execute("ANALYZE index_info;")
+    conn.commit()
+
+# Time the reads the price loader issues (db_utils.matrix_queries) over a year and over the full
+# history, and name lookups
+
+def time_queries(conn, symbols, start_date, end_date, repeat):
+    queries = {
+        "year of closes": matrix_queries("stock_data", "close", symbols, start_date, end_date)[1],
+        "full history": matrix_queries("stock_data", "close", symbols, None, None)[1],
+        "name lookup": ("SELECT symbol FROM index_info WHERE name = ANY(%s);",
+                        ([f"Company {symbol}" for symbol in symbols],)),
+    }
+    timings = {}
+    with conn.cursor() as cursor:
+        for label, (query, params) in queries.items():
+            best = float("inf")
+            for _ in range(repeat):
+                start = time.perf_counter()
+                cursor.execute(query, params)
+                cursor.fetchall()
+                best = min(best, time.perf_counter() - start)
+            timings[label] = best
+    conn.commit()
+    return timings
+
+def run_benchmark(conn, n_symbols, n_days, n_queried, start_date, end_date, repeat):
+    frames = synthetic_frames(n_symbols, n_days)
+    symbols = list(frames)[:n_queried]
+    results = {}
+    try:
+        for schema, create in ((FLAT_SCHEMA, _create_flat), (MIGRATED_SCHEMA, _create_migrated)):
+            setup_schema(conn, schema, create, frames)
+            results[schema] = time_queries(conn, symbols, start_date, end_date, repeat)
+            print(f"\nQuery plans in {schema}:")
+            print_checks(check_plans(conn, symbols, start_date, end_date))
+    finally:
+        with conn.cursor() as cursor:
+            for schema in (FLAT_SCHEMA, MIGRATED_SCHEMA):
+                cursor.execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE;")
+            cursor.execute("SET search_path TO DEFAULT;")
+        conn.commit()
+
+    print(f"\n{n_symbols} symbols x {n_days} days, {len(symbols)} queried, best of {repeat}")
+    for label in results[FLAT_SCHEMA]:
+        flat, migrated = results[FLAT_SCHEMA][label], results[MIGRATED_SCHEMA][label]
+        print(f"{label:>16}: flat {flat * 1000:9.2f} ms  migrated {migrated * 1000:9.2f} ms  ({flat / migrated:5.1f}x)")
+    return results
+
+# Parse CLI arguments
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Benchmark the analysis queries on a plain vs migrated stock_data")
+    parser.add_argument("--symbols", type=int, default=500, help="Number of synthetic symbols stored")
+    parser.add_argument("--days", type=int, default=5000, help="Number of trading days per symbol")
+    parser.add_argument("--queried", type=int, default=50, help="Number of symbols read by each query")
+    parser.add_argument("--start_date", type=str, default="2010-01-01", help="Start date of the one-year read")
+    parser.add_argument("--end_date", type=str, default="2010-12-31", help="End date of the one-year read")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per query (best time is kept)")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    conn = connect_to_postgres()
+    try:
+        run_benchmark(conn, args.symbols, args.days, args.queried, args.start_date, args.end_date, args.repeat)
+    finally:
+        conn.close()
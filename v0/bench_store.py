@@ -0,0 +1,45 @@
+# bench_store.py
+import argparse
+import time
+from price_store import PostgresStore, ParquetStore
+
+# Time the same price-matrix query against every backend and report rows per second
+
+def run_benchmark(stores, n_symbols, start_date, end_date, repeat):
+    reference = next(iter(stores.values()))
+    symbols = reference.all_symbols()[:n_symbols]
+    print(f"Query: {len(symbols)} symbols, {start_date} to {end_date}, best of {repeat}")
+
+    results = {}
+    for name, store in stores.items():
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            values, dates, _ = store.load_price_matrix(symbols, start_date, end_date)
+            timings.append(time.perf_counter() - start)
+        cells = int((values == values).sum())
+        best = min(timings)
+        results[name] = best
+        print(f"{name:>10}: {best:8.3f} s  ({cells / best:,.0f} prices/s, matrix {values.shape})")
+    return results
+
+# Parse CLI arguments
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Benchmark PostgreSQL vs local Parquet price reads")
+    parser.add_argument("parquet_root", type=str, help="Directory of a Parquet store synced with price_store.py")
+    parser.add_argument("--symbols", type=int, default=100, help="Number of symbols to load")
+    parser.add_argument("--start_date", type=str, default=None, help="Start date (YYYY-MM-DD)")
+    parser.add_argument("--end_date", type=str, default=None, help="End date (YYYY-MM-DD)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per backend (best time is kept)")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    stores = {"postgres": PostgresStore(), "parquet": ParquetStore(args.parquet_root)}
+    try:
+        run_benchmark(stores, args.symbols, args.start_date, args.end_date, args.repeat)
+    finally:
+        for store in stores.values():
+            store.close()
@@ -0,0 +1,4 @@
+# conftest.py
+
+# test_query.py is a manual yfinance download script, not a test module
+collect_ignore = ["test_query.py"]
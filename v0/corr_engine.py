@@ -0,0 +1,267 @@
+# corr_engine.py
+import numpy as np
+import pandas as pd
+
+# Default number of columns per block when the matrix is computed tile by tile
+DEFAULT_BLOCK_SIZE = 1024
+
+# Variances below this many machine epsilons of the sum of squares are treated as zero
+MOMENT_TOLERANCE = 64
+
+# Standardize each column (zero mean, unit norm) so that Z.T @ Z is the correlation matrix
+
+def _standardize(values):
+    # One working copy: centered and scaled in place, norms without a squared temporary
+    centered = values - values.mean(axis=0)
+    norms = np.sqrt(np.einsum("ij,ij->j", centered, centered))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        centered /= norms
+    # Constant columns are detected exactly: centering them leaves rounding residue, not zeros
+    valid = (values.max(axis=0, initial=-np.inf) > values.min(axis=0, initial=np.inf)) & (norms > 0)
+    return centered, valid
+
+# Correlation block between two sets of standardized columns; columns with zero variance give NaN
+
+def _standardized_block(z_i, valid_i, z_j, valid_j):
+    block = z_i.T @ z_j
+    block[~valid_i, :] = np.nan
+    block[:, ~valid_j] = np.nan
+    return block
+
+# Correlation of complete (NaN-free) columns with one standardized-matrix product per block
+
+def _complete_correlation(values, block_size):
+    z, valid = _standardize(values)
+    n = values.shape[1]
+    out = np.empty((n, n), dtype=values.dtype)
+    for start in range(0, n, block_size):
+        stop = min(start + block_size, n)
+        # Only blocks on or right of the diagonal are computed, then mirrored
+        out[start:stop, start:] = _standardized_block(z[:, start:stop], valid[start:stop], z[:, start:], valid[start:])
+        out[start:, start:stop] = out[start:stop, start:].T
+    if values.shape[0] < 2:
+        out[:] = np.nan
+    return out
+
+# Centered values, presence mask and squares of a column set with missing values (zeros where missing)
+# Shifting every column by its own mean keeps the raw-moment sums well conditioned
+
+def _centered_moments(values):
+    present = ~np.isnan(values)
+    m = present.astype(values.dtype)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        column_mean = np.nan_to_num(np.where(present, values, 0).sum(axis=0) / m.sum(axis=0))
+    x = np.where(present, values - column_mean, 0).astype(values.dtype)
+    return x, m, x * x
+
+# Pairwise-complete correlation block from the moments of two column sets: each pair only uses
+# the dates where both series are present
+
+def _moment_block(moments_i, moments_j, min_periods):
+    (xi, mi, xxi), (xj, mj, xxj) = moments_i, moments_j
+    count = mi.T @ mj
+    sum_i = xi.T @ mj
+    sum_j = mi.T @ xj
+    sq_i = xxi.T @ mj
+    sq_j = mi.T @ xxj
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cov = xi.T @ xj - sum_i * sum_j / count
+        var_i = sq_i - sum_i * sum_i / count
+        var_j = sq_j - sum_j * sum_j / count
+        block = cov / np.sqrt(var_i * var_j)
+    # Variances within rounding of zero come from series that are constant over the overlap
+    tiny = MOMENT_TOLERANCE * np.finfo(xi.dtype).eps
+    block[(count < max(min_periods, 2)) | (var_i <= tiny * sq_i) | (var_j <= tiny * sq_j)] = np.nan
+    return block
+
+def _pairwise_correlation(values, block_size, min_periods):
+    x, m, xx = _centered_moments(values)
+    n = values.shape[1]
+    out = np.empty((n, n), dtype=values.dtype)
+    for start in range(0, n, block_size):
+        stop = min(start + block_size, n)
+        block = _moment_block((x[:, start:stop], m[:, start:stop], xx[:, start:stop]),
+                              (x[:, start:], m[:, start:], xx[:, start:]), min_periods)
+        out[start:stop, start:] = block
+        out[start:, start:stop] = block.T
+    return out
+
+# Compute the full Pearson correlation matrix of the columns of a 2-D array
+
+def pairwise_correlation(values, dtype=np.float64, min_periods=1, block_size=DEFAULT_BLOCK_SIZE):
+    """
+    Compute the correlation matrix of the columns of `values` (dates x symbols).
+    Missing values (NaN) are handled pairwise, like `Series.corr`: each pair of columns
+    only uses the rows where both are present. The matrix is built block by block
+    (`block_size` columns at a time) so very large universes never materialize more
+    than one block of intermediate products.
+    """
+    values = np.asarray(values, dtype=dtype)
+    if values.ndim != 2:
+        raise ValueError("Expected a 2-D array of shape (dates, symbols)")
+    block_size = max(int(block_size), 1)
+
+    if np.isnan(values).any():
+        out = _pairwise_correlation(values, block_size, min_periods)
+    else:
+        out = _complete_correlation(values, block_size)
+        if values.shape[0] < min_periods:
+            out[:] = np.nan
+
+    np.clip(out, -1.0, 1.0, out=out)
+    diagonal = np.diagonal(out)
+    np.fill_diagonal(out, np.where(np.isnan(diagonal), np.nan, 1.0))
+    return out
+
+# Correlation between two column sets (dates x a and dates x b) over the same dates, NaN-aware
+# Used for one tile of a larger matrix: only the tile's own columns are needed, so memory is
+# bounded by the tile size. Returns an (a x b) block
+
+def correlation_block(left, right, dtype=np.float64, min_periods=1):
+    left = np.asarray(left, dtype=dtype)
+    right = np.asarray(right, dtype=dtype)
+    if np.isnan(left).any() or np.isnan(right).any():
+        block = _moment_block(_centered_moments(left), _centered_moments(right), min_periods)
+    else:
+        block = _standardized_block(*_standardize(left), *_standardize(right))
+        if left.shape[0] < max(min_periods, 2):
+            block[:] = np.nan
+    return np.clip(block, -1.0, 1.0, out=block)
+
+# Correlation matrix of selected return columns, labelled by symbol
+
+def correlation_frame(returns, symbols=None, dtype=np.float64, min_periods=1, block_size=DEFAULT_BLOCK_SIZE):
+    if symbols is None:
+        symbols = list(returns.columns)
+    matrix = pairwise_correlation(returns[symbols].to_numpy(), dtype=dtype,
+                                  min_periods=min_periods, block_size=block_size)
+    return pd.DataFrame(matrix, columns=symbols, index=symbols)
+
+# Row/column indices of the strict upper triangle, i.e. the column order of packed pair arrays
+
+def upper_triangle_pairs(n):
+    return np.triu_indices(n, k=1)
+
+# Position of pair (i, j), i < j, in a packed upper triangle of an n x n matrix (works on arrays)
+
+def packed_index(i, j, n):
+    return i * n - i * (i + 1) // 2 + (j - i - 1)
+
+# Running window sums for every pair, updated by adding the newest row and removing the oldest
+
+class _RollingSums:
+    def __init__(self, n_symbols, pairs_i, pairs_j, pairwise):
+        size = len(pairs_i)
+        self.pairs_i = pairs_i
+        self.pairs_j = pairs_j
+        self.pairwise = pairwise
+        self.sum_ij = np.zeros(size)
+        # Squared magnitude each column has moved through the sums, the scale of their rounding error
+        self.carried = np.zeros(n_symbols)
+        if pairwise:
+            self.count = np.zeros(size)
+            self.sum_i = np.zeros(size)
+            self.sum_j = np.zeros(size)
+            self.sum_ii = np.zeros(size)
+            self.sum_jj = np.zeros(size)
+        else:
+            self.count = 0
+            self.col_sum = np.zeros(n_symbols)
+            self.col_sq = np.zeros(n_symbols)
+
+    def update(self, x, present, sign):
+        xi, xj = x[self.pairs_i], x[self.pairs_j]
+        self.sum_ij += sign * (xi * xj)
+        self.carried += x * x
+        if self.pairwise:
+            mi, mj = present[self.pairs_i], present[self.pairs_j]
+            self.count += sign * (mi * mj)
+            self.sum_i += sign * (xi * mj)
+            self.sum_j += sign * (mi * xj)
+            self.sum_ii += sign * (xi * xi * mj)
+            self.sum_jj += sign * (mi * xj * xj)
+        else:
+            self.count += sign
+            self.col_sum += sign * x
+            self.col_sq += sign * (x * x)
+
+    def correlation(self, min_periods):
+        if self.pairwise:
+            count, sum_i, sum_j = self.count, self.sum_i, self.sum_j
+            sum_ii, sum_jj = self.sum_ii, self.sum_jj
+        else:
+            count = self.count
+            sum_i, sum_j = self.col_sum[self.pairs_i], self.col_sum[self.pairs_j]
+            sum_ii, sum_jj = self.col_sq[self.pairs_i], self.col_sq[self.pairs_j]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cov = self.sum_ij - sum_i * sum_j / count
+            var_i = sum_ii - sum_i * sum_i / count
+            var_j = sum_jj - sum_j * sum_j / count
+            corr = cov / np.sqrt(var_i * var_j)
+        # Residual variances within rounding error of the sums are constant windows
+        tiny = MOMENT_TOLERANCE * np.finfo(np.float64).eps
+        invalid = ((np.asarray(count) < max(min_periods, 2)) | (var_i <= tiny * self.carried[self.pairs_i])
+                   | (var_j <= tiny * self.carried[self.pairs_j]))
+        return np.clip(np.where(invalid, np.nan, corr), -1.0, 1.0)
+
+# Rolling correlation of every pair of columns, one O(N²) update per new date
+
+def rolling_pair_correlation(values, windows, dtype=np.float32, min_periods=None, resync_every=1000):
+    """
+    Compute the rolling Pearson correlation of every pair of columns of `values`
+    (dates x symbols) for each window length in `windows`.
+
+    Window sums and cross-products are maintained incrementally in float64: each new date
+    adds one row and removes the row leaving the window, so the cost per date is O(N²)
+    whatever the window length. Sums are recomputed from scratch every `resync_every`
+    dates to bound floating-point drift.
+
+    Returns a dict mapping each window to a packed (dates, pairs) array of `dtype`: row t holds
+    the strict upper triangle of the window's correlation matrix at date t, pair (i, j) in
+    column `packed_index(i, j, n_symbols)` (the order of `upper_triangle_pairs`). Storing only
+    the triangle halves the size of a per-date matrix series; float32 halves it again.
+    Like pandas, a window needs `min_periods` pairwise-complete observations (defaults to
+    the window length) or it yields NaN.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if values.ndim != 2:
+        raise ValueError("Expected a 2-D array of shape (dates, symbols)")
+    if np.isscalar(windows):
+        windows = [windows]
+    windows = list(dict.fromkeys(int(w) for w in windows))
+    if any(w < 1 for w in windows):
+        raise ValueError("Window lengths must be positive")
+
+    n_dates, n_symbols = values.shape
+    pairs_i, pairs_j = upper_triangle_pairs(n_symbols)
+    present = ~np.isnan(values)
+    pairwise = not present.all()
+
+    # Centering by the full-sample mean keeps running raw moments well conditioned
+    with np.errstate(divide="ignore", invalid="ignore"):
+        column_mean = np.nan_to_num(np.where(present, values, 0).sum(axis=0) / present.sum(axis=0))
+    x = np.where(present, values - column_mean, 0.0)
+    m = present.astype(np.float64)
+
+    results = {}
+    states = {}
+    for window in windows:
+        results[window] = np.full((n_dates, len(pairs_i)), np.nan, dtype=dtype)
+        states[window] = _RollingSums(n_symbols, pairs_i, pairs_j, pairwise)
+
+    for t in range(n_dates):
+        for window in windows:
+            state = states[window]
+            start = t - window + 1
+            if resync_every and t > 0 and t % resync_every == 0:
+                state = states[window] = _RollingSums(n_symbols, pairs_i, pairs_j, pairwise)
+                for row in range(max(start, 0), t + 1):
+                    state.update(x[row], m[row], 1)
+            else:
+                state.update(x[t], m[t], 1)
+                if start > 0:
+                    state.update(x[start - 1], m[start - 1], -1)
+            periods = window if min_periods is None else min_periods
+            if start >= 0 or min_periods is not None:
+                results[window][t] = state.correlation(periods)
+    return results
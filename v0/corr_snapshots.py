@@ -0,0 +1,182 @@
+# corr_snapshots.py
+import argparse
+import json
+import os
+from datetime import date, timedelta
+import numpy as np
+import pandas as pd
+from corr_engine import packed_index, pairwise_correlation, upper_triangle_pairs
+
+# Environment variable pointing at the snapshot directory used by the CLI and the Streamlit app
+SNAPSHOT_ENV = "CORR_SNAPSHOTS"
+
+# Trailing windows (in trading days) computed by default
+DEFAULT_WINDOWS = (30, 90, 252)
+
+# Calendar days a snapshot may predate the requested as-of date and still be served (a long weekend)
+MAX_SNAPSHOT_AGE = 4
+
+# Pack the strict upper triangle of a correlation matrix row by row, as float32
+
+def pack_upper(matrix):
+    rows, cols = upper_triangle_pairs(matrix.shape[0])
+    return np.asarray(matrix)[rows, cols].astype(np.float32)
+
+# Correlation snapshots on disk, one directory per universe and as-of date
+# Layout: <root>/<universe>/<YYYY-MM-DD>/symbols.json and corr_<window>.npy (packed float32 triangle)
+# Triangles are memory-mapped, so a lookup only reads the pages of the requested pairs
+
+class SnapshotStore:
+    def __init__(self, root):
+        self.root = root
+        self._symbols = {}
+
+    def universes(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name for name in os.listdir(self.root) if os.path.isdir(os.path.join(self.root, name)))
+
+    # As-of dates stored for a universe, oldest first; entries not named by a date are ignored
+    def versions(self, universe):
+        directory = os.path.join(self.root, universe)
+        if not os.path.isdir(directory):
+            return []
+        versions = []
+        for name in os.listdir(directory):
+            try:
+                version = date.fromisoformat(name)
+            except ValueError:
+                continue
+            if os.path.isdir(os.path.join(directory, name)):
+                versions.append(version)
+        return sorted(versions)
+
+    def write(self, universe, as_of, window, symbols, matrix):
+        directory = os.path.join(self.root, universe, str(as_of))
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, "symbols.json"), "w") as f:
+            json.dump(list(symbols), f)
+        # Written next to the final name and renamed, so readers never map a partial file
+        path = os.path.join(directory, f"corr_{window}.npy")
+        np.save(path + ".tmp.npy", pack_upper(matrix))
+        os.replace(path + ".tmp.npy", path)
+        self._symbols.pop(directory, None)
+
+    # Symbol -> position map of one snapshot directory, cached per process
+    def _symbol_index(self, directory):
+        if directory not in self._symbols:
+            with open(os.path.join(directory, "symbols.json")) as f:
+                self._symbols[directory] = {symbol: k for k, symbol in enumerate(json.load(f))}
+        return self._symbols[directory]
+
+    # Latest snapshot (universe, as_of) on or before `as_of` that covers every symbol for `window`
+    # Snapshots more than `max_age` days older than `as_of` (today if None) are stale and skipped
+    def find(self, symbols, window, as_of=None, universe=None, max_age=MAX_SNAPSHOT_AGE):
+        as_of = pd.Timestamp(as_of).date() if as_of is not None else None
+        oldest = (as_of or date.today()) - timedelta(days=max_age) if max_age is not None else None
+        candidates = []
+        for name in ([universe] if universe else self.universes()):
+            for version in self.versions(name):
+                if as_of is not None and version > as_of:
+                    continue
+                if oldest is not None and version < oldest:
+                    continue
+                directory = os.path.join(self.root, name, str(version))
+                if not os.path.exists(os.path.join(directory, f"corr_{window}.npy")):
+                    continue
+                index = self._symbol_index(directory)
+                if all(symbol in index for symbol in symbols):
+                    candidates.append((version, name))
+        if not candidates:
+            return None
+        version, name = max(candidates)
+        return name, version
+
+    def lookup(self, symbols, window, as_of=None, universe=None, max_age=MAX_SNAPSHOT_AGE):
+        """
+        Slice the correlation matrix of `symbols` out of the most recent stored snapshot
+        for `window` dated on or before `as_of` (today if None) and at most `max_age` days
+        older (no limit if None; 0 requires the exact date).
+        Returns (DataFrame, as_of date) or None when no fresh snapshot covers every symbol,
+        in which case callers compute the correlation from returns.
+        """
+        symbols = list(dict.fromkeys(symbols))
+        found = self.find(symbols, window, as_of=as_of, universe=universe, max_age=max_age)
+        if found is None:
+            return None
+        name, version = found
+        directory = os.path.join(self.root, name, str(version))
+        index = self._symbol_index(directory)
+        packed = np.load(os.path.join(directory, f"corr_{window}.npy"), mmap_mode="r")
+
+        positions = np.array([index[symbol] for symbol in symbols], dtype=np.int64)
+        rows, cols = upper_triangle_pairs(len(symbols))
+        i = np.minimum(positions[rows], positions[cols])
+        j = np.maximum(positions[rows], positions[cols])
+        matrix = np.eye(len(symbols))
+        matrix[rows, cols] = packed[packed_index(i, j, len(index))]
+        matrix[cols, rows] = matrix[rows, cols]
+        return pd.DataFrame(matrix, columns=symbols, index=symbols), version
+
+# Open the snapshot store named by the CORR_SNAPSHOTS environment variable, if any
+
+def open_snapshots(root=None):
+    root = root if root is not None else os.environ.get(SNAPSHOT_ENV)
+    return SnapshotStore(root) if root else None
+
+# Correlation over the last `window` dates of a returns frame, pairwise over missing values
+# A pair needs at least half the window of common observations. Snapshots and the live fallback of
+# AnalysisPipeline both go through here, on returns with their gaps kept
+
+def trailing_correlation(returns, window, symbols=None, dtype=np.float64):
+    symbols = list(returns.columns) if symbols is None else symbols
+    values = returns[symbols].to_numpy()[-window:]
+    matrix = pairwise_correlation(values, dtype=dtype, min_periods=max(2, window // 2))
+    return pd.DataFrame(matrix, columns=symbols, index=symbols)
+
+# Batch job: compute every window for a universe from one returns load and store the snapshots
+# The snapshot is dated with the last trading day in the data on or before `as_of`
+
+def build_snapshots(store, snapshots, universe, symbols=None, windows=DEFAULT_WINDOWS, as_of=None):
+    symbols = list(dict.fromkeys(symbols)) if symbols else store.all_symbols()
+    end = date.fromisoformat(str(as_of)) if as_of is not None else date.today()
+    # Calendar lookback covering the longest window (about 252 trading days per 365 days) plus holidays
+    start = end - timedelta(days=int(max(windows) * 365 / 252) + 30)
+    returns = store.load_returns_frame(symbols, start, end, complete=False)
+    if returns.empty:
+        raise ValueError(f"No returns found for universe '{universe}' up to {end}")
+    version = returns.index[-1].date()
+    symbols = [symbol for symbol in symbols if symbol in returns.columns]
+
+    for window in windows:
+        matrix = trailing_correlation(returns, window, symbols, dtype=np.float32).to_numpy()
+        snapshots.write(universe, version, window, symbols, matrix)
+        print(f"Snapshot {universe} {version} {window}d: {len(symbols)} symbols.")
+    return version
+
+# Parse CLI arguments
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Precompute correlation snapshots for standard trailing windows")
+    parser.add_argument("root", type=str, help="Snapshot directory")
+    parser.add_argument("--universe", type=str, default="all", help="Name under which the snapshots are stored")
+    parser.add_argument("--symbols", nargs="*", default=[], help="Symbols or names of the universe (all if omitted)")
+    parser.add_argument("--windows", nargs="+", type=int, default=list(DEFAULT_WINDOWS), help="Trailing windows in days")
+    parser.add_argument("--as_of", type=str, default=None, help="As-of date (YYYY-MM-DD), today if omitted")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    from price_store import open_store
+
+    args = parse_arguments()
+    store = open_store()
+    try:
+        symbols = None
+        if args.symbols:
+            symbols, missing = store.validate_symbols_or_names(args.symbols)
+            if missing:
+                raise ValueError(f"The following inputs were not found in the database: {', '.join(missing)}")
+        build_snapshots(store, SnapshotStore(args.root), args.universe, symbols, args.windows, args.as_of)
+    finally:
+        store.close()
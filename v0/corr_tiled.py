@@ -0,0 +1,180 @@
+# corr_tiled.py
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from corr_engine import correlation_block
+
+# Layout of an out-of-core working directory:
+#   returns.npy      symbols x dates returns, one row per symbol so a tile reads contiguous rows
+#   dates.npy        trading days (datetime64[D])
+#   symbols.json     symbol of each row / output column
+#   correlation.npy  symbols x symbols correlation matrix
+RETURNS_FILE = "returns.npy"
+DATES_FILE = "dates.npy"
+SYMBOLS_FILE = "symbols.json"
+CORRELATION_FILE = "correlation.npy"
+
+# Default tile edge: a worker holds two (tile x dates) slices of returns plus one tile x tile block
+DEFAULT_TILE = 1024
+
+# Thread-count variables of the BLAS builds numpy may use; workers get 1 each, since the pool
+# already runs one process per core and multithreaded BLAS in every worker would oversubscribe them
+BLAS_THREAD_VARIABLES = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS", "VECLIB_MAXIMUM_THREADS")
+
+# Load returns from a store batch by batch into a memory-mapped (symbols x dates) file
+# Each batch is parked on disk until the union of dates is known, so memory stays bounded by one batch
+
+def write_returns_memmap(store, symbols, directory, start_date=None, end_date=None, dtype=np.float32,
+                         batch_symbols=500):
+    os.makedirs(directory, exist_ok=True)
+    symbols = list(dict.fromkeys(symbols))
+    parts = []
+    for k, start in enumerate(range(0, len(symbols), batch_symbols)):
+        batch = store.load_returns_matrix(symbols[start:start + batch_symbols], start_date, end_date, dtype=dtype)
+        path = os.path.join(directory, f"batch_{k}.npy")
+        np.save(path, batch.values.T)
+        parts.append((path, batch.dates))
+
+    dates = np.unique(np.concatenate([batch_dates for _, batch_dates in parts])) if parts \
+        else np.array([], dtype="datetime64[D]")
+    returns = np.lib.format.open_memmap(os.path.join(directory, RETURNS_FILE), mode="w+", dtype=dtype,
+                                        shape=(len(symbols), len(dates)))
+    row = 0
+    for path, batch_dates in parts:
+        block = np.load(path, mmap_mode="r")
+        returns[row:row + block.shape[0]] = np.nan
+        returns[row:row + block.shape[0], np.searchsorted(dates, batch_dates)] = block
+        row += block.shape[0]
+        del block
+        os.remove(path)
+    returns.flush()
+    del returns
+
+    np.save(os.path.join(directory, DATES_FILE), dates)
+    with open(os.path.join(directory, SYMBOLS_FILE), "w") as f:
+        json.dump(symbols, f)
+    return os.path.join(directory, RETURNS_FILE)
+
+# Worker state: memory maps opened once per process
+
+_worker = {}
+
+def _open_worker(returns_path, output_path, min_periods):
+    # threadpoolctl, when installed, also caps BLAS libraries that ignore the environment variables
+    try:
+        from threadpoolctl import threadpool_limits
+    except ImportError:
+        pass
+    else:
+        _worker["blas_limits"] = threadpool_limits(1)
+    _worker["returns"] = np.load(returns_path, mmap_mode="r")
+    _worker["output"] = np.load(output_path, mmap_mode="r+")
+    _worker["min_periods"] = min_periods
+
+# Compute one tile (rows i0:i1 x columns j0:j1, i0 <= j0) and its mirror straight into the output map
+
+def _compute_tile(tile):
+    i0, i1, j0, j1 = tile
+    returns, output = _worker["returns"], _worker["output"]
+    left = np.array(returns[i0:i1]).T
+    right = left if (i0, i1) == (j0, j1) else np.array(returns[j0:j1]).T
+    block = correlation_block(left, right, dtype=output.dtype, min_periods=_worker["min_periods"])
+    output[i0:i1, j0:j1] = block
+    if i0 != j0:
+        output[j0:j1, i0:i1] = block.T
+    output.flush()
+    return (i1 - i0) * (j1 - j0)
+
+def tiled_correlation(directory, tile=DEFAULT_TILE, processes=None, min_periods=1):
+    """
+    Compute the correlation matrix of the memory-mapped returns in `directory` (written by
+    write_returns_memmap) into correlation.npy, also memory-mapped. The upper triangle is split
+    into tile x tile blocks computed by a process pool; each worker only reads the rows of its
+    two tiles, so memory use depends on `tile` and the number of dates, not on the universe size.
+    Workers run single-threaded BLAS and are spawned, so calling scripts need the
+    `if __name__ == "__main__":` guard. Returns the output as a read-only memmap.
+    """
+    returns_path = os.path.join(directory, RETURNS_FILE)
+    output_path = os.path.join(directory, CORRELATION_FILE)
+    returns = np.load(returns_path, mmap_mode="r")
+    n, dtype = returns.shape[0], returns.dtype
+    del returns
+    output = np.lib.format.open_memmap(output_path, mode="w+", dtype=dtype, shape=(n, n))
+    del output
+
+    bounds = [(start, min(start + tile, n)) for start in range(0, n, tile)]
+    tiles = [(i0, i1, j0, j1) for k, (i0, i1) in enumerate(bounds) for j0, j1 in bounds[k:]]
+    # Spawned (not forked) workers load BLAS afresh, reading the single-thread settings at startup
+    saved = {name: os.environ.get(name) for name in BLAS_THREAD_VARIABLES}
+    os.environ.update(dict.fromkeys(BLAS_THREAD_VARIABLES, "1"))
+    try:
+        with ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=_open_worker,
+                                 initargs=(returns_path, output_path, min_periods)) as executor:
+            for _ in executor.map(_compute_tile, tiles):
+                pass
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+    output = np.load(output_path, mmap_mode="r+")
+    diagonal = np.diagonal(output).copy()
+    np.fill_diagonal(output, np.where(np.isnan(diagonal), np.nan, 1.0))
+    output.flush()
+    del output
+    return np.load(output_path, mmap_mode="r")
+
+# Open a computed matrix: (read-only memmap, symbols)
+
+def open_correlation(directory):
+    with open(os.path.join(directory, SYMBOLS_FILE)) as f:
+        symbols = json.load(f)
+    return np.load(os.path.join(directory, CORRELATION_FILE), mmap_mode="r"), symbols
+
+# Parse CLI arguments
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Out-of-core correlation matrix computed in tiles across processes")
+    parser.add_argument("directory", type=str, help="Working directory for the memory-mapped returns and output")
+    parser.add_argument("--symbols", nargs="*", default=[], help="Symbols or names (all known symbols if omitted)")
+    parser.add_argument("--start_date", type=str, default=None, help="Start date (YYYY-MM-DD)")
+    parser.add_argument("--end_date", type=str, default=None, help="End date (YYYY-MM-DD)")
+    parser.add_argument("--tile", type=int, default=DEFAULT_TILE, help="Symbols per tile edge")
+    parser.add_argument("--processes", type=int, default=None, help="Worker processes (all cores if omitted)")
+    parser.add_argument("--min_periods", type=int, default=1, help="Minimum common dates per pair")
+    parser.add_argument("--dtype", choices=["float32", "float64"], default="float32", help="Storage precision")
+    parser.add_argument("--reuse_returns", action="store_true", help="Skip loading when returns.npy already exists")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    from price_store import open_store
+
+    args = parse_arguments()
+    if not (args.reuse_returns and os.path.exists(os.path.join(args.directory, RETURNS_FILE))):
+        store = open_store()
+        try:
+            if args.symbols:
+                symbols, missing = store.validate_symbols_or_names(args.symbols)
+                if missing:
+                    raise ValueError(f"The following inputs were not found in the database: {', '.join(missing)}")
+            else:
+                symbols = store.all_symbols()
+            start = time.perf_counter()
+            write_returns_memmap(store, symbols, args.directory, args.start_date, args.end_date,
+                                 dtype=np.dtype(args.dtype))
+            print(f"Returns written in {time.perf_counter() - start:.2f} s")
+        finally:
+            store.close()
+
+    start = time.perf_counter()
+    matrix = tiled_correlation(args.directory, tile=args.tile, processes=args.processes, min_periods=args.min_periods)
+    print(f"{matrix.shape[0]} x {matrix.shape[1]} correlation matrix written to "
+          f"{os.path.join(args.directory, CORRELATION_FILE)} in {time.perf_counter() - start:.2f} s")
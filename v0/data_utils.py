@@ -1,24 +1,86 @@
 # data_utils.py
-import pandas as pd
 import numpy as np
+from corr_engine import correlation_frame, rolling_pair_correlation, upper_triangle_pairs
+from profiling import profiled
 
 # Calculate daily percentage returns from price data
 
+@profiled("returns")
 def calculate_daily_returns(pivoted_data):
     return pivoted_data.pct_change().dropna()
 
 # Compute correlation matrix between multiple time series
 
+@profiled("correlation")
 def calculate_correlation_matrix(returns, symbols):
-    matrix = []
-    for i in range(len(symbols)):
-        row = []
-        for j in range(len(symbols)):
-            row.append(returns[symbols[i]].corr(returns[symbols[j]]))
-        matrix.append(row)
-    return pd.DataFrame(matrix, columns=symbols, index=symbols)
+    return correlation_frame(returns, symbols)
 
 # Calculate rolling correlation between two time series over a defined window
 
+@profiled("rolling")
 def calculate_rolling_correlation(returns, sym1, sym2, window):
-    return returns[sym1].rolling(window=window).corr(returns[sym2])
\ No newline at end of file
+    return returns[sym1].rolling(window=window).corr(returns[sym2])
+
+# Calculate rolling correlations for every pair of symbols over one or more windows
+# Returns {window: (dates x pairs) array}, the date index and the (sym1, sym2) label of each pair column;
+# the pair of symbols[i] and symbols[j] (i < j) is column corr_engine.packed_index(i, j, len(symbols))
+
+@profiled("rolling")
+def calculate_rolling_correlations(returns, symbols, windows, dtype=np.float32):
+    pairs_i, pairs_j = upper_triangle_pairs(len(symbols))
+    pairs = [(symbols[i], symbols[j]) for i, j in zip(pairs_i, pairs_j)]
+    rolling = rolling_pair_correlation(returns[symbols].to_numpy(), windows, dtype=dtype)
+    return rolling, returns.index, pairs
+
+# Reservoir sample of k row indices out of n (Algorithm R), returned sorted
+# Only the replacements are looped over, about k·ln(n/k) of them
+
+def reservoir_sample(n, k, seed=0):
+    if k >= n:
+        return np.arange(n)
+    rng = np.random.default_rng(seed)
+    reservoir = np.arange(k)
+    slots = rng.integers(0, np.arange(k + 1, n + 1))
+    for position in np.flatnonzero(slots < k):
+        reservoir[slots[position]] = k + position
+    return np.sort(reservoir)
+
+# Bin every return column once: per-symbol edges between the clip quantiles, -1 marks missing values
+
+def _bin_codes(values, bins, clip_quantile):
+    low = np.nanquantile(values, clip_quantile, axis=0)
+    high = np.nanquantile(values, 1 - clip_quantile, axis=0)
+    span = np.where(high > low, high - low, 1.0)
+    scaled = np.floor((values - low) / span * bins)
+    codes = np.clip(np.nan_to_num(scaled, nan=-1), 0, bins - 1).astype(np.int64)
+    codes[np.isnan(values)] = -1
+    edges = low[:, None] + span[:, None] * np.linspace(0, 1, bins + 1)[None, :]
+    return codes, edges
+
+# 2-D histogram of every pair of return columns plus 1-D histograms on the diagonal
+# Pairs are counted in vectorized batches with one bincount each, so the cost is O(T·N²/2) integer
+# work; a batch is bounded by `batch_cells` both in input codes and in output counts.
+# Returns (pair_grids, diagonal, edges, pairs) of int32 counts,
+# with pair_grids[p] the (bins x bins) counts for pairs[p] = (i, j), rows indexing symbol i
+
+@profiled("density_grids")
+def pair_density_grids(returns, bins=64, clip_quantile=0.005, batch_cells=4_000_000):
+    values = np.asarray(returns, dtype=np.float64)
+    n_rows, n_symbols = values.shape
+    codes, edges = _bin_codes(values, bins, clip_quantile)
+    pairs_i, pairs_j = upper_triangle_pairs(n_symbols)
+    cells = bins * bins
+    grids = np.zeros((len(pairs_i), cells), dtype=np.int32)
+
+    batch = max(1, batch_cells // max(n_rows, cells, 1))
+    for start in range(0, len(pairs_i), batch):
+        stop = min(start + batch, len(pairs_i))
+        ci, cj = codes[:, pairs_i[start:stop]], codes[:, pairs_j[start:stop]]
+        flat = ci * bins + cj + np.arange(stop - start) * cells
+        valid = (ci >= 0) & (cj >= 0)
+        grids[start:stop] = np.bincount(flat[valid], minlength=(stop - start) * cells).reshape(-1, cells)
+
+    offsets = np.arange(n_symbols) * bins
+    valid = codes >= 0
+    diagonal = np.bincount((codes + offsets)[valid], minlength=n_symbols * bins).reshape(n_symbols, bins).astype(np.int32)
+    return grids.reshape(-1, bins, bins), diagonal, edges, list(zip(pairs_i, pairs_j))
@@ -1,7 +1,16 @@
 # db_utils.py
+import io
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date
+import numpy as np
+import pandas as pd
 import psycopg2
 from psycopg2.extras import execute_batch
+from psycopg2.pool import ThreadedConnectionPool
 import connectPostGre as co
+from profiling import profiled, count, enabled as profiling_enabled, span
 
 # Establish a connection to the PostgreSQL database using credentials from a config file
 
@@ -14,9 +23,35 @@ def connect_to_postgres():
         port=co.port
     )
 
+# Create a thread-safe pool of connections using the same credentials as connect_to_postgres
+
+def create_connection_pool(minconn=1, maxconn=8):
+    return ThreadedConnectionPool(
+        minconn, maxconn,
+        host=co.host,
+        database=co.database,
+        user=co.user,
+        password=co.password,
+        port=co.port
+    )
+
+# Borrow a connection from the pool for the duration of a `with` block
+
+@contextmanager
+def pooled_connection(pool):
+    conn = pool.getconn()
+    try:
+        yield conn
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        pool.putconn(conn, close=bool(conn.closed))
+
 # Insert stock data into the stock_data table, avoiding duplicates via ON CONFLICT clause
+# stock_returns (see ensure_returns_table) is updated for the new rows unless `refresh_returns` is False
 
-def insert_stock_data(conn, symbol, data):
+def insert_stock_data(conn, symbol, data, refresh_returns=True):
     if data is None or data.empty:
         print(f"No data to insert for {symbol}.")
         return
@@ -30,9 +65,83 @@ def insert_stock_data(conn, symbol, data):
              float(row['Low']), float(row['Close']), int(row['Volume']))
             for index, row in data.iterrows()
         ])
+        if refresh_returns:
+            _refresh_returns(cursor, [(symbol, data.index.min().date(), data.index.max().date())])
     conn.commit()
     print(f"Data for {symbol} inserted into the database.")
 
+# Convert OHLCV frames column-wise into one CSV buffer ready for COPY FROM STDIN
+# Returns (buffer, number of rows)
+
+def frames_to_csv(frames):
+    parts = []
+    for symbol, data in frames.items():
+        if data is None or data.empty:
+            continue
+        parts.append(pd.DataFrame({
+            "symbol": symbol,
+            "date": pd.DatetimeIndex(data.index).strftime("%Y-%m-%d"),
+            "open": data["Open"].to_numpy(dtype=float),
+            "high": data["High"].to_numpy(dtype=float),
+            "low": data["Low"].to_numpy(dtype=float),
+            "close": data["Close"].to_numpy(dtype=float),
+            "volume": data["Volume"].round().astype("Int64").reset_index(drop=True),
+        }))
+    buffer = io.StringIO()
+    if parts:
+        pd.concat(parts, ignore_index=True).to_csv(buffer, header=False, index=False)
+    buffer.seek(0)
+    return buffer, sum(len(part) for part in parts)
+
+# Bulk-load several symbols at once: COPY into a staging table, then merge into stock_data
+# in a single statement. Returns (rows inserted, rows skipped because they already existed)
+# stock_returns (see ensure_returns_table) is updated for the inserted rows in the same transaction,
+# unless `refresh_returns` is False
+
+def bulk_insert_stock_data(conn, frames, refresh_returns=True):
+    buffer, total = frames_to_csv(frames)
+    if total == 0:
+        print("No data to insert.")
+        return 0, 0
+    inserted, skipped = copy_stock_data(conn, buffer, total, refresh_returns=refresh_returns)
+    print(f"Bulk load: {inserted} rows inserted, {skipped} rows skipped for {len(frames)} symbol(s).")
+    return inserted, skipped
+
+# COPY a CSV buffer built by frames_to_csv (`total` rows) into stock_data through a staging table
+# Returns (rows inserted, rows skipped)
+
+@profiled("db.copy_stock_data")
+def copy_stock_data(conn, buffer, total, refresh_returns=True):
+    if profiling_enabled():
+        count("db_bytes_sent", len(buffer.getvalue()))
+        count("db_rows_sent", total)
+        count("db_queries", 4 if refresh_returns else 3)
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            CREATE TEMP TABLE stock_data_staging
+            (LIKE stock_data INCLUDING DEFAULTS) ON COMMIT DROP;
+        """)
+        cursor.copy_expert("""
+            COPY stock_data_staging (symbol, date, open, high, low, close, volume)
+            FROM STDIN WITH (FORMAT csv)
+        """, buffer)
+        cursor.execute("""
+            WITH inserted AS (
+                INSERT INTO stock_data (symbol, date, open, high, low, close, volume)
+                SELECT DISTINCT ON (symbol, date) symbol, date, open, high, low, close, volume
+                FROM stock_data_staging
+                ON CONFLICT (symbol, date) DO NOTHING
+                RETURNING symbol, date
+            )
+            SELECT symbol, MIN(date), MAX(date), COUNT(*) FROM inserted GROUP BY symbol;
+        """)
+        ranges = cursor.fetchall()
+        inserted = sum(rows for _, _, _, rows in ranges)
+        if refresh_returns and ranges:
+            _refresh_returns(cursor, [(symbol, first, last) for symbol, first, last, _ in ranges])
+    conn.commit()
+    return inserted, total - inserted
+
 # Insert or update the symbol-name pair in the index_info table
 
 def insert_stock_name(conn, symbol, name):
@@ -49,29 +158,85 @@ def insert_stock_name(conn, symbol, name):
     with conn.cursor() as cursor:
         cursor.execute(query, (symbol, name))
         conn.commit()
+    invalidate_index_cache()
+
+# Build lookup tables from (symbol, name) rows; the smallest symbol wins for duplicated names
+
+def build_symbol_index(rows):
+    names = {}
+    for symbol, name in sorted(rows, reverse=True):
+        if name is not None:
+            names[name] = symbol
+    return {"symbols": {symbol for symbol, _ in rows}, "names": names}
+
+# Resolve inputs against a symbol index, symbols taking precedence over names (None if unknown)
+
+def resolve_with_index(index, inputs):
+    return [item if item in index["symbols"] else index["names"].get(item) for item in inputs]
+
+# Process-level copy of index_info, used to resolve symbols/names without a database round trip
+
+INDEX_CACHE_TTL = 300
+_index_cache = {"loaded_at": None, "symbols": set(), "names": {}}
+_index_cache_lock = threading.Lock()
+
+# Drop the cached index_info so the next cached resolution reloads it
+
+def invalidate_index_cache():
+    with _index_cache_lock:
+        _index_cache["loaded_at"] = None
+
+# Load (or reuse, if younger than `ttl` seconds) the cached index_info table
+
+def load_index_cache(conn, ttl=INDEX_CACHE_TTL):
+    with _index_cache_lock:
+        loaded_at = _index_cache["loaded_at"]
+        if loaded_at is not None and time.monotonic() - loaded_at < ttl:
+            return _index_cache
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT symbol, name FROM index_info")
+            rows = cursor.fetchall()
+        count("db_queries")
+        count("db_rows_fetched", len(rows))
+        _index_cache.update(build_symbol_index(rows))
+        _index_cache["loaded_at"] = time.monotonic()
+        return _index_cache
 
 # Validate input strings as either symbol or name, and map them to valid symbols from DB
+# All inputs are resolved in one set-based query (or from the process cache when `use_cache` is set),
+# symbols taking precedence over names; output order follows the inputs
 
-def validate_symbols_or_names(conn, inputs):
-    symbols = []
-    missing_inputs = []
-    query_symbol = "SELECT symbol FROM index_info WHERE symbol = %s"
-    query_name = "SELECT symbol FROM index_info WHERE name = %s"
+@profiled("db.resolve_symbols")
+def validate_symbols_or_names(conn, inputs, use_cache=False):
+    inputs = list(inputs)
+    if use_cache:
+        resolved = resolve_with_index(load_index_cache(conn), inputs)
+    else:
+        query = """
+            SELECT match.symbol
+            FROM unnest(%s::text[]) WITH ORDINALITY AS input(item, position)
+            LEFT JOIN LATERAL (
+                SELECT symbol, 0 AS priority FROM index_info WHERE symbol = input.item
+                UNION ALL
+                SELECT symbol, 1 AS priority FROM index_info WHERE name = input.item
+                ORDER BY priority, symbol
+                LIMIT 1
+            ) AS match ON TRUE
+            ORDER BY input.position;
+        """
+        with conn.cursor() as cursor:
+            cursor.execute(query, (inputs,))
+            resolved = [row[0] for row in cursor.fetchall()]
+        count("db_queries")
+        count("db_rows_fetched", len(resolved))
 
-    with conn.cursor() as cursor:
-        for item in inputs:
-            cursor.execute(query_symbol, (item,))
-            result = cursor.fetchone()
-            if result:
-                symbols.append(result[0])
-                continue
-            cursor.execute(query_name, (item,))
-            result = cursor.fetchone()
-            if result:
-                symbols.append(result[0])
-            else:
-                missing_inputs.append(item)
+    return split_resolved(inputs, resolved)
+
+# Split resolution results into the (symbols, missing_inputs) pair returned to callers
 
+def split_resolved(inputs, resolved):
+    symbols = [symbol for symbol in resolved if symbol is not None]
+    missing_inputs = [item for item, symbol in zip(inputs, resolved) if symbol is None]
     return symbols, missing_inputs
 
 # Retrieve name-to-symbol mapping for UI display or reporting
@@ -83,6 +248,96 @@ def get_symbol_names(conn, symbols):
         rows = cursor.fetchall()
     return {row[0]: row[1] for row in rows}
 
+# Build the optional date bounds of a stock_data query
+
+def _date_filter(start_date, end_date):
+    clauses, params = [], []
+    if start_date is not None:
+        clauses.append("date >= %s")
+        params.append(start_date)
+    if end_date is not None:
+        clauses.append("date <= %s")
+        params.append(end_date)
+    return "".join(f" AND {clause}" for clause in clauses), params
+
+# Stream (symbol, date, value) rows of `table` into a preallocated (date x symbol) array
+# Date bounds are applied in SQL and rows are streamed through a server-side cursor, so memory
+# and time scale with the requested window. Returns (values, DatetimeIndex, {symbol: column})
+
+def _load_matrix(conn, table, column, symbols, start_date, end_date, dtype, itersize):
+    with span(f"db.load.{table}"):
+        return _stream_matrix(conn, table, column, symbols, start_date, end_date, dtype, itersize)
+
+# SQL of the two reads behind _load_matrix, as (query, params) pairs: the distinct dates of the
+# window, then the (symbol, date, value) rows. schema.check_plans EXPLAINs these same queries
+
+def matrix_queries(table, column, symbols, start_date, end_date):
+    date_sql, date_params = _date_filter(start_date, end_date)
+    params = [list(symbols)] + date_params
+    dates = (f"""
+        SELECT DISTINCT date FROM {table}
+        WHERE symbol = ANY(%s){date_sql}
+        ORDER BY date;
+    """, params)
+    rows = (f"""
+        SELECT symbol, date, {column} FROM {table}
+        WHERE symbol = ANY(%s){date_sql};
+    """, params)
+    return dates, rows
+
+def _stream_matrix(conn, table, column, symbols, start_date, end_date, dtype, itersize):
+    symbols = list(dict.fromkeys(symbols))
+    columns = {symbol: k for k, symbol in enumerate(symbols)}
+    dates_query, rows_query = matrix_queries(table, column, symbols, start_date, end_date)
+
+    with conn.cursor() as cursor:
+        cursor.execute(*dates_query)
+        dates = np.array([row[0] for row in cursor.fetchall()], dtype="datetime64[D]")
+    count("db_queries", 2)
+
+    values = np.full((len(dates), len(symbols)), np.nan, dtype=dtype)
+    # Leaving the block closes the server-side cursor, even on error; the caller's transaction is
+    # neither committed nor rolled back here
+    with conn.cursor(name=f"load_{table}") as cursor:
+        cursor.itersize = itersize
+        cursor.execute(*rows_query)
+        while True:
+            rows = cursor.fetchmany(itersize)
+            if not rows:
+                break
+            chunk_symbols, chunk_dates, chunk_values = zip(*rows)
+            if profiling_enabled():
+                count("db_rows_fetched", len(rows))
+                # Approximate payload: symbol text + 4-byte date + 8-byte value per row
+                count("db_bytes_received", sum(map(len, chunk_symbols)) + 12 * len(rows))
+            row_index = np.searchsorted(dates, np.array(chunk_dates, dtype="datetime64[D]"))
+            col_index = np.fromiter((columns[symbol] for symbol in chunk_symbols), dtype=np.intp, count=len(rows))
+            values[row_index, col_index] = np.array(chunk_values, dtype=dtype)
+    return values, pd.DatetimeIndex(dates, name="date"), columns
+
+# Load one price column for several symbols straight into a preallocated (date x symbol) array
+
+def load_price_matrix(conn, symbols, start_date=None, end_date=None, column="close",
+                      dtype=np.float64, itersize=50000):
+    if column not in ("open", "high", "low", "close", "volume"):
+        raise ValueError(f"Unknown price column: {column}")
+    return _load_matrix(conn, "stock_data", column, symbols, start_date, end_date, dtype, itersize)
+
+# Load closing prices as a wide (date x symbol) DataFrame without going through pivot
+# Symbols with no rows in the window are left out, as pivot would
+
+def load_price_frame(conn, symbols, start_date=None, end_date=None, dtype=np.float64):
+    values, dates, columns = load_price_matrix(conn, symbols, start_date, end_date, dtype=dtype)
+    return price_matrix_to_frame(values, dates, columns)
+
+# Wrap a (values, dates, columns) price matrix as a wide DataFrame, dropping symbols without data
+
+@profiled("pivot")
+def price_matrix_to_frame(values, dates, columns):
+    frame = pd.DataFrame(values, index=dates, columns=list(columns))
+    frame.columns.name = "symbol"
+    return frame.loc[:, frame.notna().any(axis=0)]
+
 # Get a list of all known symbols in the database
 
 def all_symbols(conn):
@@ -101,4 +356,213 @@ def data_already_exists(conn, symbol, start_date, end_date):
     with conn.cursor() as cursor:
         cursor.execute(query, (symbol, start_date, end_date))
         result = cursor.fetchone()
-        return result[0] > 0
\ No newline at end of file
+        return result[0] > 0
+
+# Create the coverage table recording which [start_date, end_date) ranges were loaded per symbol
+# On first creation it is seeded from the rows already in stock_data
+# Runs on the caller's cursor without committing, so a schema migration stays one transaction
+
+def create_coverage_table(cursor):
+    cursor.execute("SELECT to_regclass('stock_coverage') IS NULL;")
+    created = cursor.fetchone()[0]
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS stock_coverage (
+            symbol TEXT NOT NULL,
+            start_date DATE NOT NULL,
+            end_date DATE NOT NULL,
+            PRIMARY KEY (symbol, start_date)
+        );
+    """)
+    if created:
+        _seed_coverage(cursor)
+
+def ensure_coverage_table(conn):
+    with conn.cursor() as cursor:
+        create_coverage_table(cursor)
+    conn.commit()
+
+# Seed coverage from the rows already in stock_data, for symbols that have no coverage yet
+
+def _seed_coverage(cursor):
+    cursor.execute("""
+        INSERT INTO stock_coverage (symbol, start_date, end_date)
+        SELECT symbol, MIN(date), MAX(date) + 1
+        FROM stock_data
+        WHERE symbol NOT IN (SELECT symbol FROM stock_coverage)
+        GROUP BY symbol;
+    """)
+    return cursor.rowcount
+
+def backfill_coverage(conn):
+    with conn.cursor() as cursor:
+        added = _seed_coverage(cursor)
+    conn.commit()
+    return added
+
+# Calendar date of a string, date, datetime or pandas Timestamp
+
+def _as_date(value):
+    return pd.Timestamp(value).date()
+
+# Subtract covered intervals from [start, end); all intervals are half-open
+
+def _subtract_ranges(start, end, covered):
+    gaps = []
+    cursor = start
+    for lo, hi in sorted(covered):
+        if hi <= cursor:
+            continue
+        if lo >= end:
+            break
+        if lo > cursor:
+            gaps.append((cursor, lo))
+        cursor = max(cursor, hi)
+    if cursor < end:
+        gaps.append((cursor, end))
+    return gaps
+
+# Find the date sub-ranges not yet loaded for every symbol, with a single query
+# Returns {symbol: [(gap_start, gap_end), ...]} with gap_end exclusive, like yfinance's `end`
+
+@profiled("db.missing_ranges")
+def missing_ranges(conn, symbols, start_date, end_date):
+    start, end = _as_date(start_date), _as_date(end_date)
+    query = """
+        SELECT symbol, start_date, end_date
+        FROM stock_coverage
+        WHERE symbol = ANY(%s) AND end_date > %s AND start_date < %s;
+    """
+    covered = {symbol: [] for symbol in symbols}
+    with conn.cursor() as cursor:
+        cursor.execute(query, (list(symbols), start, end))
+        for symbol, lo, hi in cursor.fetchall():
+            covered[symbol].append((lo, hi))
+    return {symbol: _subtract_ranges(start, end, ranges) for symbol, ranges in covered.items()}
+
+# Record that [start_date, end_date) was loaded for a symbol, merging with adjacent ranges
+# Dates from today onwards are never marked as covered since the market data is not final yet
+
+def record_coverage(conn, symbol, start_date, end_date):
+    start = _as_date(start_date)
+    end = min(_as_date(end_date), date.today())
+    if end <= start:
+        return
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            DELETE FROM stock_coverage
+            WHERE symbol = %s AND end_date >= %s AND start_date <= %s
+            RETURNING start_date, end_date;
+        """, (symbol, start, end))
+        for lo, hi in cursor.fetchall():
+            start, end = min(start, lo), max(end, hi)
+        cursor.execute(
+            "INSERT INTO stock_coverage (symbol, start_date, end_date) VALUES (%s, %s, %s);",
+            (symbol, start, end)
+        )
+    conn.commit()
+
+# Create the table of materialized daily returns (simple and log), one row per symbol and date
+# On first creation it is filled from the prices already in stock_data, which later inserts skip as
+# duplicates and so would never refresh. Runs on the caller's cursor without committing
+
+def create_returns_table(cursor):
+    cursor.execute("SELECT to_regclass('stock_returns') IS NULL;")
+    created = cursor.fetchone()[0]
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS stock_returns (
+            symbol TEXT NOT NULL,
+            date DATE NOT NULL,
+            simple_return DOUBLE PRECISION,
+            log_return DOUBLE PRECISION,
+            PRIMARY KEY (symbol, date)
+        );
+    """)
+    if created:
+        cursor.execute("SELECT DISTINCT symbol FROM stock_data;")
+        _backfill_returns(cursor, [row[0] for row in cursor.fetchall()])
+
+def ensure_returns_table(conn):
+    with conn.cursor() as cursor:
+        create_returns_table(cursor)
+    conn.commit()
+
+# Recompute returns for (symbol, first_date, last_date) ranges of newly written prices
+# Each range is widened by one row on both sides: the first new date needs the previous close,
+# and the next existing date gets a new predecessor when rows are inserted before it
+
+def _refresh_returns(cursor, ranges):
+    symbols, firsts, lasts = (list(column) for column in zip(*ranges))
+    cursor.execute("""
+        WITH affected AS (
+            SELECT a.symbol, a.first_date,
+                   COALESCE((SELECT MAX(s.date) FROM stock_data s
+                             WHERE s.symbol = a.symbol AND s.date < a.first_date), a.first_date) AS lo,
+                   COALESCE((SELECT MIN(s.date) FROM stock_data s
+                             WHERE s.symbol = a.symbol AND s.date > a.last_date), a.last_date) AS hi
+            FROM unnest(%s::text[], %s::date[], %s::date[]) AS a(symbol, first_date, last_date)
+        ),
+        priced AS (
+            SELECT s.symbol, s.date, s.close, a.first_date,
+                   LAG(s.close) OVER (PARTITION BY s.symbol ORDER BY s.date) AS prev_close
+            FROM stock_data s
+            JOIN affected a ON s.symbol = a.symbol AND s.date BETWEEN a.lo AND a.hi
+        )
+        INSERT INTO stock_returns (symbol, date, simple_return, log_return)
+        SELECT symbol, date, close / prev_close - 1, LN(close / prev_close)
+        FROM priced
+        WHERE date >= first_date AND prev_close > 0 AND close > 0
+        ON CONFLICT (symbol, date) DO UPDATE
+        SET simple_return = EXCLUDED.simple_return, log_return = EXCLUDED.log_return;
+    """, (symbols, firsts, lasts))
+
+# Write the returns of the whole stored history of `symbols`
+
+def _backfill_returns(cursor, symbols):
+    cursor.execute("""
+        INSERT INTO stock_returns (symbol, date, simple_return, log_return)
+        SELECT symbol, date, close / prev_close - 1, LN(close / prev_close)
+        FROM (
+            SELECT symbol, date, close,
+                   LAG(close) OVER (PARTITION BY symbol ORDER BY date) AS prev_close
+            FROM stock_data
+            WHERE symbol = ANY(%s)
+        ) AS priced
+        WHERE prev_close > 0 AND close > 0
+        ON CONFLICT (symbol, date) DO UPDATE
+        SET simple_return = EXCLUDED.simple_return, log_return = EXCLUDED.log_return;
+    """, (list(symbols),))
+    return cursor.rowcount
+
+# Build stock_returns for the whole existing history, a batch of symbols per statement
+
+def backfill_returns(conn, symbols=None, batch_size=500):
+    if symbols is None:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT DISTINCT symbol FROM stock_data ORDER BY symbol;")
+            symbols = [row[0] for row in cursor.fetchall()]
+    written = 0
+    for start in range(0, len(symbols), batch_size):
+        with conn.cursor() as cursor:
+            written += _backfill_returns(cursor, symbols[start:start + batch_size])
+        conn.commit()
+        print(f"Returns backfilled for {min(start + batch_size, len(symbols))}/{len(symbols)} symbols.")
+    return written
+
+# Load materialized daily returns ("simple" or "log") into a preallocated (date x symbol) array
+# Returns (values, DatetimeIndex, {symbol: column}) like load_price_matrix
+
+def load_returns_matrix(conn, symbols, start_date=None, end_date=None, kind="simple",
+                        dtype=np.float64, itersize=50000):
+    if kind not in ("simple", "log"):
+        raise ValueError(f"Unknown return kind: {kind}")
+    return _load_matrix(conn, "stock_returns", f"{kind}_return", symbols, start_date, end_date, dtype, itersize)
+
+# Load materialized daily returns ("simple" or "log") as a wide (date x symbol) DataFrame
+# A return spans any gap in a symbol's own rows (LAG over stock_data, see PriceMatrix.to_returns)
+# By default only dates where every symbol has a return are kept; `complete=False` keeps every date
+# and leaves missing returns as NaN
+
+def load_returns_frame(conn, symbols, start_date=None, end_date=None, kind="simple",
+                       dtype=np.float64, itersize=50000, complete=True):
+    returns = price_matrix_to_frame(*load_returns_matrix(conn, symbols, start_date, end_date, kind, dtype, itersize))
+    return returns.dropna() if complete else returns
@@ -0,0 +1,174 @@
+# export_web_data.py
+import argparse
+import gzip
+import json
+import math
+import os
+from datetime import date, timedelta
+import numpy as np
+
+# Static data directory of the web app
+WEB_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "finance_analyzer", "public", "data")
+
+# Trading days of price history embedded per company (about one year, like the Node fetcher)
+HISTORY_DAYS = 252
+
+# Fields of a company record, in the order the web app's data.json uses
+RECORD_FIELDS = ("name", "sector", "symbol", "price", "priceHistory", "revenue", "ebitdaMargin", "debtToEbitda",
+                 "growth", "sharesOutstanding", "netDebt", "ebitda", "ebitdaGrowth", "enterpriseValue",
+                 "revenueToEV", "trend", "roe", "country")
+
+# Fields computed here from stock_data/index_info; every other field comes from the fundamentals file
+PRICE_FIELDS = ("name", "symbol", "price", "priceHistory", "trend")
+
+# Output files: the full JSON the app has always read, and the compact pair it reads first
+FULL_FILE = "data.json"
+SUMMARIES_FILE = "summaries.min.json"
+PRICES_FILE = "prices.f32"
+
+# Price history of every symbol: the last `days` closes each one has, oldest first
+
+def load_histories(store, symbols, days=HISTORY_DAYS, end_date=None):
+    end = date.fromisoformat(str(end_date)) if end_date is not None else date.today()
+    # Calendar window wide enough for `days` trading days plus holidays
+    start = end - timedelta(days=days * 7 // 5 + 30)
+    values, _, columns = store.load_price_matrix(symbols, start, end)
+    histories = {}
+    for symbol, k in columns.items():
+        column = values[:, k]
+        histories[symbol] = column[~np.isnan(column)][-days:]
+    return histories
+
+# Existing company records keyed by symbol (fundamentals are not in the database)
+
+def read_fundamentals(path):
+    if path is None or not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return {company["symbol"]: company for company in json.load(f)}
+
+def _number(value):
+    value = float(value)
+    return round(value, 4) if math.isfinite(value) else None
+
+# One data.json record: price fields from the store, the rest from the fundamentals
+
+def build_record(symbol, name, history, fundamentals):
+    record = dict.fromkeys(RECORD_FIELDS)
+    record.update({field: value for field, value in fundamentals.items() if field not in PRICE_FIELDS})
+    record["name"] = name or fundamentals.get("name") or symbol
+    record["symbol"] = symbol
+    record["sector"] = record["sector"] or "Unknown"
+    record["country"] = record["country"] or "FR"
+    record["priceHistory"] = [_number(value) for value in history]
+    record["price"] = record["priceHistory"][-1] if len(history) else fundamentals.get("price")
+    start, end = (history[0], history[-1]) if len(history) > 1 else (None, None)
+    record["trend"] = _number((end - start) / start * 100) if start else None
+    return record
+
+def build_records(store, symbols=None, fundamentals=None, days=HISTORY_DAYS, end_date=None):
+    fundamentals = fundamentals or {}
+    if symbols is None:
+        symbols = list(fundamentals) or store.all_symbols()
+    histories = load_histories(store, symbols, days, end_date)
+    names = store.get_symbol_names(symbols)
+    return [build_record(symbol, names.get(symbol), histories.get(symbol, np.empty(0)),
+                         fundamentals.get(symbol, {}))
+            for symbol in symbols]
+
+# Compact form: summaries without priceHistory plus every history packed into one float32 array.
+# Company k's history is prices[historyOffset:historyOffset + historyLength]; the browser maps the
+# blob as a Float32Array and slices it without parsing any text.
+
+def pack_records(records):
+    summaries, parts, offset = [], [], 0
+    for record in records:
+        history = np.asarray([np.nan if value is None else value for value in record["priceHistory"]],
+                             dtype="<f4")
+        summary = {field: value for field, value in record.items() if field != "priceHistory"}
+        summary["historyOffset"] = offset
+        summary["historyLength"] = len(history)
+        summaries.append(summary)
+        parts.append(history)
+        offset += len(history)
+    prices = np.concatenate(parts) if parts else np.empty(0, dtype="<f4")
+    return summaries, prices
+
+def _write(path, payload):
+    with open(path + ".tmp", "wb") as f:
+        f.write(payload)
+    os.replace(path + ".tmp", path)
+
+# Write `payload` and its pre-compressed .gz (and .br when brotli is installed) variants
+# gzip's mtime is pinned so unchanged data gives byte-identical files (and stable ETags)
+
+def write_variants(path, payload, brotli_quality=11):
+    sizes = {path: len(payload)}
+    _write(path, payload)
+    compressed = gzip.compress(payload, compresslevel=9, mtime=0)
+    _write(path + ".gz", compressed)
+    sizes[path + ".gz"] = len(compressed)
+    try:
+        import brotli
+    except ImportError:
+        return sizes
+    compressed = brotli.compress(payload, quality=brotli_quality)
+    _write(path + ".br", compressed)
+    sizes[path + ".br"] = len(compressed)
+    return sizes
+
+def export_web_data(records, output_dir=WEB_DATA_DIR, pretty=False):
+    os.makedirs(output_dir, exist_ok=True)
+    if pretty:
+        full = json.dumps(records, indent=2, ensure_ascii=False)
+    else:
+        full = json.dumps(records, separators=(",", ":"), ensure_ascii=False)
+    sizes = write_variants(os.path.join(output_dir, FULL_FILE), full.encode("utf-8"))
+
+    summaries, prices = pack_records(records)
+    manifest = {
+        "generated": date.today().isoformat(),
+        "prices": {"file": PRICES_FILE, "dtype": "float32", "byteOrder": "little", "length": len(prices)},
+        "companies": summaries,
+    }
+    sizes.update(write_variants(os.path.join(output_dir, SUMMARIES_FILE),
+                                json.dumps(manifest, separators=(",", ":"), ensure_ascii=False).encode("utf-8")))
+    sizes.update(write_variants(os.path.join(output_dir, PRICES_FILE), prices.tobytes()))
+    return sizes
+
+# Parse CLI arguments
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Export the web app's company dataset and its compact variants")
+    parser.add_argument("--symbols", nargs="*", default=None,
+                        help="Symbols or names (the fundamentals file's companies, else all known symbols)")
+    parser.add_argument("--fundamentals", type=str, default=os.path.join(WEB_DATA_DIR, FULL_FILE),
+                        help="Existing data.json supplying the fields not stored in the database")
+    parser.add_argument("--output_dir", type=str, default=WEB_DATA_DIR, help="Directory receiving the files")
+    parser.add_argument("--days", type=int, default=HISTORY_DAYS, help="Trading days of price history per company")
+    parser.add_argument("--end_date", type=str, default=None, help="Last date of the history (YYYY-MM-DD)")
+    parser.add_argument("--pretty", action="store_true", help="Indent data.json instead of minifying it")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    from price_store import open_store
+    from sector_scoring import print_diagnostics, score_records
+
+    args = parse_arguments()
+    fundamentals = read_fundamentals(args.fundamentals)
+    store = open_store()
+    try:
+        symbols = None
+        if args.symbols:
+            symbols, missing = store.validate_symbols_or_names(args.symbols)
+            if missing:
+                raise ValueError(f"The following inputs were not found in the database: {', '.join(missing)}")
+        records = build_records(store, symbols, fundamentals, args.days, args.end_date)
+    finally:
+        store.close()
+
+    print_diagnostics(score_records(records))
+    sizes = export_web_data(records, args.output_dir, pretty=args.pretty)
+    for path, size in sizes.items():
+        print(f"{os.path.basename(path):<24} {size / 1024:8.1f} KiB")
@@ -1,11 +1,95 @@
 # fetch_data.py
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import yfinance as yf
+from profiling import profiled, count
+
+# Messages yfinance records for a symbol that simply has no rows in the requested range
+NO_DATA_MESSAGES = ("possibly delisted", "no price data found")
+
+# Raised when a download failed (throttled, network error...), as opposed to a range without rows
+
+class DownloadError(Exception):
+    pass
 
 # Download historical stock data for a given symbol from Yahoo Finance
+# yf.download swallows errors and returns an empty frame: an empty result is only trusted when the
+# error yfinance recorded for the symbol says there is no price data
 
 def fetch_stock_data(symbol, start_date, end_date):
     print(f"Downloading data for {symbol}...")
     data = yf.download(symbol, start=start_date, end=end_date)
+    if data.empty:
+        error = yf.shared._ERRORS.get(symbol.upper())
+        if error and not any(message in error for message in NO_DATA_MESSAGES):
+            raise DownloadError(f"Download of {symbol} failed: {error}")
     if 'Ticker' in data.columns.names:
         data.columns = data.columns.droplevel('Ticker')
-    return data
\ No newline at end of file
+    return data
+
+# Thread-safe limiter allowing at most `rate` calls per second across all workers
+
+class RateLimiter:
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next_slot = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next_slot, now)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+# Call the downloader for one symbol, retrying failures with exponential backoff
+# An empty frame is a valid answer (no trading days in the range); throttling reaches here as an
+# exception (DownloadError from fetch_stock_data) and is retried
+
+@profiled("fetch.download")
+def fetch_with_retries(downloader, limiter, symbol, start_date, end_date, retries, backoff):
+    for attempt in range(retries + 1):
+        limiter.wait()
+        try:
+            data = downloader(symbol, start_date, end_date)
+            count("downloads")
+            count("download_rows", 0 if data is None else len(data))
+            return data
+        except Exception as e:
+            if attempt == retries:
+                raise
+            delay = backoff * (2 ** attempt)
+            print(f"Download of {symbol} failed ({e}), retrying in {delay:.1f}s...")
+            time.sleep(delay)
+
+# Download many (symbol, start_date, end_date) ranges concurrently through a bounded worker pool
+# Yields ((symbol, start_date, end_date), data, error) as each download finishes;
+# a failing range never stops the others
+
+def fetch_ranges(ranges, downloader=fetch_stock_data, max_workers=8, rate_limit=None, retries=3, backoff=1.0):
+    limiter = RateLimiter(rate_limit)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(fetch_with_retries, downloader, limiter, symbol,
+                            start_date, end_date, retries, backoff): (symbol, start_date, end_date)
+            for symbol, start_date, end_date in ranges
+        }
+        for future in as_completed(futures):
+            request = futures[future]
+            try:
+                yield request, future.result(), None
+            except Exception as e:
+                yield request, None, e
+
+# Download many symbols over the same date range concurrently
+# Yields (symbol, data, error) as each download finishes
+
+def fetch_many(symbols, start_date, end_date, downloader=fetch_stock_data, max_workers=8,
+               rate_limit=None, retries=3, backoff=1.0):
+    ranges = [(symbol, start_date, end_date) for symbol in symbols]
+    for (symbol, _, _), data, error in fetch_ranges(ranges, downloader, max_workers, rate_limit, retries, backoff):
+        yield symbol, data, error
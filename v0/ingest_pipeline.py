@@ -0,0 +1,186 @@
+# ingest_pipeline.py
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from db_utils import connect_to_postgres, frames_to_csv, copy_stock_data, record_coverage
+from fetch_data import fetch_stock_data, RateLimiter, fetch_with_retries
+
+# Per-stage throughput counters
+# busy: time spent doing the stage's work; idle: waiting for input; blocked: waiting for room downstream
+# The stage with the highest utilization (busy time per worker over wall time) is the bottleneck
+
+class StageStats:
+    def __init__(self, name, workers):
+        self.name = name
+        self.workers = workers
+        self.items = 0
+        self.rows = 0
+        self.busy = 0.0
+        self.idle = 0.0
+        self.blocked = 0.0
+
+    def utilization(self, elapsed):
+        return self.busy / (self.workers * elapsed) if elapsed > 0 else 0.0
+
+    def summary(self, elapsed):
+        rate = self.rows / self.busy if self.busy > 0 else 0.0
+        return (f"{self.name:>10}: {self.items:6d} items {self.rows:10d} rows  {rate:12,.0f} rows/s busy  "
+                f"utilization {self.utilization(elapsed):6.1%}  idle {self.idle:7.2f} s  blocked {self.blocked:7.2f} s")
+
+async def _timed_get(queue, stats):
+    start = time.perf_counter()
+    item = await queue.get()
+    stats.idle += time.perf_counter() - start
+    return item
+
+async def _timed_put(queue, item, stats):
+    start = time.perf_counter()
+    await queue.put(item)
+    stats.blocked += time.perf_counter() - start
+
+# Writer step, run in a worker thread: COPY the batch and record the coverage of its ranges
+# Every range here was downloaded, empty ones included (no trading days is an answer too);
+# failed downloads never reach the writer, and record_coverage leaves out dates from today on
+
+def _write_batch(conn, requests, buffer, total, refresh_returns):
+    inserted, skipped = copy_stock_data(conn, buffer, total, refresh_returns) if total else (0, 0)
+    for symbol, start_date, end_date in requests:
+        record_coverage(conn, symbol, start_date, end_date)
+    return inserted, skipped
+
+async def ingest_ranges(ranges, connect=connect_to_postgres, downloader=fetch_stock_data, fetch_workers=8,
+                        transform_workers=2, write_workers=1, queue_size=8, batch_rows=100000,
+                        rate_limit=None, retries=3, backoff=1.0, refresh_returns=True):
+    """
+    Download (symbol, start_date, end_date) ranges and ingest them into stock_data as a
+    three-stage pipeline connected by bounded queues:
+    fetch (downloads in threads) -> transform (CSV batches of up to `batch_rows` rows, in threads)
+    -> write (COPY + coverage, one connection per writer).
+    A full queue pauses the stage feeding it, so memory stays bounded whichever stage is slowest.
+    On cancellation, or when a transformer or writer raises, every stage stops (the error is
+    re-raised); writes already in progress are committed before their connection is closed.
+    Returns a dict with rows inserted/skipped, failed ranges and stage stats.
+    """
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=fetch_workers + transform_workers + write_workers)
+    stats = {
+        "fetch": StageStats("fetch", fetch_workers),
+        "transform": StageStats("transform", transform_workers),
+        "write": StageStats("write", write_workers),
+    }
+    limiter = RateLimiter(rate_limit)
+    pending = asyncio.Queue()
+    for request in ranges:
+        pending.put_nowait(tuple(request))
+    frames = asyncio.Queue(maxsize=queue_size)
+    batches = asyncio.Queue(maxsize=queue_size)
+    failures = []
+    totals = {"inserted": 0, "skipped": 0}
+
+    async def fetcher():
+        while not pending.empty():
+            symbol, start_date, end_date = pending.get_nowait()
+            start = time.perf_counter()
+            try:
+                data = await loop.run_in_executor(executor, fetch_with_retries, downloader, limiter, symbol,
+                                                  start_date, end_date, retries, backoff)
+            except Exception as e:
+                print(f"Download failed for {symbol} ({start_date} to {end_date}): {e}")
+                failures.append(((symbol, start_date, end_date), e))
+                continue
+            finally:
+                stats["fetch"].busy += time.perf_counter() - start
+            stats["fetch"].items += 1
+            stats["fetch"].rows += 0 if data is None else len(data)
+            await _timed_put(frames, ((symbol, start_date, end_date), data), stats["fetch"])
+
+    async def transformer():
+        done = False
+        while not done:
+            item = await _timed_get(frames, stats["transform"])
+            if item is None:
+                return
+            # Drain whatever is already waiting into the same batch, up to batch_rows
+            requests, batch, rows = [], {}, 0
+            while item is not None:
+                request, data = item
+                requests.append(request)
+                if data is not None and not data.empty:
+                    symbol = request[0]
+                    batch[symbol] = data if symbol not in batch else pd.concat([batch[symbol], data])
+                    rows += len(data)
+                if rows >= batch_rows:
+                    break
+                try:
+                    item = frames.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
+                done = item is None
+            start = time.perf_counter()
+            buffer, total = await loop.run_in_executor(executor, frames_to_csv, batch)
+            stats["transform"].busy += time.perf_counter() - start
+            stats["transform"].items += len(requests)
+            stats["transform"].rows += total
+            await _timed_put(batches, (requests, buffer, total), stats["transform"])
+
+    async def writer():
+        conn = await loop.run_in_executor(executor, connect)
+        try:
+            while True:
+                item = await _timed_get(batches, stats["write"])
+                if item is None:
+                    return
+                requests, buffer, total = item
+                start = time.perf_counter()
+                write = loop.run_in_executor(executor, _write_batch, conn, requests, buffer, total, refresh_returns)
+                try:
+                    inserted, skipped = await asyncio.shield(write)
+                except asyncio.CancelledError:
+                    # Let the transaction in flight finish before the connection is closed
+                    await asyncio.wait([write])
+                    raise
+                stats["write"].busy += time.perf_counter() - start
+                stats["write"].items += len(requests)
+                stats["write"].rows += total
+                totals["inserted"] += inserted
+                totals["skipped"] += skipped
+        finally:
+            conn.close()
+
+    # Each stage is closed with one sentinel per downstream worker once all its workers have drained
+    async def close_stage(workers, queue, consumers):
+        await asyncio.gather(*workers)
+        for _ in range(consumers):
+            await queue.put(None)
+
+    started = time.perf_counter()
+    fetchers = [asyncio.create_task(fetcher()) for _ in range(fetch_workers)]
+    transformers = [asyncio.create_task(transformer()) for _ in range(transform_workers)]
+    writers = [asyncio.create_task(writer()) for _ in range(write_workers)]
+    tasks = fetchers + transformers + writers + [
+        asyncio.create_task(close_stage(fetchers, frames, transform_workers)),
+        asyncio.create_task(close_stage(transformers, batches, write_workers)),
+    ]
+    try:
+        # A failing worker would leave its neighbours blocked on a queue forever:
+        # the first exception in any stage stops the whole pipeline and is re-raised
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        for task in done:
+            if not task.cancelled() and task.exception() is not None:
+                raise task.exception()
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    elapsed = time.perf_counter() - started
+    print(f"Ingested {len(ranges) - len(failures)}/{len(ranges)} ranges in {elapsed:.2f} s: "
+          f"{totals['inserted']} rows inserted, {totals['skipped']} skipped.")
+    for stage in stats.values():
+        print(stage.summary(elapsed))
+    bottleneck = max(stats.values(), key=lambda stage: stage.utilization(elapsed))
+    print(f"Bottleneck: {bottleneck.name}")
+    return {"inserted": totals["inserted"], "skipped": totals["skipped"], "failures": failures,
+            "stats": stats, "elapsed": elapsed}
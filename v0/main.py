@@ -1,10 +1,12 @@
 # main.py
 import argparse
-import pandas as pd
-from db_utils import connect_to_postgres, insert_stock_data, insert_stock_name, validate_symbols_or_names, get_symbol_names, all_symbols, data_already_exists
-from data_utils import calculate_daily_returns, calculate_correlation_matrix, calculate_rolling_correlation
+import asyncio
+from db_utils import connect_to_postgres, insert_stock_name, validate_symbols_or_names, get_symbol_names, ensure_coverage_table, ensure_returns_table, missing_ranges, load_returns_frame
+from data_utils import calculate_correlation_matrix, calculate_rolling_correlation
 from plot_utils import plot_heatmap, plot_rolling_correlation
-from fetch_data import fetch_stock_data
+from ingest_pipeline import ingest_ranges
+from schema import ensure_year_partitions
+from profiling import add_profile_argument, enable_from_args, span
 
 # Parse CLI arguments for high-level project execution
 
@@ -15,11 +17,19 @@ def parse_arguments():
     parser.add_argument("--end_date", type=str, default="2023-12-31", help="End date (YYYY-MM-DD)")
     parser.add_argument("--window", type=int, default=30, help="Rolling window size in days")
     parser.add_argument("--name", type=str, default="None", help="Optional human-readable name for the symbol")
+    parser.add_argument("--workers", type=int, default=8, help="Number of concurrent downloads")
+    parser.add_argument("--rate_limit", type=float, default=None, help="Maximum downloads started per second")
+    parser.add_argument("--retries", type=int, default=3, help="Retries per symbol on download failure")
+    parser.add_argument("--transform_workers", type=int, default=2, help="Workers building ingest batches")
+    parser.add_argument("--writers", type=int, default=1, help="Concurrent database writers (one connection each)")
+    parser.add_argument("--queue_size", type=int, default=8, help="Capacity of the queues between pipeline stages")
+    add_profile_argument(parser)
     return parser.parse_args()
 
 # Main orchestrator
 if __name__ == "__main__":
     args = parse_arguments()
+    enable_from_args(args)
 
     # Connect to database
     conn = connect_to_postgres()
@@ -30,32 +40,30 @@ if __name__ == "__main__":
         if missing:
             raise ValueError(f"The following symbols/names were not found: {', '.join(missing)}")
 
-        # Download and store data only if not already present
+        # Download and store only the date ranges not already loaded
+        ensure_coverage_table(conn)
+        ensure_returns_table(conn)
+        ensure_year_partitions(conn, int(args.start_date[:4]), int(args.end_date[:4]))
+        gaps = missing_ranges(conn, symbols, args.start_date, args.end_date)
+        to_fetch = []
         for sym in symbols:
-            if not data_already_exists(conn, sym, args.start_date, args.end_date):
-                data = fetch_stock_data(sym, args.start_date, args.end_date)
-                insert_stock_data(conn, sym, data)
+            if gaps[sym]:
+                to_fetch.extend((sym, start, end) for start, end in gaps[sym])
             else:
                 print(f"Data for {sym} from {args.start_date} to {args.end_date} already exists in database.")
             insert_stock_name(conn, sym, args.name)
 
-        # Load full data from DB for selected symbols
-        query = """
-            SELECT symbol, date, close
-            FROM stock_data
-            WHERE symbol IN %s
-            ORDER BY date;
-        """
-        with conn.cursor() as cursor:
-            cursor.execute(query, (tuple(symbols),))
-            rows = cursor.fetchall()
+        # Downloads, batch building and database writes overlap in a bounded asyncio pipeline
+        if to_fetch:
+            with span("ingest"):
+                asyncio.run(ingest_ranges(to_fetch, fetch_workers=args.workers, transform_workers=args.transform_workers,
+                                          write_workers=args.writers, queue_size=args.queue_size,
+                                          rate_limit=args.rate_limit, retries=args.retries))
 
-        df = pd.DataFrame(rows, columns=["symbol", "date", "close"])
-        df['date'] = pd.to_datetime(df['date'])
-        pivoted = df.pivot(index="date", columns="symbol", values="close")
+        # Daily returns were materialized at ingest time; read them for the requested window
+        returns = load_returns_frame(conn, symbols, args.start_date, args.end_date)
 
-        # Calculate returns and correlation
-        returns = calculate_daily_returns(pivoted)
+        # Calculate correlation
         correlation_df = calculate_correlation_matrix(returns, symbols)
 
         # Plot heatmap of correlations
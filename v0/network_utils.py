@@ -0,0 +1,115 @@
+# network_utils.py
+import json
+import os
+import numpy as np
+from corr_engine import upper_triangle_pairs
+
+# Edge topologies accepted by build_network
+TOPOLOGIES = ("threshold", "mst", "topk")
+
+# All pairs with |correlation| above the threshold, read from the upper triangle in one pass
+# Returns (i, j, corr) arrays
+
+def threshold_edges(matrix, threshold=0.5):
+    rows, cols = upper_triangle_pairs(matrix.shape[0])
+    corr = matrix[rows, cols]
+    keep = np.abs(corr) > threshold
+    return rows[keep], cols[keep], corr[keep]
+
+# The k strongest (by |correlation|) neighbours of every node; at most N·k edges
+# Pairs without a finite correlation (too little overlap) are never edges, so a node may get fewer than k
+
+def top_k_edges(matrix, k=3):
+    n = matrix.shape[0]
+    k = min(k, n - 1)
+    if k <= 0:
+        return np.array([], dtype=int), np.array([], dtype=int), np.array([])
+    strength = np.abs(matrix)
+    strength[~np.isfinite(strength)] = -np.inf
+    np.fill_diagonal(strength, -np.inf)
+    neighbours = np.argpartition(-strength, k - 1, axis=1)[:, :k]
+    rows = np.repeat(np.arange(n), k)
+    cols = neighbours.ravel()
+    finite = np.isfinite(strength[rows, cols])
+    rows, cols = rows[finite], cols[finite]
+    # An edge chosen from both ends is kept once
+    rows, cols = np.minimum(rows, cols), np.maximum(rows, cols)
+    pairs = np.unique(np.stack([rows, cols], axis=1), axis=0)
+    rows, cols = pairs[:, 0], pairs[:, 1]
+    return rows, cols, matrix[rows, cols]
+
+# Minimum spanning tree on the correlation distance sqrt(2(1 - rho)) with Prim's algorithm
+# O(N²) vectorized; gives the N-1 edges that keep every symbol connected through its closest peers
+
+def minimum_spanning_tree_edges(matrix):
+    n = matrix.shape[0]
+    if n < 2:
+        return np.array([], dtype=int), np.array([], dtype=int), np.array([])
+    distance = np.sqrt(np.clip(2 * (1 - np.nan_to_num(matrix, nan=0.0)), 0, None))
+    in_tree = np.zeros(n, dtype=bool)
+    in_tree[0] = True
+    best = distance[0].copy()
+    parent = np.zeros(n, dtype=int)
+    rows, cols = [], []
+    for _ in range(n - 1):
+        candidates = np.where(in_tree, np.inf, best)
+        node = int(np.argmin(candidates))
+        rows.append(parent[node])
+        cols.append(node)
+        in_tree[node] = True
+        closer = distance[node] < best
+        best = np.where(closer, distance[node], best)
+        parent = np.where(closer, node, parent)
+    rows, cols = np.array(rows), np.array(cols)
+    return rows, cols, matrix[rows, cols]
+
+# Build a networkx graph from a labelled correlation matrix with the chosen edge topology
+
+def build_network(correlation_df, topology="threshold", threshold=0.5, k=3):
+    import networkx as nx
+    labels = list(correlation_df.columns)
+    matrix = correlation_df.to_numpy()
+    if topology == "threshold":
+        rows, cols, corr = threshold_edges(matrix, threshold)
+    elif topology == "mst":
+        rows, cols, corr = minimum_spanning_tree_edges(matrix)
+    elif topology == "topk":
+        rows, cols, corr = top_k_edges(matrix, k)
+    else:
+        raise ValueError(f"Unknown network topology '{topology}', expected one of {', '.join(TOPOLOGIES)}")
+
+    graph = nx.Graph()
+    graph.add_nodes_from(labels)
+    graph.add_edges_from(
+        (labels[i], labels[j], {"weight": abs(c), "sign": "positive" if c > 0 else "negative"})
+        for i, j, c in zip(rows.tolist(), cols.tolist(), corr.tolist())
+    )
+    return graph
+
+# Spring layout whose positions are stored in `cache_path` (JSON) and reused between runs
+# Known nodes keep their cached position; only new nodes are placed by a short layout pass
+
+def cached_layout(graph, cache_path=None, seed=42):
+    import networkx as nx
+    cached = {}
+    if cache_path and os.path.exists(cache_path):
+        with open(cache_path) as f:
+            cached = {node: tuple(xy) for node, xy in json.load(f).items()}
+
+    nodes = [str(node) for node in graph.nodes]
+    known = {node: cached[str(node)] for node in graph.nodes if str(node) in cached}
+    if len(known) == len(nodes):
+        return known
+    if known:
+        pos = nx.spring_layout(graph, pos=known, fixed=list(known), seed=seed, iterations=20)
+    else:
+        pos = nx.spring_layout(graph, seed=seed)
+
+    if cache_path:
+        cached.update({str(node): [float(x), float(y)] for node, (x, y) in pos.items()})
+        directory = os.path.dirname(cache_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(cache_path, "w") as f:
+            json.dump(cached, f)
+    return {node: tuple(xy) for node, xy in pos.items()}
@@ -1,34 +1,260 @@
 # plot_utils.py
+import hashlib
+import io
+import os
+import pickle
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+import matplotlib
+
+# Headless mode (no window, figures only returned/rendered) is selected with PLOT_HEADLESS=1
+if os.environ.get("PLOT_HEADLESS") == "1":
+    matplotlib.use("Agg")
+
 import matplotlib.pyplot as plt
 import seaborn as sns
+from profiling import profiled
+
+# Above this many symbols the heatmap drops cell annotations
+ANNOTATION_LIMIT = 30
+# Above this many symbols the heatmap is drawn as a single raster image instead of one mesh cell per pair
+RASTER_LIMIT = 150
+# Maximum side, in grid cells, of the density matrix mosaic; with many symbols each pair gets fewer bins
+DENSITY_MOSAIC_CELLS = 4096
+# Number of rendered images kept in the in-process cache
+RENDER_CACHE_SIZE = 128
+
+_interactive = os.environ.get("PLOT_HEADLESS") != "1"
+_render_cache = OrderedDict()
+
+# Switch between interactive display (plt.show) and headless rendering
+
+def set_interactive(enabled):
+    global _interactive
+    _interactive = enabled
+
+# Show the figure when interactive, then hand it back to the caller either way
+
+def _finish(fig):
+    if _interactive:
+        plt.show()
+    return fig
 
 # Plot a masked heatmap to visualize correlations between time series
 
+@profiled("render.heatmap")
 def plot_heatmap(correlation_df, title="Correlation Matrix"):
-    import numpy as np
+    n = correlation_df.shape[0]
     mask = np.triu(np.ones(correlation_df.shape), k=1)
-    plt.figure(figsize=(12, 10))
-    sns.heatmap(
-        correlation_df,
-        mask=mask,
-        annot=True,
-        fmt=".2f",
-        cmap="coolwarm",
-        cbar_kws={'label': 'Correlation coefficient'}
-    )
-    plt.title(title, fontsize=16)
-    plt.xticks(rotation=45, ha='right', fontsize=12)
-    plt.yticks(fontsize=12)
-    plt.tight_layout()
-    plt.show()
+    fig = plt.figure(figsize=(12, 10))
+    label_size = 12 if n <= ANNOTATION_LIMIT else max(2, 12 * ANNOTATION_LIMIT // n)
+
+    if n > RASTER_LIMIT:
+        # One image instead of n² mesh cells; labels are thinned to stay legible
+        ax = fig.add_subplot()
+        image = ax.imshow(np.ma.masked_array(correlation_df.to_numpy(), mask=mask.astype(bool)),
+                          cmap="coolwarm", vmin=-1, vmax=1, interpolation="nearest")
+        fig.colorbar(image, ax=ax, label='Correlation coefficient')
+        step = int(np.ceil(n / RASTER_LIMIT))
+        ticks = np.arange(0, n, step)
+        ax.set_xticks(ticks, [str(correlation_df.columns[k]) for k in ticks], rotation=90, fontsize=label_size)
+        ax.set_yticks(ticks, [str(correlation_df.index[k]) for k in ticks], fontsize=label_size)
+        ax.set_title(title, fontsize=16)
+    else:
+        sns.heatmap(
+            correlation_df,
+            mask=mask,
+            annot=n <= ANNOTATION_LIMIT,
+            fmt=".2f",
+            cmap="coolwarm",
+            cbar_kws={'label': 'Correlation coefficient'}
+        )
+        plt.title(title, fontsize=16)
+        plt.xticks(rotation=45, ha='right', fontsize=label_size)
+        plt.yticks(fontsize=label_size)
+    fig.tight_layout()
+    return _finish(fig)
 
 # Plot a line graph of rolling correlation between two assets
 
+@profiled("render.rolling_correlation")
 def plot_rolling_correlation(rolling_corr, sym1, sym2, window):
-    rolling_corr.plot(title=f"Rolling Correlation between {sym1} and {sym2} ({window}-day window)")
-    plt.xlabel("Date")
-    plt.ylabel("Correlation")
-    plt.ylim(-1, 1)
-    plt.grid(True)
-    plt.tight_layout()
-    plt.show()
\ No newline at end of file
+    fig, ax = plt.subplots()
+    rolling_corr.plot(ax=ax, title=f"Rolling Correlation between {sym1} and {sym2} ({window}-day window)")
+    ax.set_xlabel("Date")
+    ax.set_ylabel("Correlation")
+    ax.set_ylim(-1, 1)
+    ax.grid(True)
+    fig.tight_layout()
+    return _finish(fig)
+
+# Plot a network where nodes are symbols and edges link strongly correlated pairs
+# topology: "threshold" (|corr| > threshold), "mst" (minimum spanning tree) or "topk" (k strongest per node)
+
+@profiled("render.correlation_network")
+def plot_correlation_network(correlation_df, threshold=0.5, title="Correlation Network Between Symbols",
+                             topology="threshold", k=3, layout_cache=None):
+    import networkx as nx
+    from network_utils import build_network, cached_layout
+
+    graph = build_network(correlation_df, topology=topology, threshold=threshold, k=k)
+    n = graph.number_of_nodes()
+
+    # Separate positive and negative edges
+    positive_edges = [(u, v) for u, v, d in graph.edges(data=True) if d['sign'] == "positive"]
+    negative_edges = [(u, v) for u, v, d in graph.edges(data=True) if d['sign'] == "negative"]
+
+    # Node and edge sizes shrink with the universe so large networks stay readable
+    scale = min(1.0, 30 / max(n, 1)) ** 0.5
+    fig = plt.figure(figsize=(12, 12))
+    pos = cached_layout(graph, layout_cache)
+    nx.draw_networkx_nodes(graph, pos, node_size=2000 * scale ** 2, node_color="#cfcfcf")
+    nx.draw_networkx_edges(graph, pos, edgelist=positive_edges,
+                           width=[graph[u][v]['weight'] * 5 * scale for u, v in positive_edges], edge_color="green")
+    nx.draw_networkx_edges(graph, pos, edgelist=negative_edges,
+                           width=[graph[u][v]['weight'] * 5 * scale for u, v in negative_edges], edge_color="red")
+    if n <= 200:
+        nx.draw_networkx_labels(graph, pos, font_size=max(3, 8 * scale), font_color="black")
+    plt.title(title, fontsize=16)
+    plt.axis('off')
+    return _finish(fig)
+
+# Above this many symbols the scatter matrix switches from point pairplots to density grids
+SCATTER_POINTS_LIMIT = 15
+
+# Plot a scatter matrix of the returns
+# mode "points" draws the seaborn pairplot (optionally on a reservoir sample of `sample` dates);
+# mode "density" draws precomputed 2-D histograms; "auto" picks density beyond SCATTER_POINTS_LIMIT symbols
+
+@profiled("render.scatter_matrix")
+def plot_scatter_matrix(returns, title="Scatter Matrix of Returns", mode="auto", bins=64, sample=None):
+    if mode == "auto":
+        mode = "density" if returns.shape[1] > SCATTER_POINTS_LIMIT else "points"
+    if mode == "density":
+        return plot_density_matrix(returns, title=title, bins=bins)
+    if sample is not None:
+        from data_utils import reservoir_sample
+        returns = returns.iloc[reservoir_sample(len(returns), sample)]
+    grid = sns.pairplot(returns, diag_kind="kde", corner=True)
+    grid.figure.suptitle(title, y=1.02, fontsize=16)
+    return _finish(grid.figure)
+
+# Scatter-matrix replacement drawn as a single image: log-density grids below the diagonal and
+# return histograms on it, so the cost depends on N and `bins`, not on the number of observations
+
+@profiled("render.density_matrix")
+def plot_density_matrix(returns, title="Return Density Matrix", bins=64):
+    from data_utils import pair_density_grids
+    labels = [str(label) for label in returns.columns]
+    n = len(labels)
+    bins = max(1, min(bins, DENSITY_MOSAIC_CELLS // max(n, 1)))
+    grids, diagonal, _, pairs = pair_density_grids(returns.to_numpy(), bins=bins)
+
+    mosaic = np.full((n * bins, n * bins), np.nan, dtype=np.float32)
+    for (i, j), grid in zip(pairs, grids):
+        # Lower triangle: row block j (y axis), column block i (x axis), y growing upwards
+        cell = np.log1p(grid.T[::-1])
+        mosaic[j * bins:(j + 1) * bins, i * bins:(i + 1) * bins] = cell / max(cell.max(), 1)
+    heights = diagonal / np.maximum(diagonal.max(axis=1, keepdims=True), 1)
+    levels = (np.arange(bins)[::-1, None] + 0.5) / bins
+    for k in range(n):
+        # Diagonal: filled histogram of symbol k
+        mosaic[k * bins:(k + 1) * bins, k * bins:(k + 1) * bins] = np.where(levels <= heights[k][None, :], 0.6, 0.0)
+
+    fig, ax = plt.subplots(figsize=(12, 12))
+    ax.imshow(mosaic, cmap="viridis", vmin=0, vmax=1, interpolation="nearest")
+    boundaries = np.arange(1, n) * bins - 0.5
+    for boundary in boundaries:
+        ax.axhline(boundary, color="white", linewidth=0.5)
+        ax.axvline(boundary, color="white", linewidth=0.5)
+    centers = np.arange(n) * bins + bins / 2 - 0.5
+    label_size = 10 if n <= ANNOTATION_LIMIT else max(2, 10 * ANNOTATION_LIMIT // n)
+    ax.set_xticks(centers, labels, rotation=90, fontsize=label_size)
+    ax.set_yticks(centers, labels, fontsize=label_size)
+    ax.set_title(title, fontsize=16)
+    fig.tight_layout()
+    return _finish(fig)
+
+# Plot functions addressable by name for cached and batch rendering
+
+PLOTS = {
+    "heatmap": plot_heatmap,
+    "rolling": plot_rolling_correlation,
+    "network": plot_correlation_network,
+    "scatter": plot_scatter_matrix,
+    "density": plot_density_matrix,
+}
+
+# Encode a figure as PNG/SVG bytes and release it
+
+@profiled("render.encode")
+def figure_to_bytes(fig, fmt="png", dpi=100):
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format=fmt, dpi=dpi, bbox_inches="tight")
+    plt.close(fig)
+    return buffer.getvalue()
+
+# Stable digest of plot inputs: array contents plus labels and options
+
+def _render_key(kind, args, kwargs, fmt, dpi):
+    digest = hashlib.sha256()
+    digest.update(f"{kind}|{fmt}|{dpi}".encode())
+    for value in list(args) + sorted(kwargs.items()):
+        if isinstance(value, (pd.DataFrame, pd.Series)):
+            digest.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+            labels = value.columns if isinstance(value, pd.DataFrame) else [value.name]
+            digest.update(repr(list(labels)).encode())
+        elif isinstance(value, np.ndarray):
+            digest.update(value.tobytes())
+            digest.update(repr((value.dtype, value.shape)).encode())
+        else:
+            digest.update(pickle.dumps(value))
+    return digest.hexdigest()
+
+# Render a named plot to image bytes without displaying it; repeated renders of identical inputs
+# and options are served from an in-process LRU cache
+
+def render_plot(kind, *args, fmt="png", dpi=100, **kwargs):
+    key = _render_key(kind, args, kwargs, fmt, dpi)
+    if key in _render_cache:
+        _render_cache.move_to_end(key)
+        return _render_cache[key]
+
+    previous = _interactive
+    set_interactive(False)
+    try:
+        image = figure_to_bytes(PLOTS[kind](*args, **kwargs), fmt=fmt, dpi=dpi)
+    finally:
+        set_interactive(previous)
+
+    _render_cache[key] = image
+    if len(_render_cache) > RENDER_CACHE_SIZE:
+        _render_cache.popitem(last=False)
+    return image
+
+# Worker entry point for batch rendering (always headless)
+
+def _render_job(job):
+    matplotlib.use("Agg")
+    kind, args, kwargs = job
+    return render_plot(kind, *args, **kwargs)
+
+# Render many plots in a process pool; jobs are (kind, args, kwargs) tuples, results keep job order
+# Cached renders are answered locally and only the misses are shipped to the workers
+
+def render_batch(jobs, processes=None):
+    jobs = [(kind, tuple(args), dict(kwargs)) for kind, args, kwargs in jobs]
+    keys = [_render_key(kind, args, {k: v for k, v in kwargs.items() if k not in ("fmt", "dpi")},
+                        kwargs.get("fmt", "png"), kwargs.get("dpi", 100)) for kind, args, kwargs in jobs]
+    images = [_render_cache.get(key) for key in keys]
+    pending = [k for k, image in enumerate(images) if image is None]
+    if pending:
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            for k, image in zip(pending, executor.map(_render_job, [jobs[k] for k in pending])):
+                images[k] = image
+                _render_cache[keys[k]] = image
+        while len(_render_cache) > RENDER_CACHE_SIZE:
+            _render_cache.popitem(last=False)
+    return images
@@ -0,0 +1,168 @@
+# price_matrix.py
+import numpy as np
+import pandas as pd
+from corr_engine import pairwise_correlation
+from profiling import profiled
+
+# Rows processed at a time by the in-place kernels, bounding their temporary buffers
+ROW_BLOCK = 4096
+# Columns forward-filled at a time (the fill needs one integer index per cell of the block)
+COLUMN_BLOCK = 256
+
+# Forward-fill NaNs down each column in place, like DataFrame.ffill
+
+def _ffill_inplace(values):
+    n_rows = values.shape[0]
+    rows = np.arange(n_rows)[:, None]
+    for start in range(0, values.shape[1], COLUMN_BLOCK):
+        block = values[:, start:start + COLUMN_BLOCK]
+        last = np.where(np.isnan(block), 0, rows)
+        np.maximum.accumulate(last, axis=0, out=last)
+        block[...] = np.take_along_axis(block, last, axis=0)
+
+class PriceMatrix:
+    """
+    Dates x symbols matrix of prices or returns held in one contiguous float32/float64 array,
+    with its trading-day index (datetime64[D]) and a symbol -> column map.
+    Date ranges and contiguous column ranges are views of the same memory; returns are
+    computed in place; pandas objects are only built on request and wrap the array without copying.
+    """
+
+    def __init__(self, values, dates, symbols):
+        self.values = values
+        self.dates = np.asarray(dates, dtype="datetime64[D]")
+        self.symbols = list(symbols)
+        self.columns = {symbol: k for k, symbol in enumerate(self.symbols)}
+        if self.values.shape != (len(self.dates), len(self.symbols)):
+            raise ValueError(f"Values of shape {self.values.shape} do not match "
+                             f"{len(self.dates)} dates x {len(self.symbols)} symbols")
+
+    # Build from the (values, dates, {symbol: column}) triple returned by the store loaders
+    @classmethod
+    def from_arrays(cls, values, dates, columns, dtype=None):
+        values = np.ascontiguousarray(values, dtype=dtype)
+        return cls(values, np.asarray(dates, dtype="datetime64[D]"), sorted(columns, key=columns.get))
+
+    # The frame's memory is shared unless pandas hands it out read-only (copy-on-write), since the
+    # in-place kernels need to write to it
+    @classmethod
+    def from_frame(cls, frame, dtype=np.float64):
+        values = np.ascontiguousarray(frame.to_numpy(dtype=dtype))
+        if not values.flags.writeable:
+            values = values.copy()
+        return cls(values, frame.index.values, list(frame.columns))
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    @property
+    def dtype(self):
+        return self.values.dtype
+
+    @property
+    def nbytes(self):
+        return self.values.nbytes + self.dates.nbytes
+
+    def __len__(self):
+        return len(self.dates)
+
+    def column(self, symbol):
+        return self.values[:, self.columns[symbol]]
+
+    # Dates in [start, end], both optional; always a view
+    def between(self, start=None, end=None):
+        lo = 0 if start is None else np.searchsorted(self.dates, np.datetime64(str(start)[:10], "D"), side="left")
+        hi = len(self.dates) if end is None else np.searchsorted(self.dates, np.datetime64(str(end)[:10], "D"), side="right")
+        return PriceMatrix(self.values[lo:hi], self.dates[lo:hi], self.symbols)
+
+    # Subset of symbols in the given order; a view when they form a contiguous run of columns
+    def select(self, symbols):
+        positions = [self.columns[symbol] for symbol in symbols]
+        if positions and positions == list(range(positions[0], positions[0] + len(positions))):
+            values = self.values[:, positions[0]:positions[0] + len(positions)]
+        else:
+            values = self.values[:, positions]
+        return PriceMatrix(values, self.dates, symbols)
+
+    # Symbols with at least one value
+    def available(self):
+        present = np.zeros(len(self.symbols), dtype=bool)
+        for start in range(0, len(self.dates), ROW_BLOCK):
+            present |= ~np.isnan(self.values[start:start + ROW_BLOCK]).all(axis=0)
+        return [symbol for symbol, keep in zip(self.symbols, present) if keep]
+
+    # Dates where every symbol has a value (how="any") or at least one does (how="all"), as a boolean mask
+    def complete_mask(self, how="any"):
+        if how not in ("any", "all"):
+            raise ValueError(f"Unknown how: {how}")
+        complete = np.ones(len(self.dates), dtype=bool)
+        for start in range(0, len(self.dates), ROW_BLOCK):
+            missing = np.isnan(self.values[start:start + ROW_BLOCK])
+            complete[start:start + ROW_BLOCK] = ~(missing.any(axis=1) if how == "any" else missing.all(axis=1))
+        return complete
+
+    def complete_rows(self, inplace=False, how="any"):
+        """
+        Keep only dates where every symbol has a value (DataFrame.dropna(how=how)); self when nothing is
+        dropped. how="all" only drops dates where no symbol has a value.
+        With `inplace`, the kept rows are moved up a block at a time within this matrix's own array and
+        a view of them is returned, so no second matrix is allocated; this matrix is overwritten, as with
+        to_returns. Otherwise the kept rows are copied.
+        """
+        complete = self.complete_mask(how)
+        if complete.all():
+            return self
+        if not inplace:
+            return PriceMatrix(self.values[complete], self.dates[complete], self.symbols)
+        kept = np.flatnonzero(complete)
+        # kept[k] >= k: a row is always read before any later block can overwrite it
+        for start in range(0, len(kept), ROW_BLOCK):
+            rows = kept[start:start + ROW_BLOCK]
+            self.values[start:start + len(rows)] = self.values[rows]
+        return PriceMatrix(self.values[:len(kept)], self.dates[complete], self.symbols)
+
+    @profiled("returns")
+    def to_returns(self, kind="simple"):
+        """
+        Turn prices into daily returns in place and return the matrix of returns (first date dropped).
+        Like LAG(close) over each symbol's own rows in stock_returns, a return spans a gap: it compares
+        a price with the last one before it, and a missing or non-positive price gives NaN at its date.
+        The prices are overwritten: copy the matrix first to keep them.
+        """
+        if kind not in ("simple", "log"):
+            raise ValueError(f"Unknown return kind: {kind}")
+        for first in range(0, self.values.shape[1], COLUMN_BLOCK):
+            values = self.values[:, first:first + COLUMN_BLOCK]
+            priced = values > 0
+            _ffill_inplace(values)
+            # Bottom-up so every block still sees the price of the row above it
+            for stop in range(len(values), 1, -ROW_BLOCK):
+                start = max(stop - ROW_BLOCK, 1)
+                valid = priced[start:stop] & (values[start - 1:stop - 1] > 0)
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    np.divide(values[start:stop], values[start - 1:stop - 1], out=values[start:stop])
+                    if kind == "simple":
+                        values[start:stop] -= 1
+                    else:
+                        np.log(values[start:stop], out=values[start:stop])
+                values[start:stop][~valid] = np.nan
+        return PriceMatrix(self.values[1:], self.dates[1:], self.symbols)
+
+    @profiled("correlation")
+    def correlation(self, symbols=None, min_periods=1):
+        matrix = self if symbols is None else self.select(symbols)
+        result = pairwise_correlation(matrix.values, dtype=self.dtype, min_periods=min_periods)
+        return pd.DataFrame(result, columns=matrix.symbols, index=matrix.symbols)
+
+    def copy(self):
+        return PriceMatrix(self.values.copy(), self.dates.copy(), self.symbols)
+
+    # Wide DataFrame over the same memory (no copy of the values)
+    def to_frame(self):
+        return pd.DataFrame(self.values, index=pd.DatetimeIndex(self.dates, name="date"),
+                            columns=pd.Index(self.symbols, name="symbol"), copy=False)
+
+    def __repr__(self):
+        return (f"PriceMatrix({len(self.dates)} dates x {len(self.symbols)} symbols, {self.dtype}, "
+                f"{self.nbytes / 2**20:.1f} MiB)")
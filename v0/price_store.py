@@ -0,0 +1,233 @@
+# price_store.py
+import argparse
+import os
+import shutil
+from contextlib import contextmanager
+from datetime import date, timedelta
+import numpy as np
+import pandas as pd
+from db_utils import (connect_to_postgres, validate_symbols_or_names, get_symbol_names, all_symbols,
+                      load_price_matrix, price_matrix_to_frame, load_returns_matrix, load_returns_frame, build_symbol_index,
+                      resolve_with_index, split_resolved)
+from price_matrix import PriceMatrix
+
+# Environment variable selecting the read backend: "postgres" (default) or "parquet:<directory>"
+STORE_ENV = "PRICE_STORE"
+
+PRICE_COLUMNS = ("open", "high", "low", "close", "volume")
+
+# Calendar days of prices read before a returns window, to find the close preceding its first date
+RETURNS_LOOKBACK_DAYS = 14
+
+# Read backend over the PostgreSQL stock_data/index_info tables
+# The store owns its connection: every read runs in a transaction of its own, ended when it returns,
+# so a long-lived store (the API server's) never sits idle in a transaction
+
+class PostgresStore:
+    def __init__(self, conn=None):
+        self.conn = conn if conn is not None else connect_to_postgres()
+
+    @contextmanager
+    def _read(self):
+        try:
+            yield self.conn
+        finally:
+            self.conn.rollback()
+
+    def validate_symbols_or_names(self, inputs, use_cache=False):
+        with self._read() as conn:
+            return validate_symbols_or_names(conn, inputs, use_cache=use_cache)
+
+    def get_symbol_names(self, symbols):
+        with self._read() as conn:
+            return get_symbol_names(conn, symbols)
+
+    def all_symbols(self):
+        with self._read() as conn:
+            return all_symbols(conn)
+
+    def load_price_matrix(self, symbols, start_date=None, end_date=None, column="close", dtype=np.float64):
+        with self._read() as conn:
+            return load_price_matrix(conn, symbols, start_date, end_date, column=column, dtype=dtype)
+
+    def load_price_frame(self, symbols, start_date=None, end_date=None, dtype=np.float64):
+        return price_matrix_to_frame(*self.load_price_matrix(symbols, start_date, end_date, dtype=dtype))
+
+    # Daily returns read from the materialized stock_returns table
+    def load_returns_frame(self, symbols, start_date=None, end_date=None, kind="simple", dtype=np.float64,
+                           complete=True):
+        with self._read() as conn:
+            return load_returns_frame(conn, symbols, start_date, end_date, kind=kind, dtype=dtype,
+                                      complete=complete)
+
+    # Daily returns as a compact PriceMatrix (missing returns left as NaN)
+    def load_returns_matrix(self, symbols, start_date=None, end_date=None, kind="simple", dtype=np.float64):
+        with self._read() as conn:
+            return PriceMatrix.from_arrays(*load_returns_matrix(conn, symbols, start_date, end_date, kind, dtype))
+
+    # End the transaction a failed query left aborted, so the shared connection stays usable
+    def rollback(self):
+        self.conn.rollback()
+
+    def close(self):
+        self.conn.close()
+
+# Read backend over a local Parquet copy of stock_data, partitioned by year
+# Layout: <root>/index_info.parquet and <root>/stock_data/year=YYYY/*.parquet, rows sorted by
+# symbol then date so row-group statistics let symbol filters skip most of each file
+
+class ParquetStore:
+    def __init__(self, root):
+        import pyarrow.dataset as ds
+        import pyarrow.fs as fs
+        import pyarrow.parquet as pq
+
+        self.root = root
+        # Memory-mapped reads: pages come straight from the OS cache instead of being copied
+        filesystem = fs.LocalFileSystem(use_mmap=True)
+        self._prices = ds.dataset(os.path.join(root, "stock_data"), format="parquet",
+                                  partitioning="hive", filesystem=filesystem)
+        index = pq.read_table(os.path.join(root, "index_info.parquet"), memory_map=True)
+        self._rows = list(zip(index.column("symbol").to_pylist(), index.column("name").to_pylist()))
+        self._index = build_symbol_index(self._rows)
+
+    def validate_symbols_or_names(self, inputs, use_cache=False):
+        inputs = list(inputs)
+        return split_resolved(inputs, resolve_with_index(self._index, inputs))
+
+    def get_symbol_names(self, symbols):
+        wanted = set(symbols)
+        return {symbol: name for symbol, name in self._rows if symbol in wanted}
+
+    def all_symbols(self):
+        return [symbol for symbol, _ in self._rows]
+
+    def load_price_matrix(self, symbols, start_date=None, end_date=None, column="close", dtype=np.float64):
+        if column not in PRICE_COLUMNS:
+            raise ValueError(f"Unknown price column: {column}")
+        import pyarrow.dataset as ds
+
+        symbols = list(dict.fromkeys(symbols))
+        columns = {symbol: k for k, symbol in enumerate(symbols)}
+
+        # Predicates on the year partition prune whole directories; the rest is pushed into row groups
+        predicate = ds.field("symbol").isin(symbols)
+        if start_date is not None:
+            start = date.fromisoformat(str(start_date))
+            predicate &= (ds.field("year") >= start.year) & (ds.field("date") >= start)
+        if end_date is not None:
+            end = date.fromisoformat(str(end_date))
+            predicate &= (ds.field("year") <= end.year) & (ds.field("date") <= end)
+        table = self._prices.to_table(columns=["symbol", "date", column], filter=predicate)
+
+        row_dates = table.column("date").to_numpy().astype("datetime64[D]")
+        dates, row_index = np.unique(row_dates, return_inverse=True)
+        col_index = np.fromiter((columns[symbol] for symbol in table.column("symbol").to_pylist()),
+                                dtype=np.intp, count=table.num_rows)
+        values = np.full((len(dates), len(symbols)), np.nan, dtype=dtype)
+        values[row_index, col_index] = table.column(column).to_numpy(zero_copy_only=False)
+        return values, pd.DatetimeIndex(dates, name="date"), columns
+
+    def load_price_frame(self, symbols, start_date=None, end_date=None, dtype=np.float64):
+        return price_matrix_to_frame(*self.load_price_matrix(symbols, start_date, end_date, dtype=dtype))
+
+    # The Parquet copy holds prices only, so returns are derived from them the way stock_returns is
+    def load_returns_frame(self, symbols, start_date=None, end_date=None, kind="simple", dtype=np.float64,
+                           complete=True):
+        returns = self.load_returns_matrix(symbols, start_date, end_date, kind, dtype)
+        returns = price_matrix_to_frame(returns.values, pd.DatetimeIndex(returns.dates, name="date"), returns.columns)
+        return returns.dropna() if complete else returns
+
+    # Returns computed in place over the loaded price array; like stock_returns, only dates where
+    # some symbol has a return are kept. Prices are read from RETURNS_LOOKBACK_DAYS before `start_date`
+    # so the first returns of the window have their previous close
+    def load_returns_matrix(self, symbols, start_date=None, end_date=None, kind="simple", dtype=np.float64):
+        first = None
+        if start_date is not None:
+            first = date.fromisoformat(str(start_date)[:10]) - timedelta(days=RETURNS_LOOKBACK_DAYS)
+        prices = PriceMatrix.from_arrays(*self.load_price_matrix(symbols, first, end_date, dtype=dtype))
+        returns = prices.to_returns(kind).between(start_date, None)
+        return returns.complete_rows(inplace=True, how="all")
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+# Open the read backend selected by the PRICE_STORE environment variable (or an explicit spec)
+
+def open_store(spec=None):
+    spec = spec if spec is not None else os.environ.get(STORE_ENV, "postgres")
+    if spec == "postgres":
+        return PostgresStore()
+    if spec.startswith("parquet:"):
+        return ParquetStore(spec[len("parquet:"):])
+    raise ValueError(f"Unknown price store '{spec}', expected 'postgres' or 'parquet:<directory>'")
+
+# Rebuild the local Parquet store from stock_data and index_info, streaming rows in chunks
+
+def sync_parquet_store(conn, root, chunk_size=200000):
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ("symbol", pa.string()), ("date", pa.date32()),
+        ("open", pa.float64()), ("high", pa.float64()), ("low", pa.float64()),
+        ("close", pa.float64()), ("volume", pa.int64()), ("year", pa.int32()),
+    ])
+
+    def batches():
+        with conn.cursor(name="sync_parquet_store") as cursor:
+            cursor.itersize = chunk_size
+            cursor.execute("""
+                SELECT symbol, date, open, high, low, close, volume, EXTRACT(YEAR FROM date)::int
+                FROM stock_data
+                ORDER BY symbol, date;
+            """)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield pa.RecordBatch.from_arrays(
+                    [pa.array(column, type=field.type) for column, field in zip(zip(*rows), schema)],
+                    schema=schema,
+                )
+
+    # Write next to the live copy and swap at the end so readers never see a half-written store
+    target = os.path.join(root, "stock_data")
+    staging = target + ".sync"
+    shutil.rmtree(staging, ignore_errors=True)
+    ds.write_dataset(
+        batches(), staging, schema=schema, format="parquet",
+        partitioning=ds.partitioning(pa.schema([("year", pa.int32())]), flavor="hive"),
+        min_rows_per_group=chunk_size // 4, max_rows_per_group=chunk_size,
+    )
+    shutil.rmtree(target, ignore_errors=True)
+    os.replace(staging, target)
+
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT symbol, name FROM index_info ORDER BY symbol;")
+        rows = cursor.fetchall()
+    conn.commit()
+    symbols, names = zip(*rows) if rows else ((), ())
+    pq.write_table(pa.table({"symbol": pa.array(symbols, pa.string()), "name": pa.array(names, pa.string())}),
+                   os.path.join(root, "index_info.parquet"))
+    print(f"Parquet store at {root} synced ({len(rows)} symbols).")
+
+# Parse CLI arguments
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Sync the local Parquet price store from PostgreSQL")
+    parser.add_argument("root", type=str, help="Directory of the Parquet store")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    conn = connect_to_postgres()
+    try:
+        sync_parquet_store(conn, args.root)
+    finally:
+        conn.close()
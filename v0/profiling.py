@@ -0,0 +1,193 @@
+# profiling.py
+import atexit
+import functools
+import json
+import os
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # Windows: peak memory is not reported
+    resource = None
+
+# Environment variable enabling profiling; its value is the report path prefix (e.g. "profile/run")
+PROFILE_ENV = "PIPELINE_PROFILE"
+
+_enabled = False
+_prefix = None
+_lock = threading.Lock()
+_local = threading.local()
+_spans = {}
+_counters = {}
+_started = time.time()
+
+# No-op stand-in returned by span() while profiling is off: a single shared object, no allocation
+
+class _NoSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NO_SPAN = _NoSpan()
+
+# Timed section; nested spans are recorded under their parent's path ("main/load/db.load.stock_data")
+
+class _Span:
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        stack = getattr(_local, "stack", None)
+        if stack is None:
+            stack = _local.stack = []
+        stack.append(self.name)
+        self.path = "/".join(stack)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        _local.stack.pop()
+        with _lock:
+            stats = _spans.setdefault(self.path, [0, 0.0, 0.0])
+            stats[0] += 1
+            stats[1] += elapsed
+            stats[2] = max(stats[2], elapsed)
+        return False
+
+def enable(prefix="profile"):
+    global _enabled, _prefix
+    _enabled = True
+    _prefix = prefix
+
+def enabled():
+    return _enabled
+
+def span(name):
+    return _Span(name) if _enabled else _NO_SPAN
+
+# Decorator timing every call of a function as a span (name defaults to the function name)
+
+def profiled(name=None):
+    def decorator(function):
+        label = name or function.__name__
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return function(*args, **kwargs)
+            with _Span(label):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+# Add to a counter (rows fetched, bytes sent, queries issued, ...)
+
+def count(name, value=1):
+    if _enabled:
+        with _lock:
+            _counters[name] = _counters.get(name, 0) + value
+
+def reset():
+    global _started
+    with _lock:
+        _spans.clear()
+        _counters.clear()
+    _started = time.time()
+
+def peak_memory():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+def snapshot():
+    with _lock:
+        spans = {path: {"calls": calls, "total_seconds": total, "max_seconds": longest}
+                 for path, (calls, total, longest) in sorted(_spans.items())}
+        counters = dict(sorted(_counters.items()))
+    return {
+        "started": _started,
+        "wall_seconds": time.time() - _started,
+        "peak_memory_bytes": peak_memory(),
+        "spans": spans,
+        "counters": counters,
+    }
+
+def _label(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+def prometheus_text(report):
+    lines = [
+        "# HELP pipeline_span_seconds_total Time spent in each instrumented section.",
+        "# TYPE pipeline_span_seconds_total counter",
+    ]
+    lines += [f'pipeline_span_seconds_total{{span="{_label(path)}"}} {stats["total_seconds"]:.6f}'
+              for path, stats in report["spans"].items()]
+    lines += [
+        "# HELP pipeline_span_calls_total Number of times each instrumented section ran.",
+        "# TYPE pipeline_span_calls_total counter",
+    ]
+    lines += [f'pipeline_span_calls_total{{span="{_label(path)}"}} {stats["calls"]}'
+              for path, stats in report["spans"].items()]
+    for name, value in report["counters"].items():
+        lines += [f"# TYPE pipeline_{name}_total counter", f"pipeline_{name}_total {value}"]
+    if report["peak_memory_bytes"] is not None:
+        lines += [
+            "# HELP pipeline_peak_memory_bytes Peak resident set size of the process.",
+            "# TYPE pipeline_peak_memory_bytes gauge",
+            f"pipeline_peak_memory_bytes {report['peak_memory_bytes']}",
+        ]
+    return "\n".join(lines) + "\n"
+
+# Write <prefix>.json and <prefix>.prom (Prometheus text format); returns the report
+
+def write_report(prefix=None):
+    if not _enabled:
+        return None
+    prefix = prefix or _prefix
+    report = snapshot()
+    directory = os.path.dirname(prefix)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(prefix + ".json", "w") as f:
+        json.dump(report, f, indent=2)
+    with open(prefix + ".prom", "w") as f:
+        f.write(prometheus_text(report))
+    return report
+
+def print_summary(report=None):
+    report = report or snapshot()
+    print(f"\nProfile ({report['wall_seconds']:.2f} s wall):")
+    for path, stats in report["spans"].items():
+        print(f"  {path:<50} {stats['calls']:6d} calls {stats['total_seconds']:10.4f} s")
+    for name, value in report["counters"].items():
+        print(f"  {name:<50} {value:>12,}")
+    if report["peak_memory_bytes"] is not None:
+        print(f"  {'peak memory':<50} {report['peak_memory_bytes'] / 2**20:10.1f} MiB")
+
+# CLI support: `--profile [PREFIX]` on any entry point
+
+def add_profile_argument(parser):
+    parser.add_argument("--profile", nargs="?", const="profile", default=None, metavar="PREFIX",
+                        help=f"Record stage timings and counters to PREFIX.json/.prom (or set {PROFILE_ENV})")
+
+def enable_from_args(args):
+    if getattr(args, "profile", None) and not _enabled:
+        enable(args.profile)
+        atexit.register(_report_at_exit)
+
+def _report_at_exit():
+    report = write_report()
+    if report is not None:
+        print_summary(report)
+        print(f"Profile written to {_prefix}.json and {_prefix}.prom")
+
+if os.environ.get(PROFILE_ENV):
+    enable(os.environ[PROFILE_ENV])
+    atexit.register(_report_at_exit)
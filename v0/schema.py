@@ -0,0 +1,236 @@
+# schema.py
+import argparse
+import json
+from datetime import date
+from db_utils import connect_to_postgres, create_coverage_table, create_returns_table, matrix_queries
+
+# Years given their own stock_data partition when the table is created; other dates land in
+# stock_data_default until ensure_year_partitions moves them into a yearly partition
+FIRST_YEAR = 1990
+
+# Create the yearly-partitioned stock_data, or convert an existing plain table into one
+# The primary key carries `close`, so the analysis reads (symbol filter, date order, close only)
+# are index-only scans without a second index over the same key
+
+def _create_base_tables(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS index_info (
+            symbol TEXT PRIMARY KEY,
+            name TEXT
+        );
+    """)
+    cursor.execute("SELECT to_regclass('stock_data');")
+    existing = cursor.fetchone()[0] is not None
+    if existing:
+        cursor.execute("SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'stock_data'::regclass;")
+        if cursor.fetchone():
+            return
+        cursor.execute("ALTER TABLE stock_data RENAME TO stock_data_unpartitioned;")
+        # The old primary key index keeps its name after the rename; free it for the new table
+        cursor.execute("""
+            SELECT conname FROM pg_constraint
+            WHERE conrelid = 'stock_data_unpartitioned'::regclass AND contype = 'p';
+        """)
+        for (constraint,) in cursor.fetchall():
+            cursor.execute(f"ALTER INDEX {constraint} RENAME TO stock_data_unpartitioned_pkey;")
+
+    cursor.execute("""
+        CREATE TABLE stock_data (
+            symbol TEXT NOT NULL,
+            date DATE NOT NULL,
+            open DOUBLE PRECISION,
+            high DOUBLE PRECISION,
+            low DOUBLE PRECISION,
+            close DOUBLE PRECISION,
+            volume BIGINT,
+            PRIMARY KEY (symbol, date) INCLUDE (close)
+        ) PARTITION BY RANGE (date);
+    """)
+    cursor.execute("CREATE TABLE stock_data_default PARTITION OF stock_data DEFAULT;")
+    _create_year_partitions(cursor, FIRST_YEAR, date.today().year + 1)
+
+    if existing:
+        cursor.execute("""
+            INSERT INTO stock_data (symbol, date, open, high, low, close, volume)
+            SELECT symbol, date, open, high, low, close, volume FROM stock_data_unpartitioned;
+        """)
+        cursor.execute("DROP TABLE stock_data_unpartitioned;")
+
+def _create_year_partitions(cursor, first_year, last_year):
+    for year in range(first_year, last_year + 1):
+        cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS stock_data_y{year} PARTITION OF stock_data
+            FOR VALUES FROM ('{year}-01-01') TO ('{year + 1}-01-01');
+        """)
+
+# Index for name lookups
+
+def _create_indexes(cursor):
+    cursor.execute("CREATE INDEX IF NOT EXISTS index_info_name_idx ON index_info (name);")
+
+def _create_derived_tables(cursor):
+    create_coverage_table(cursor)
+    create_returns_table(cursor)
+
+# Ordered migrations; a database at version N has applied the first N entries
+
+MIGRATIONS = [
+    ("base tables, stock_data partitioned by year", _create_base_tables),
+    ("index_info name index", _create_indexes),
+    ("coverage and returns tables", _create_derived_tables),
+]
+
+def current_version(conn):
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INTEGER NOT NULL,
+                applied_at TIMESTAMP NOT NULL DEFAULT now()
+            );
+        """)
+        cursor.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version;")
+        version = cursor.fetchone()[0]
+    conn.commit()
+    return version
+
+# Apply every pending migration, each in its own transaction, then make sure stock_data has a
+# partition for every year up to next year
+
+def migrate(conn):
+    version = current_version(conn)
+    for number, (description, step) in enumerate(MIGRATIONS, start=1):
+        if number <= version:
+            continue
+        try:
+            with conn.cursor() as cursor:
+                step(cursor)
+                cursor.execute("INSERT INTO schema_version (version) VALUES (%s);", (number,))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        print(f"Migration {number} applied: {description}")
+    ensure_year_partitions(conn, FIRST_YEAR, date.today().year + 1)
+    return len(MIGRATIONS)
+
+# Give every year in [first_year, last_year] its own partition, moving any rows already
+# stored for that year out of the default partition (no-op while stock_data is not partitioned)
+
+def ensure_year_partitions(conn, first_year, last_year):
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT to_regclass('stock_data_default');")
+        if cursor.fetchone()[0] is None:
+            conn.rollback()
+            return
+        for year in range(first_year, last_year + 1):
+            cursor.execute("SELECT to_regclass(%s);", (f"stock_data_y{year}",))
+            if cursor.fetchone()[0] is not None:
+                continue
+            start, end = f"{year}-01-01", f"{year + 1}-01-01"
+            cursor.execute(f"CREATE TABLE stock_data_y{year} (LIKE stock_data INCLUDING DEFAULTS);")
+            cursor.execute(f"""
+                WITH moved AS (
+                    DELETE FROM stock_data_default WHERE date >= %s AND date < %s RETURNING *
+                )
+                INSERT INTO stock_data_y{year} SELECT * FROM moved;
+            """, (start, end))
+            cursor.execute(f"""
+                ALTER TABLE stock_data ATTACH PARTITION stock_data_y{year}
+                FOR VALUES FROM ('{start}') TO ('{end}');
+            """)
+    conn.commit()
+
+# EXPLAIN ANALYZE a query and return its JSON plan
+
+def explain(conn, query, params=None):
+    with conn.cursor() as cursor:
+        cursor.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + query, params)
+        plan = cursor.fetchone()[0]
+    conn.rollback()
+    return plan[0] if isinstance(plan, list) else json.loads(plan)[0]
+
+def _plan_nodes(node):
+    yield node
+    for child in node.get("Plans", []):
+        yield from _plan_nodes(child)
+
+INDEX_SCANS = ("Index Only Scan", "Index Scan", "Bitmap Index Scan")
+
+# Checks on the plan of one loader query: only the partitions of the requested years are scanned
+# (when `years` is given), no sequential scan, and an index-only scan when `index_only` is set
+
+def _check_read(label, plan, years=None, index_only=False):
+    nodes = list(_plan_nodes(plan["Plan"]))
+    types = ", ".join(sorted({node["Node Type"] for node in nodes}))
+    results = []
+    if years is not None:
+        scanned = {node["Relation Name"] for node in nodes if "Relation Name" in node}
+        allowed = {f"stock_data_y{year}" for year in years} | {"stock_data_default"}
+        results.append((f"{label} prunes partitions", scanned <= allowed, ", ".join(sorted(scanned))))
+    results.append((f"{label} uses an index", any(node["Node Type"] in INDEX_SCANS for node in nodes) and not any(
+        node["Node Type"] == "Seq Scan" for node in nodes), types))
+    if index_only:
+        results.append((f"{label} is index-only", any(node["Node Type"] == "Index Only Scan" for node in nodes),
+                        f"{plan['Execution Time']:.2f} ms"))
+    return results
+
+# Check the plans of the queries the loaders actually issue (db_utils.matrix_queries): the price
+# reads must stay on the partitions of the requested years and read `close` from the covering
+# primary key, the returns reads must use stock_returns' key, and name resolution must not scan index_info
+
+def check_plans(conn, symbols, start_date, end_date):
+    results = []
+    years = range(date.fromisoformat(str(start_date)).year, date.fromisoformat(str(end_date)).year + 1)
+
+    dates_query, rows_query = matrix_queries("stock_data", "close", symbols, start_date, end_date)
+    results += _check_read("price dates read", explain(conn, *dates_query), years, index_only=True)
+    results += _check_read("price rows read", explain(conn, *rows_query), years, index_only=True)
+
+    # Skipped where stock_returns does not exist (bench_schema's scratch schemas)
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT to_regclass('stock_returns');")
+        has_returns = cursor.fetchone()[0] is not None
+    conn.rollback()
+    if has_returns:
+        dates_query, rows_query = matrix_queries("stock_returns", "simple_return", symbols, start_date, end_date)
+        results += _check_read("returns dates read", explain(conn, *dates_query))
+        results += _check_read("returns rows read", explain(conn, *rows_query))
+
+    plan = explain(conn, "SELECT symbol FROM index_info WHERE name = %s;", (str(symbols[0]),))
+    nodes = list(_plan_nodes(plan["Plan"]))
+    results.append(("name lookup uses an index", not any(node["Node Type"] == "Seq Scan" for node in nodes),
+                    ", ".join(node["Node Type"] for node in nodes)))
+    return results
+
+def print_checks(results):
+    for check, passed, detail in results:
+        print(f"[{'ok' if passed else 'FAIL'}] {check}: {detail}")
+    return all(passed for _, passed, _ in results)
+
+# Parse CLI arguments
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Create or migrate the database schema and check query plans")
+    parser.add_argument("--check", nargs="*", metavar="SYMBOL", default=None,
+                        help="After migrating, EXPLAIN ANALYZE the analysis queries for these symbols")
+    parser.add_argument("--start_date", type=str, default="2023-01-01", help="Start date of the checked queries")
+    parser.add_argument("--end_date", type=str, default="2023-12-31", help="End date of the checked queries")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    conn = connect_to_postgres()
+    try:
+        migrate(conn)
+        if args.check is not None:
+            symbols = args.check
+            if not symbols:
+                with conn.cursor() as cursor:
+                    cursor.execute("SELECT symbol FROM index_info ORDER BY symbol LIMIT 10;")
+                    symbols = [row[0] for row in cursor.fetchall()]
+            if not symbols:
+                raise ValueError("No symbols in index_info to check the query plans with")
+            print_checks(check_plans(conn, symbols, args.start_date, args.end_date))
+    finally:
+        conn.close()
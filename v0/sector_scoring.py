@@ -0,0 +1,170 @@
+# sector_scoring.py
+import argparse
+import json
+import os
+import time
+from collections import Counter
+import numpy as np
+
+# Canonical sector profiles, shared with the web app (src/utils/sectorProfiles.js imports the same file)
+PROFILES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "finance_analyzer", "src", "data",
+                             "sectorProfiles.json")
+
+# Profile used for sectors without one of their own
+DEFAULT_SECTOR = "default"
+
+def load_profiles(path=PROFILES_PATH):
+    with open(path, encoding="utf-8") as f:
+        profiles = json.load(f)
+    if DEFAULT_SECTOR not in profiles["sectors"]:
+        raise ValueError(f"{path}: no '{DEFAULT_SECTOR}' sector profile")
+    for sector, profile in profiles["sectors"].items():
+        if len(profile["metrics"]) != len(profile["weights"]):
+            raise ValueError(f"{path}: sector '{sector}' has {len(profile['metrics'])} metrics "
+                             f"but {len(profile['weights'])} weights")
+    return profiles
+
+# Numeric value of a field, NaN when it is absent or not a finite number (isValidNumber in the app)
+
+def _value(value):
+    if value is None or value == "":
+        return np.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+# Companies x metrics matrix of the given fields
+
+def metrics_matrix(records, metrics):
+    values = np.array([[_value(record.get(metric)) for metric in metrics] for record in records],
+                      dtype=np.float64).reshape(len(records), len(metrics))
+    values[~np.isfinite(values)] = np.nan
+    return values
+
+class SectorScorer:
+    """
+    Scores a whole universe in one pass. The profiles are compiled once into a sectors x metrics
+    weight matrix and a required-metric mask; a company's score is then the row-wise dot product of
+    its normalized metrics (0-100) with its sector's weight row. Metrics without a range in the
+    profile file are required but score 0, as in the app's original switch.
+    """
+
+    def __init__(self, profiles=None):
+        profiles = profiles if profiles is not None else load_profiles()
+        sectors = profiles["sectors"]
+        ranges = profiles["metrics"]
+        self.metrics = list(dict.fromkeys(metric for profile in sectors.values() for metric in profile["metrics"]))
+        self.sectors = {sector: k for k, sector in enumerate(sectors)}
+        columns = {metric: k for k, metric in enumerate(self.metrics)}
+
+        self.weights = np.zeros((len(sectors), len(self.metrics)))
+        for sector, profile in sectors.items():
+            self.weights[self.sectors[sector], [columns[metric] for metric in profile["metrics"]]] = profile["weights"]
+        self.required = np.zeros(self.weights.shape, dtype=bool)
+        for sector, profile in sectors.items():
+            self.required[self.sectors[sector], [columns[metric] for metric in profile["metrics"]]] = True
+
+        self.low = np.array([ranges.get(metric, {}).get("min", np.nan) for metric in self.metrics], dtype=float)
+        self.high = np.array([ranges.get(metric, {}).get("max", np.nan) for metric in self.metrics], dtype=float)
+        self.invert = np.array([ranges.get(metric, {}).get("invert", False) for metric in self.metrics])
+        self.ranged = ~np.isnan(self.low)
+
+    # Row of each company's profile in the weight matrix
+    def sector_rows(self, records):
+        default = self.sectors[DEFAULT_SECTOR]
+        return np.fromiter((self.sectors.get(record.get("sector") or DEFAULT_SECTOR, default) for record in records),
+                           dtype=np.intp, count=len(records))
+
+    # Metrics mapped to 0-100 by their profile range (inverted ranges score low values high)
+    def normalize(self, values):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            scaled = np.clip((values - self.low) / (self.high - self.low), 0, 1) * 100
+        scaled = np.where(self.invert, 100 - scaled, scaled)
+        return np.where(self.ranged & ~np.isnan(values), scaled, 0.0)
+
+    def score(self, records):
+        """
+        Return (scores, missing, rows): scores is NaN where a required metric is missing, missing is
+        the companies x metrics mask of missing required metrics, rows the profile row per company.
+        """
+        values = metrics_matrix(records, self.metrics)
+        rows = self.sector_rows(records)
+        missing = self.required[rows] & np.isnan(values)
+        scores = np.einsum("ij,ij->i", self.normalize(values), self.weights[rows])
+        scores[missing.any(axis=1)] = np.nan
+        return scores, missing, rows
+
+    # Bulk diagnostics: how many companies lack each metric, per sector and overall
+    def diagnostics(self, records, missing, rows):
+        names = list(self.sectors)
+        by_metric = Counter()
+        by_sector = {}
+        for metric, count in zip(self.metrics, missing.sum(axis=0)):
+            if count:
+                by_metric[metric] = int(count)
+        for row in np.unique(rows[missing.any(axis=1)]):
+            in_sector = rows == row
+            counts = missing[in_sector].sum(axis=0)
+            by_sector[names[row]] = {
+                "companies": int(in_sector.sum()),
+                "unscored": int(missing[in_sector].any(axis=1).sum()),
+                "missing": {metric: int(count) for metric, count in zip(self.metrics, counts) if count},
+            }
+        return {
+            "companies": len(records),
+            "unscored": int(missing.any(axis=1).sum()),
+            "missing": dict(by_metric.most_common()),
+            "sectors": by_sector,
+        }
+
+# Write `score` (rounded to 2 decimals, None when unscored) and `scoreMissing` into every record;
+# returns the diagnostics
+
+def score_records(records, scorer=None):
+    scorer = scorer or SectorScorer()
+    scores, missing, rows = scorer.score(records)
+    metrics = np.array(scorer.metrics, dtype=object)
+    for record, score, lacks in zip(records, scores.tolist(), missing):
+        record["score"] = None if np.isnan(score) else round(score, 2)
+        record["scoreMissing"] = metrics[lacks].tolist()
+    return scorer.diagnostics(records, missing, rows)
+
+def print_diagnostics(diagnostics):
+    print(f"{diagnostics['companies'] - diagnostics['unscored']}/{diagnostics['companies']} companies scored")
+    for metric, count in diagnostics["missing"].items():
+        print(f"  missing {metric:<16} {count:6d} companies")
+    for sector, stats in diagnostics["sectors"].items():
+        missing = ", ".join(f"{metric} ({count})" for metric, count in stats["missing"].items())
+        print(f"  {sector:<24} {stats['unscored']:4d}/{stats['companies']:<4d} unscored: {missing}")
+
+# Parse CLI arguments
+
+def parse_arguments():
+    from export_web_data import FULL_FILE, WEB_DATA_DIR
+
+    parser = argparse.ArgumentParser(description="Score every company of an exported dataset by sector profile")
+    parser.add_argument("--input", type=str, default=os.path.join(WEB_DATA_DIR, FULL_FILE),
+                        help="Exported data.json to score")
+    parser.add_argument("--output_dir", type=str, default=WEB_DATA_DIR,
+                        help="Directory receiving the re-exported dataset")
+    parser.add_argument("--profiles", type=str, default=PROFILES_PATH, help="Sector profile definition")
+    parser.add_argument("--pretty", action="store_true", help="Indent data.json instead of minifying it")
+    parser.add_argument("--report", type=str, default=None, help="Write the missing-field diagnostics to this JSON file")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    from export_web_data import export_web_data
+
+    args = parse_arguments()
+    with open(args.input, encoding="utf-8") as f:
+        records = json.load(f)
+    start = time.perf_counter()
+    diagnostics = score_records(records, SectorScorer(load_profiles(args.profiles)))
+    print(f"Scored {len(records)} companies in {(time.perf_counter() - start) * 1000:.1f} ms")
+    print_diagnostics(diagnostics)
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(diagnostics, f, indent=2)
+    export_web_data(records, args.output_dir, pretty=args.pretty)
@@ -1,58 +1,114 @@
 # streamlit_app.py
 import streamlit as st
 import pandas as pd
-from db_utils import connect_to_postgres, validate_symbols_or_names, get_symbol_names
-from data_utils import calculate_daily_returns, calculate_correlation_matrix, calculate_rolling_correlation
-from plot_utils import plot_heatmap, plot_rolling_correlation
+import matplotlib.pyplot as plt
+from db_utils import create_connection_pool, pooled_connection, validate_symbols_or_names, get_symbol_names, load_returns_frame
+from data_utils import calculate_correlation_matrix, calculate_rolling_correlation
+from plot_utils import plot_heatmap, plot_rolling_correlation, set_interactive
+import profiling
+from corr_snapshots import DEFAULT_WINDOWS, open_snapshots, trailing_correlation
+
+# Memoized results expire after this many seconds; each cache keeps at most CACHE_ENTRIES keys
+CACHE_TTL = 600
+CACHE_ENTRIES = 32
+
+# Figures are handed to st.pyplot instead of being shown in a window
+set_interactive(False)
 
 st.set_page_config(page_title="Stock Correlation Analyzer", layout="wide")
 st.title("📊 Stock Correlation Analyzer")
 
-# Connect to DB
-conn = connect_to_postgres()
+# One connection pool per server process, shared by every rerun and session
+
+@st.cache_resource
+def get_pool():
+    return create_connection_pool()
+
+# Resolve symbols/names (the index_info cache usually answers without touching the DB)
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=CACHE_ENTRIES)
+def resolve_symbols(symbol_list):
+    with pooled_connection(get_pool()) as conn:
+        return validate_symbols_or_names(conn, symbol_list, use_cache=True)
+
+# Load the materialized daily returns for the window, keyed on symbols and date range
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=CACHE_ENTRIES)
+def load_returns(symbols, start_date, end_date):
+    with pooled_connection(get_pool()) as conn:
+        returns = load_returns_frame(conn, list(symbols), start_date, end_date)
+        symbol_names = get_symbol_names(conn, symbols)
+    return returns, symbol_names
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=CACHE_ENTRIES)
+def correlation_matrix(symbols, start_date, end_date):
+    returns, _ = load_returns(symbols, start_date, end_date)
+    return calculate_correlation_matrix(returns, list(symbols))
+
+# Trailing-window correlation as of end_date: recent precomputed snapshot first, live computation otherwise
+# Returns (correlation, snapshot as-of date or None)
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=CACHE_ENTRIES)
+def window_correlation(symbols, start_date, end_date, corr_window):
+    snapshots = open_snapshots()
+    if snapshots is not None:
+        found = snapshots.lookup(symbols, corr_window, as_of=end_date)
+        if found is not None:
+            return found
+    returns, _ = load_returns(symbols, start_date, end_date)
+    return trailing_correlation(returns, corr_window, list(symbols)), None
+
+# Keyed on the window too: moving the slider only recomputes this step
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=CACHE_ENTRIES)
+def rolling_correlation(symbols, start_date, end_date, window):
+    returns, _ = load_returns(symbols, start_date, end_date)
+    return calculate_rolling_correlation(returns, symbols[0], symbols[1], window)
 
 # Inputs
 symbol_input = st.text_input("Enter stock symbols (comma-separated)", value="AAPL,MSFT,GOOGL")
-symbol_list = [s.strip().upper() for s in symbol_input.split(",") if s.strip()]
+symbol_list = tuple(s.strip().upper() for s in symbol_input.split(",") if s.strip())
 start_date = st.date_input("Start Date", pd.to_datetime("2023-01-01"))
 end_date = st.date_input("End Date", pd.to_datetime("2023-12-31"))
 window_size = st.slider("Rolling Window (days)", min_value=5, max_value=120, value=30)
+corr_window = st.selectbox("Correlation window", ["Date range"] + [f"{w} days" for w in DEFAULT_WINDOWS])
+
+# Keep showing results after the first run, so widget changes rerun the analysis from the caches
+if st.button("Run Analysis"):
+    st.session_state["run_analysis"] = True
 
-if st.button("Run Analysis") and symbol_list:
-    symbols, missing = validate_symbols_or_names(conn, symbol_list)
+if st.session_state.get("run_analysis") and symbol_list:
+    symbols, missing = resolve_symbols(symbol_list)
 
     if missing:
         st.warning(f"Symbols not found in DB: {', '.join(missing)}")
 
     if symbols:
-        # Load stock data from database
-        query = """
-            SELECT symbol, date, close
-            FROM stock_data
-            WHERE symbol IN %s AND date BETWEEN %s AND %s
-            ORDER BY date;
-        """
-        with conn.cursor() as cursor:
-            cursor.execute(query, (tuple(symbols), start_date, end_date))
-            rows = cursor.fetchall()
-
-        df = pd.DataFrame(rows, columns=["symbol", "date", "close"])
-        df["date"] = pd.to_datetime(df["date"])
-        pivoted = df.pivot(index="date", columns="symbol", values="close")
+        symbols = tuple(symbols)
+        returns, symbol_names = load_returns(symbols, start_date, end_date)
 
         # Daily returns and correlation
-        returns = calculate_daily_returns(pivoted)
-        correlation_df = calculate_correlation_matrix(returns, symbols)
-
-        symbol_names = get_symbol_names(conn, symbols)
+        if corr_window == "Date range":
+            correlation_df = correlation_matrix(symbols, start_date, end_date)
+        else:
+            correlation_df, snapshot_date = window_correlation(symbols, start_date, end_date,
+                                                               int(corr_window.split()[0]))
+            if snapshot_date is not None:
+                st.caption(f"Precomputed snapshot as of {snapshot_date}")
         correlation_df_named = correlation_df.rename(columns=symbol_names, index=symbol_names)
 
         st.subheader("Correlation Heatmap")
-        st.pyplot(plot_heatmap(correlation_df_named, title="Correlation Matrix"))
+        fig = plot_heatmap(correlation_df_named, title="Correlation Matrix")
+        st.pyplot(fig)
+        plt.close(fig)
 
         if len(symbols) >= 2:
-            rolling = calculate_rolling_correlation(returns, symbols[0], symbols[1], window_size)
+            rolling = rolling_correlation(symbols, start_date, end_date, window_size)
             st.subheader(f"Rolling Correlation: {symbols[0]} vs {symbols[1]}")
-            st.pyplot(plot_rolling_correlation(rolling, symbols[0], symbols[1], window_size))
+            fig = plot_rolling_correlation(rolling, symbols[0], symbols[1], window_size)
+            st.pyplot(fig)
+            plt.close(fig)
 
-conn.close()
+# With PIPELINE_PROFILE set, refresh the cumulative profile of this server process after every run
+if profiling.enabled():
+    profiling.write_report()
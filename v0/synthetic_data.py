@@ -0,0 +1,94 @@
+# synthetic_data.py
+import threading
+import time
+import numpy as np
+import pandas as pd
+
+# Build one deterministic synthetic OHLCV frame shaped like the yfinance output
+
+def synthetic_ohlcv(n_days, start="2000-01-03", seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(start, periods=n_days)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n_days)))
+    spread = np.abs(rng.normal(0, 0.005, n_days)) * close
+    return pd.DataFrame({
+        "Open": close + rng.normal(0, 0.002, n_days) * close,
+        "High": close + spread,
+        "Low": close - spread,
+        "Close": close,
+        "Volume": rng.integers(1_000, 1_000_000, n_days),
+    }, index=dates)
+
+# Missing-data patterns accepted by apply_missing and synthetic_frames
+# random: isolated missing days; gaps: contiguous outages; listing: late IPOs and early delistings
+MISSING_PATTERNS = ("none", "random", "gaps", "listing")
+
+# Drop rows from a frame following one missing-data pattern; `rate` is the fraction of days removed
+
+def apply_missing(frame, pattern="none", rate=0.05, seed=0):
+    n = len(frame)
+    if pattern == "none" or rate <= 0 or n == 0:
+        return frame
+    rng = np.random.default_rng(seed)
+    keep = np.ones(n, dtype=bool)
+    if pattern == "random":
+        keep[rng.random(n) < rate] = False
+    elif pattern == "gaps":
+        # Outages of 5 to 20 days until about `rate` of the history is gone
+        target = int(n * rate)
+        while (~keep).sum() < target:
+            length = int(rng.integers(5, 21))
+            begin = int(rng.integers(0, max(n - length, 1)))
+            keep[begin:begin + length] = False
+    elif pattern == "listing":
+        # Split the missing share between a late start and an early end
+        head = int(rng.integers(0, int(n * rate) + 1))
+        tail = int(n * rate) - head
+        keep[:head] = False
+        keep[n - tail:] = False
+    else:
+        raise ValueError(f"Unknown missing-data pattern '{pattern}', expected one of {', '.join(MISSING_PATTERNS)}")
+    return frame[keep]
+
+# Build {symbol: frame} for a synthetic universe, each symbol with its own seed
+
+def synthetic_frames(n_symbols, n_days, prefix="SYN", start="2000-01-03", seed=0, missing="none", missing_rate=0.05):
+    return {
+        f"{prefix}{k:05d}": apply_missing(synthetic_ohlcv(n_days, start=start, seed=seed + k),
+                                         missing, missing_rate, seed=seed + k)
+        for k in range(n_symbols)
+    }
+
+# Offline drop-in for fetch_data.fetch_stock_data serving canned OHLCV frames
+
+class StubDownloader:
+    """
+    Callable with the same signature as `fetch_stock_data(symbol, start_date, end_date)`.
+    Frames come from `frames` (or are generated on demand), sliced to the requested range.
+    `latency` simulates network time, and symbols listed in `failures` raise
+    `ConnectionError` for their first N calls, to exercise retry and isolation logic.
+    """
+
+    def __init__(self, frames=None, latency=0.0, failures=None, n_days=2500):
+        self.frames = frames if frames is not None else {}
+        self.latency = latency
+        self.failures = dict(failures or {})
+        self.n_days = n_days
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, symbol, start_date, end_date):
+        with self._lock:
+            self.calls += 1
+            remaining = self.failures.get(symbol, 0)
+            if remaining:
+                self.failures[symbol] = remaining - 1
+            if symbol not in self.frames:
+                self.frames[symbol] = synthetic_ohlcv(self.n_days, seed=sum(map(ord, symbol)))
+            data = self.frames[symbol]
+        if self.latency:
+            time.sleep(self.latency)
+        if remaining:
+            raise ConnectionError(f"Simulated download failure for {symbol}")
+        # yfinance treats end_date as exclusive
+        return data.loc[(data.index >= pd.Timestamp(start_date)) & (data.index < pd.Timestamp(end_date))]
@@ -0,0 +1,144 @@
+# test_api_server.py
+import gzip
+import json
+import threading
+import urllib.error
+import urllib.request
+import numpy as np
+import pytest
+
+pytest.importorskip("psycopg2")
+pytest.importorskip("connectPostGre")
+from api_server import FinanceAPI, ResponseCache, encode_response, make_server
+
+# In-memory store answering the calls the /prices endpoint makes
+
+class FakeStore:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.loads = 0
+        self.rollbacks = 0
+
+    def validate_symbols_or_names(self, inputs, use_cache=False):
+        known = [symbol for symbol in inputs if symbol in ("AAA", "BBB")]
+        return known, [symbol for symbol in inputs if symbol not in known]
+
+    def load_price_matrix(self, symbols, start_date=None, end_date=None):
+        self.loads += 1
+        if self.fail:
+            raise RuntimeError("connection lost: password=secret")
+        values = np.array([[10.0, 20.0], [11.0, np.nan], [12.0, 22.0]])
+        dates = np.array(["2024-01-02", "2024-01-03", "2024-01-04"], dtype="datetime64[D]")
+        return values[:, :len(symbols)], dates, {symbol: k for k, symbol in enumerate(symbols)}
+
+    def rollback(self):
+        self.rollbacks += 1
+
+def _entry(size):
+    return encode_response({"data": "x" * size})
+
+def test_cache_evicts_least_recently_used():
+    cache = ResponseCache(max_entries=2)
+    cache.put("a", _entry(1))
+    cache.put("b", _entry(1))
+    assert cache.get("a") is not None
+    cache.put("c", _entry(1))
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.stats()["entries"] == 2
+
+def test_cache_bounds_bytes_and_expires(monkeypatch):
+    cache = ResponseCache(max_entries=10, max_bytes=3000, ttl=60)
+    cache.put("big", _entry(5000))
+    assert cache.get("big") is None
+    cache.put("a", _entry(1600))
+    cache.put("b", _entry(1600))
+    assert cache.get("a") is None and cache.get("b") is not None
+    assert cache.stats()["bytes"] <= 3000
+
+    now = [1000.0]
+    monkeypatch.setattr("api_server.time.monotonic", lambda: now[0])
+    cache.put("c", encode_response({"data": 1}))
+    now[0] += 61
+    assert cache.get("c") is None
+
+def test_encode_response_etag_and_gzip():
+    etag, body, compressed, _ = encode_response({"values": [1, 2, 3]})
+    assert etag == encode_response({"values": [1, 2, 3]})[0]
+    assert etag != encode_response({"values": [1, 2, 4]})[0]
+    assert compressed is None and json.loads(body) == {"values": [1, 2, 3]}
+
+    _, body, compressed, _ = _entry(5000)
+    assert gzip.decompress(compressed) == body and len(compressed) < len(body)
+
+def test_prices_are_cached_until_the_query_changes():
+    store = FakeStore()
+    api = FinanceAPI(store)
+    status, first = api.respond("/prices", {"symbols": ["AAA,BBB"], "start": ["2024-01-01"]})
+    assert status == 200
+    assert json.loads(first[1]) == {"dates": ["2024-01-02", "2024-01-03", "2024-01-04"], "symbols": ["AAA", "BBB"],
+                                    "close": {"AAA": [10.0, 11.0, 12.0], "BBB": [20.0, None, 22.0]}}
+    status, second = api.respond("/prices", {"symbols": ["AAA,BBB"], "start": ["2024-01-01"]})
+    assert status == 200 and second[0] == first[0] and store.loads == 1
+    api.respond("/prices", {"symbols": ["AAA"], "start": ["2024-01-01"]})
+    assert store.loads == 2
+
+@pytest.mark.parametrize("query", [
+    {"symbols": ["AAA"], "start": ["2024-13-01"]},
+    {"symbols": ["AAA"], "end": ["yesterday"]},
+    {"symbols": ["ZZZ"]},
+    {},
+])
+def test_invalid_parameters_are_400_and_not_cached(query):
+    store = FakeStore()
+    api = FinanceAPI(store)
+    status, (_, body, _, _) = api.respond("/prices", query)
+    assert status == 400 and "error" in json.loads(body)
+    assert store.loads == 0 and api.cache.stats()["entries"] == 0
+
+def test_store_failure_rolls_back_and_propagates():
+    store = FakeStore(fail=True)
+    api = FinanceAPI(store)
+    with pytest.raises(RuntimeError):
+        api.respond("/prices", {"symbols": ["AAA"]})
+    assert store.rollbacks == 1 and api.cache.stats()["entries"] == 0
+
+# HTTP round trips: conditional GET, gzip negotiation and a sanitized 500
+
+@pytest.fixture
+def serve():
+    servers = []
+
+    def start(api):
+        server = make_server(api, port=0, quiet=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_address[1]}"
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+def _get(url, headers=None):
+    request = urllib.request.Request(url, headers=headers or {})
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return response.status, response.headers, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.headers, e.read()
+
+def test_http_revalidation_and_gzip(serve):
+    url = serve(FinanceAPI(FakeStore())) + "/prices?symbols=AAA,BBB"
+    status, headers, body = _get(url)
+    assert status == 200 and headers["Cache-Control"] == "no-cache"
+    status, headers, body = _get(url, {"If-None-Match": headers["ETag"]})
+    assert status == 304 and body == b""
+    # Bodies under GZIP_MIN_BYTES are sent as is even when gzip is accepted
+    status, headers, body = _get(url, {"Accept-Encoding": "gzip"})
+    assert status == 200 and headers.get("Content-Encoding") is None
+
+def test_http_500_hides_the_exception(serve):
+    status, _, body = _get(serve(FinanceAPI(FakeStore(fail=True))) + "/prices?symbols=AAA")
+    assert status == 500
+    assert json.loads(body) == {"error": "Internal server error"}
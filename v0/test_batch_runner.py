@@ -0,0 +1,41 @@
+# test_batch_runner.py
+import json
+import numpy as np
+import pandas as pd
+from batch_runner import read_jobs, run_batch
+from price_matrix import PriceMatrix
+
+# Store answering the resolution and loading calls of run_batch from a fixed returns frame
+
+class FrameStore:
+    def __init__(self, returns):
+        self.returns = returns
+
+    def validate_symbols_or_names(self, inputs, use_cache=False):
+        inputs = list(inputs)
+        return [item for item in inputs if item in self.returns], [item for item in inputs if item not in self.returns]
+
+    def load_returns_matrix(self, symbols, start_date=None, end_date=None, dtype=np.float64):
+        return PriceMatrix.from_frame(self.returns.loc[start_date:end_date, symbols], dtype)
+
+    def get_symbol_names(self, symbols):
+        return {symbol: f"Company {symbol}" for symbol in symbols}
+
+def test_malformed_jobs_are_reported_and_the_rest_run(tmp_path):
+    jobs = [
+        {"id": "no_symbols"},
+        {"id": "bad_symbols", "symbols": "AAA"},
+        {"id": "bad_output", "symbols": ["AAA", "BBB"], "outputs": ["pie"]},
+        {"id": "missing", "symbols": ["AAA", "ZZZ"]},
+        ["AAA", "BBB"],
+        {"id": "ok", "symbols": ["AAA", "BBB"]},
+    ]
+    path = tmp_path / "jobs.json"
+    path.write_text(json.dumps(jobs))
+    returns = pd.DataFrame(np.random.default_rng(0).standard_normal((50, 2)),
+                           index=pd.bdate_range("2024-01-01", periods=50), columns=["AAA", "BBB"])
+    summary = run_batch(read_jobs(str(path)), str(tmp_path / "out"), FrameStore(returns), processes=1)
+    assert [result["id"] for result in summary["results"]] == ["ok"]
+    assert (tmp_path / "out" / "ok" / "correlation.csv").exists()
+    assert [error["id"] for error in summary["failed"]] == ["no_symbols", "bad_symbols", "bad_output", "missing", "job_4"]
+    assert "ZZZ" in summary["failed"][3]["error"]
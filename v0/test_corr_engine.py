@@ -0,0 +1,100 @@
+# test_corr_engine.py
+import numpy as np
+import pandas as pd
+import pytest
+from corr_engine import correlation_block, packed_index, pairwise_correlation, rolling_pair_correlation, upper_triangle_pairs
+
+# Returns with scattered NaN gaps, a column missing a whole stretch, and a constant column
+
+def _returns(n_dates=300, n_symbols=12, seed=0):
+    rng = np.random.default_rng(seed)
+    factor = rng.standard_normal((n_dates, 1))
+    values = 0.01 * (0.6 * factor + rng.standard_normal((n_dates, n_symbols)))
+    values[rng.random(values.shape) < 0.05] = np.nan
+    values[40:120, 3] = np.nan
+    values[:, 5] = 0.002
+    return pd.DataFrame(values, columns=[f"S{k}" for k in range(n_symbols)])
+
+@pytest.mark.parametrize("dtype, tolerance", [(np.float64, 1e-12), (np.float32, 1e-6)])
+def test_pairwise_correlation_matches_pandas(dtype, tolerance):
+    frame = _returns().astype(dtype)
+    expected = frame.astype(np.float64).corr().to_numpy()
+    result = pairwise_correlation(frame.to_numpy(), dtype=dtype)
+    assert result.dtype == dtype
+    np.testing.assert_allclose(result, expected, atol=tolerance, rtol=0)
+    assert np.isnan(result[5]).all() and np.isnan(result[:, 5]).all()
+
+@pytest.mark.parametrize("dtype, tolerance", [(np.float64, 1e-12), (np.float32, 1e-6)])
+def test_complete_columns_match_pandas(dtype, tolerance):
+    frame = _returns().astype(dtype).fillna(0.0)
+    expected = frame.astype(np.float64).corr().to_numpy()
+    np.testing.assert_allclose(pairwise_correlation(frame.to_numpy(), dtype=dtype), expected, atol=tolerance, rtol=0)
+
+def test_min_periods_masks_short_overlaps():
+    frame = _returns()
+    expected = frame.corr(min_periods=250).to_numpy()
+    result = pairwise_correlation(frame.to_numpy(), min_periods=250)
+    np.testing.assert_array_equal(np.isnan(result), np.isnan(expected))
+    np.testing.assert_allclose(result, expected, atol=1e-12, rtol=0)
+
+@pytest.mark.parametrize("with_gaps", [True, False])
+def test_correlation_block_is_a_tile_of_the_full_matrix(with_gaps):
+    frame = _returns()
+    if not with_gaps:
+        frame = frame.fillna(0.0)
+    values = frame.to_numpy()
+    full = frame.corr().to_numpy()
+    block = correlation_block(values[:, 2:7], values[:, 4:12])
+    np.testing.assert_allclose(block, full[2:7, 4:12], atol=1e-12, rtol=0)
+
+def test_block_size_does_not_change_the_result():
+    values = _returns(n_symbols=30).to_numpy()
+    np.testing.assert_allclose(pairwise_correlation(values, block_size=7), pairwise_correlation(values),
+                               atol=1e-14, rtol=0)
+
+# Rolling correlations of every pair, column packed_index(i, j, n), against Series.rolling().corr
+
+def _rolling_expected(frame, window, min_periods=None):
+    columns = list(frame.columns)
+    pairs_i, pairs_j = upper_triangle_pairs(len(columns))
+    return np.column_stack([
+        frame[columns[i]].rolling(window, min_periods=min_periods).corr(frame[columns[j]]).to_numpy()
+        for i, j in zip(pairs_i, pairs_j)
+    ])
+
+# pandas gives rounding noise (even +-inf) over constant windows, so those are checked separately
+
+@pytest.mark.parametrize("with_gaps", [True, False])
+def test_rolling_pair_correlation_matches_pandas(with_gaps):
+    frame = _returns(n_dates=200, n_symbols=8).drop(columns="S5")
+    if not with_gaps:
+        # Filling S3's missing stretch would make it constant
+        frame = frame.drop(columns="S3").fillna(0.0)
+    rolling = rolling_pair_correlation(frame.to_numpy(), [20, 45], dtype=np.float64)
+    for window in (20, 45):
+        expected = _rolling_expected(frame, window)
+        np.testing.assert_array_equal(np.isnan(rolling[window]), np.isnan(expected))
+        np.testing.assert_allclose(rolling[window], expected, atol=1e-9, rtol=0)
+
+def test_rolling_pair_correlation_float32_and_resync():
+    frame = _returns(n_dates=300, n_symbols=8).drop(columns="S5")
+    expected = _rolling_expected(frame, 30, min_periods=10)
+    rolling = rolling_pair_correlation(frame.to_numpy(), 30, min_periods=10, resync_every=50)[30]
+    assert rolling.dtype == np.float32
+    np.testing.assert_array_equal(np.isnan(rolling), np.isnan(expected))
+    np.testing.assert_allclose(rolling, expected, atol=1e-6, rtol=0)
+
+def test_rolling_constant_windows_are_nan():
+    values = _returns(n_dates=200, n_symbols=6).fillna(0.0).to_numpy().copy()
+    values[60:100, 2] = 0.001
+    rolling = rolling_pair_correlation(values, 20, dtype=np.float64)[20]
+    n = values.shape[1]
+    assert np.isnan(rolling[:, [packed_index(min(k, 5), max(k, 5), n) for k in range(5)]]).all()
+    inside = rolling[79:100, [packed_index(min(k, 2), max(k, 2), n) for k in range(n) if k != 2]]
+    assert np.isnan(inside).all()
+    assert not np.isnan(rolling[19:60, packed_index(0, 2, n)]).any()
+
+def test_packed_index_follows_upper_triangle_order():
+    n = 7
+    pairs_i, pairs_j = upper_triangle_pairs(n)
+    np.testing.assert_array_equal(packed_index(pairs_i, pairs_j, n), np.arange(len(pairs_i)))
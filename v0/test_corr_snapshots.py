@@ -0,0 +1,80 @@
+# test_corr_snapshots.py
+import os
+from datetime import date
+import numpy as np
+import pandas as pd
+import pytest
+from corr_snapshots import SnapshotStore
+
+SYMBOLS = ["AAA", "BBB", "CCC"]
+
+@pytest.fixture
+def snapshots(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    matrix = np.array([[1.0, 0.5, -0.25], [0.5, 1.0, 0.1], [-0.25, 0.1, 1.0]])
+    store.write("all", date(2024, 3, 1), 30, SYMBOLS, matrix)
+    store.write("all", date(2024, 3, 8), 30, SYMBOLS, matrix * 0.5 + np.eye(3) * 0.5)
+    return store
+
+def test_lookup_slices_the_latest_snapshot(snapshots):
+    frame, version = snapshots.lookup(["CCC", "AAA"], 30, as_of="2024-03-10")
+    assert version == date(2024, 3, 8)
+    np.testing.assert_allclose(frame.to_numpy(), [[1.0, -0.125], [-0.125, 1.0]])
+    assert list(frame.columns) == ["CCC", "AAA"]
+
+def test_stale_snapshots_are_not_served(snapshots):
+    assert snapshots.lookup(SYMBOLS, 30, as_of="2024-03-20") is None
+    assert snapshots.lookup(SYMBOLS, 30, as_of="2024-03-20", max_age=None)[1] == date(2024, 3, 8)
+    assert snapshots.lookup(SYMBOLS, 30, as_of=pd.Timestamp("2024-03-05"), max_age=4)[1] == date(2024, 3, 1)
+
+def test_exact_date_with_zero_max_age(snapshots):
+    assert snapshots.lookup(SYMBOLS, 30, as_of="2024-03-09", max_age=0) is None
+    assert snapshots.lookup(SYMBOLS, 30, as_of="2024-03-08", max_age=0)[1] == date(2024, 3, 8)
+
+def test_versions_ignore_entries_not_named_by_date(snapshots, tmp_path):
+    os.makedirs(tmp_path / "all" / "tmp")
+    (tmp_path / "all" / "README").write_text("notes")
+    assert snapshots.versions("all") == [date(2024, 3, 1), date(2024, 3, 8)]
+    assert snapshots.find(SYMBOLS, 30, max_age=None) == ("all", date(2024, 3, 8))
+
+# Store serving returns with gaps from a fixed frame, for build_snapshots and AnalysisPipeline
+
+class FrameStore:
+    def __init__(self, returns):
+        self.returns = returns
+
+    def all_symbols(self):
+        return list(self.returns.columns)
+
+    def validate_symbols_or_names(self, inputs, use_cache=False):
+        return list(inputs), []
+
+    def load_returns_frame(self, symbols, start_date=None, end_date=None, complete=True):
+        returns = self.returns.loc[str(start_date):str(end_date), symbols]
+        return returns.dropna() if complete else returns
+
+    def load_returns_matrix(self, symbols, start_date=None, end_date=None, dtype=np.float64):
+        from price_matrix import PriceMatrix
+        return PriceMatrix.from_frame(self.load_returns_frame(symbols, start_date, end_date, complete=False), dtype)
+
+def test_snapshot_matches_live_fallback_on_gaps(tmp_path):
+    pytest.importorskip("psycopg2")
+    pytest.importorskip("connectPostGre")
+    from analytics import AnalysisPipeline
+    from corr_snapshots import build_snapshots
+
+    rng = np.random.default_rng(0)
+    dates = pd.bdate_range("2023-06-01", "2024-03-08")
+    returns = pd.DataFrame(rng.standard_normal((len(dates), 4)) * 0.01, index=dates, columns=SYMBOLS + ["DDD"])
+    returns = returns.mask(rng.random(returns.shape) < 0.15)
+    store, snapshots = FrameStore(returns), SnapshotStore(str(tmp_path))
+    version = build_snapshots(store, snapshots, "all", windows=(30,), as_of="2024-03-08")
+
+    symbols = ["CCC", "AAA", "DDD"]
+    served = AnalysisPipeline(store, symbols, "2024-01-01", "2024-03-08", corr_window=30, snapshots=snapshots,
+                              dtype=np.float64)
+    live = AnalysisPipeline(store, symbols, "2024-01-01", "2024-03-08", corr_window=30, dtype=np.float64)
+    assert snapshots.find(symbols, 30, as_of="2024-03-08") == ("all", version)
+    np.testing.assert_allclose(served.correlation.to_numpy(), live.correlation.to_numpy(), atol=1e-6)
+    # The complete-row returns of the other outputs are still available after the fallback
+    assert not live.returns.isna().any().any()
@@ -0,0 +1,93 @@
+# test_db_utils.py
+from datetime import date, datetime
+import pandas as pd
+import pytest
+
+pytest.importorskip("psycopg2")
+pytest.importorskip("connectPostGre")
+from db_utils import _subtract_ranges, missing_ranges
+
+# Minimal connection answering the coverage query with fixed rows
+
+class FakeConnection:
+    def __init__(self, rows):
+        self.rows = rows
+        self.params = None
+
+    def cursor(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=None):
+        self.params = params
+
+    def fetchall(self):
+        return self.rows
+
+def d(day):
+    return date(2024, 1, day)
+
+def test_subtract_ranges_without_coverage():
+    assert _subtract_ranges(d(1), d(31), []) == [(d(1), d(31))]
+
+def test_subtract_ranges_leaves_inner_gaps():
+    covered = [(d(10), d(15)), (d(1), d(5)), (d(20), d(25))]
+    assert _subtract_ranges(d(1), d(31), covered) == [(d(5), d(10)), (d(15), d(20)), (d(25), d(31))]
+
+def test_subtract_ranges_half_open_bounds():
+    # Ranges are [start, end): touching intervals leave no gap
+    assert _subtract_ranges(d(1), d(10), [(d(1), d(5)), (d(5), d(10))]) == []
+    assert _subtract_ranges(d(5), d(10), [(d(1), d(5)), (d(10), d(20))]) == [(d(5), d(10))]
+
+def test_subtract_ranges_overlapping_coverage():
+    covered = [(d(1), d(12)), (d(3), d(8)), (d(11), d(20))]
+    assert _subtract_ranges(d(2), d(25), covered) == [(d(20), d(25))]
+
+@pytest.mark.parametrize("start, end", [
+    ("2024-01-01", "2024-01-31"),
+    (pd.Timestamp("2024-01-01"), pd.Timestamp("2024-01-31")),
+    (datetime(2024, 1, 1, 9, 30), datetime(2024, 1, 31)),
+    (d(1), d(31)),
+])
+def test_missing_ranges_accepts_any_date_type(start, end):
+    conn = FakeConnection([("AAA", d(5), d(10))])
+    gaps = missing_ranges(conn, ["AAA", "BBB"], start, end)
+    assert conn.params[1:] == (d(1), d(31))
+    assert gaps == {"AAA": [(d(1), d(5)), (d(10), d(31))], "BBB": [(d(1), d(31))]}
+
+# Connection recording EXPLAINed statements and answering them with an index-only plan
+
+class ExplainConnection(FakeConnection):
+    def __init__(self):
+        super().__init__([])
+        self.explained = []
+        self.last = None
+
+    def execute(self, query, params=None):
+        self.last = query
+        if query.startswith("EXPLAIN"):
+            self.explained.append((query[query.index(")") + 2:], params))
+
+    def fetchone(self):
+        if self.last.startswith("EXPLAIN"):
+            return [[{"Plan": {"Node Type": "Index Only Scan", "Relation Name": "stock_data_y2023"},
+                      "Execution Time": 1.0}]]
+        return [None]
+
+    def rollback(self):
+        pass
+
+def test_check_plans_explains_the_loader_queries():
+    from db_utils import matrix_queries
+    from schema import check_plans
+
+    conn = ExplainConnection()
+    results = check_plans(conn, ["AAA", "BBB"], "2023-01-01", "2023-12-31")
+    loader = list(matrix_queries("stock_data", "close", ["AAA", "BBB"], "2023-01-01", "2023-12-31"))
+    assert conn.explained[:2] == loader
+    assert all(passed for _, passed, _ in results)
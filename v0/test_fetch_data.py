@@ -0,0 +1,39 @@
+# test_fetch_data.py
+import pandas as pd
+import pytest
+
+pytest.importorskip("yfinance")
+from fetch_data import DownloadError, RateLimiter, fetch_with_retries
+
+def _frame(n):
+    dates = pd.bdate_range("2024-01-01", periods=n)
+    return pd.DataFrame({"Close": range(n)}, index=dates, dtype=float)
+
+def test_empty_range_is_a_valid_answer():
+    calls = []
+
+    def download(symbol, start_date, end_date):
+        calls.append(symbol)
+        return _frame(0)
+
+    data = fetch_with_retries(download, RateLimiter(None), "AAA", "2024-01-06", "2024-01-08", retries=3, backoff=0)
+    assert data.empty and calls == ["AAA"]
+
+def test_failed_downloads_are_retried_then_raised():
+    attempts = []
+
+    def throttled(symbol, start_date, end_date, failures):
+        attempts.append(symbol)
+        if len(attempts) <= failures:
+            raise DownloadError("Too Many Requests")
+        return _frame(5)
+
+    data = fetch_with_retries(lambda *request: throttled(*request, failures=2), RateLimiter(None),
+                              "AAA", "2024-01-01", "2024-01-08", retries=3, backoff=0)
+    assert len(data) == 5 and len(attempts) == 3
+
+    attempts.clear()
+    with pytest.raises(DownloadError):
+        fetch_with_retries(lambda *request: throttled(*request, failures=10), RateLimiter(None),
+                           "AAA", "2024-01-01", "2024-01-08", retries=2, backoff=0)
+    assert len(attempts) == 3
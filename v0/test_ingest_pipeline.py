@@ -0,0 +1,104 @@
+# test_ingest_pipeline.py
+import asyncio
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("psycopg2")
+pytest.importorskip("yfinance")
+pytest.importorskip("connectPostGre")
+import ingest_pipeline
+from ingest_pipeline import ingest_ranges
+
+# Seconds after which a pipeline that has not returned is considered deadlocked
+TIMEOUT = 10
+
+class FakeConnection:
+    closed = False
+
+    def close(self):
+        self.closed = True
+
+def _download(symbol, start_date, end_date):
+    dates = pd.bdate_range(start_date, end_date, inclusive="left")
+    close = np.linspace(10.0, 20.0, len(dates))
+    return pd.DataFrame({"Open": close, "High": close, "Low": close, "Close": close, "Volume": 1000.0},
+                        index=dates)
+
+def _ranges(n):
+    return [(f"S{k}", "2024-01-01", "2024-03-01") for k in range(n)]
+
+def _run(ranges, **kwargs):
+    connections = []
+
+    def connect():
+        connections.append(FakeConnection())
+        return connections[-1]
+
+    coroutine = ingest_ranges(ranges, connect=connect, downloader=_download, fetch_workers=4, queue_size=2,
+                              batch_rows=50, retries=0, backoff=0, **kwargs)
+    return asyncio.run(asyncio.wait_for(coroutine, TIMEOUT)), connections
+
+def test_every_range_is_written_once(monkeypatch):
+    written = []
+
+    def write_batch(conn, requests, buffer, total, refresh_returns):
+        written.extend(requests)
+        return total, 0
+
+    monkeypatch.setattr(ingest_pipeline, "_write_batch", write_batch)
+    result, connections = _run(_ranges(20), write_workers=2)
+    assert sorted(written) == sorted(_ranges(20))
+    assert result["inserted"] == 20 * len(_download("S0", "2024-01-01", "2024-03-01"))
+    assert result["failures"] == []
+    assert all(conn.closed for conn in connections)
+
+def test_failed_downloads_are_reported_not_written(monkeypatch):
+    written = []
+
+    def download(symbol, start_date, end_date):
+        if symbol == "S3":
+            raise ConnectionError("boom")
+        return _download(symbol, start_date, end_date)
+
+    def write_batch(conn, requests, buffer, total, refresh_returns):
+        written.extend(requests)
+        return total, 0
+
+    monkeypatch.setattr(ingest_pipeline, "_write_batch", write_batch)
+    result = asyncio.run(asyncio.wait_for(
+        ingest_ranges(_ranges(6), connect=FakeConnection, downloader=download, retries=0, backoff=0), TIMEOUT))
+    assert [request for request, _ in result["failures"]] == [("S3", "2024-01-01", "2024-03-01")]
+    assert sorted(written) == sorted(request for request in _ranges(6) if request[0] != "S3")
+
+def test_empty_ranges_are_covered(monkeypatch):
+    covered = []
+
+    def download(symbol, start_date, end_date):
+        data = _download(symbol, start_date, end_date)
+        return data.iloc[:0] if symbol in ("S1", "S4") else data
+
+    monkeypatch.setattr(ingest_pipeline, "copy_stock_data", lambda conn, buffer, total, refresh: (total, 0))
+    monkeypatch.setattr(ingest_pipeline, "record_coverage", lambda conn, *request: covered.append(request))
+    result = asyncio.run(asyncio.wait_for(
+        ingest_ranges(_ranges(6), connect=FakeConnection, downloader=download, retries=0, backoff=0), TIMEOUT))
+    assert result["failures"] == []
+    assert sorted(covered) == sorted(_ranges(6))
+
+# Regression: a failing writer or transformer used to leave the other stages blocked on full queues
+
+def test_failing_writer_stops_the_pipeline(monkeypatch):
+    def write_batch(conn, requests, buffer, total, refresh_returns):
+        raise RuntimeError("disk full")
+
+    monkeypatch.setattr(ingest_pipeline, "_write_batch", write_batch)
+    with pytest.raises(RuntimeError, match="disk full"):
+        _run(_ranges(40))
+
+def test_failing_transformer_stops_the_pipeline(monkeypatch):
+    def frames_to_csv(batch):
+        raise ValueError("bad frame")
+
+    monkeypatch.setattr(ingest_pipeline, "frames_to_csv", frames_to_csv)
+    with pytest.raises(ValueError, match="bad frame"):
+        _run(_ranges(40))
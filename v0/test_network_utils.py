@@ -0,0 +1,25 @@
+# test_network_utils.py
+import numpy as np
+from network_utils import top_k_edges
+
+def test_top_k_edges_skip_pairs_without_correlation():
+    nan = np.nan
+    matrix = np.array([
+        [1.0, 0.9, nan, nan],
+        [0.9, 1.0, nan, -0.2],
+        [nan, nan, 1.0, nan],
+        [nan, -0.2, nan, 1.0],
+    ])
+    rows, cols, corr = top_k_edges(matrix, k=2)
+    assert list(zip(rows.tolist(), cols.tolist())) == [(0, 1), (1, 3)]
+    np.testing.assert_array_equal(corr, [0.9, -0.2])
+
+def test_top_k_edges_picks_strongest_by_magnitude():
+    matrix = np.array([
+        [1.0, 0.1, -0.8, 0.5],
+        [0.1, 1.0, 0.3, 0.2],
+        [-0.8, 0.3, 1.0, 0.4],
+        [0.5, 0.2, 0.4, 1.0],
+    ])
+    rows, cols, _ = top_k_edges(matrix, k=1)
+    assert set(zip(rows.tolist(), cols.tolist())) == {(0, 2), (1, 2), (0, 3)}
@@ -0,0 +1,51 @@
+# test_price_matrix.py
+import numpy as np
+import pandas as pd
+import pytest
+import price_matrix
+from price_matrix import PriceMatrix
+
+def _matrix(seed=0):
+    rng = np.random.default_rng(seed)
+    values = rng.standard_normal((100, 5))
+    values[rng.random(values.shape) < 0.08] = np.nan
+    return PriceMatrix(values, pd.bdate_range("2024-01-01", periods=100).values, list("ABCDE"))
+
+@pytest.mark.parametrize("inplace", [False, True])
+def test_complete_rows_matches_dropna(monkeypatch, inplace):
+    # Small blocks so the in-place compaction crosses several of them
+    monkeypatch.setattr(price_matrix, "ROW_BLOCK", 7)
+    matrix = _matrix()
+    expected = matrix.to_frame().dropna()
+    result = matrix.complete_rows(inplace=inplace)
+    pd.testing.assert_frame_equal(result.to_frame(), expected)
+    assert np.shares_memory(result.values, matrix.values) == inplace
+
+def test_complete_rows_returns_self_without_gaps():
+    matrix = PriceMatrix(np.ones((10, 3)), pd.bdate_range("2024-01-01", periods=10).values, list("ABC"))
+    assert matrix.complete_rows() is matrix
+    assert matrix.complete_mask().all()
+
+# Reference: pct_change over each symbol's own rows, as LAG(close) in stock_returns computes it
+def _lagged_returns(frame, kind):
+    long = frame.stack().dropna().rename("close").reset_index(level="symbol")
+    prev = long.groupby("symbol")["close"].shift()
+    long["value"] = (long["close"] / prev - 1) if kind == "simple" else np.log(long["close"] / prev)
+    return long.pivot(columns="symbol", values="value").reindex(index=frame.index[1:], columns=frame.columns)
+
+@pytest.mark.parametrize("kind", ["simple", "log"])
+def test_to_returns_spans_gaps_like_lag(monkeypatch, kind):
+    monkeypatch.setattr(price_matrix, "ROW_BLOCK", 7)
+    monkeypatch.setattr(price_matrix, "COLUMN_BLOCK", 2)
+    matrix = _matrix()
+    gaps = np.isnan(matrix.values)
+    matrix.values[:] = 100 * np.exp(np.cumsum(np.nan_to_num(matrix.values) * 0.01, axis=0))
+    matrix.values[gaps] = np.nan
+    expected = _lagged_returns(matrix.to_frame().copy(), kind)
+    result = matrix.to_returns(kind)
+    pd.testing.assert_frame_equal(result.to_frame(), expected, check_names=False, check_freq=False)
+
+def test_to_returns_skips_non_positive_prices():
+    values = np.array([[10.0], [0.0], [np.nan], [12.0], [15.0]])
+    matrix = PriceMatrix(values, pd.bdate_range("2024-01-01", periods=5).values, ["A"])
+    np.testing.assert_allclose(matrix.to_returns().values[:, 0], [np.nan, np.nan, np.nan, 0.25])
@@ -0,0 +1,45 @@
+# test_price_store.py
+import os
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("psycopg2")
+pytest.importorskip("connectPostGre")
+pa = pytest.importorskip("pyarrow")
+import pyarrow.parquet as pq
+from price_store import ParquetStore
+from synthetic_data import synthetic_frames
+
+# Write a synthetic universe in the ParquetStore layout
+
+def _write_store(root, frames):
+    long = pd.concat([pd.DataFrame({"symbol": symbol, "date": data.index.date, "close": data["Close"].to_numpy()})
+                      for symbol, data in frames.items()], ignore_index=True)
+    for column in ("open", "high", "low"):
+        long[column] = long["close"]
+    long["volume"] = 0
+    long["year"] = [day.year for day in long["date"]]
+    for year, rows in long.groupby("year"):
+        directory = os.path.join(root, "stock_data", f"year={year}")
+        os.makedirs(directory)
+        pq.write_table(pa.Table.from_pandas(rows.drop(columns="year"), preserve_index=False),
+                       os.path.join(directory, "part-0.parquet"))
+    pq.write_table(pa.table({"symbol": list(frames), "name": [f"Company {symbol}" for symbol in frames]}),
+                   os.path.join(root, "index_info.parquet"))
+
+# Returns over each symbol's whole stored history, as stock_returns materializes them
+
+def _stock_returns(frames):
+    return pd.DataFrame({symbol: data["Close"].pct_change(fill_method=None) for symbol, data in frames.items()})
+
+def test_parquet_returns_match_stock_returns(tmp_path):
+    frames = synthetic_frames(4, 120, start="2023-12-01", missing="random", missing_rate=0.1)
+    _write_store(str(tmp_path), frames)
+    store = ParquetStore(str(tmp_path))
+    expected = _stock_returns(frames).loc["2024-01-02":"2024-03-29"].dropna(how="all")
+    result = store.load_returns_frame(list(frames), "2024-01-02", "2024-03-29", complete=False)
+    pd.testing.assert_frame_equal(result, expected, check_names=False, check_freq=False, check_index_type=False)
+    complete = store.load_returns_frame(list(frames), "2024-01-02", "2024-03-29")
+    pd.testing.assert_frame_equal(complete, expected.dropna(), check_names=False, check_freq=False,
+                                  check_index_type=False)